@@ -7,8 +7,14 @@ while ! nc -z db 5432; do
 done
 echo "Database started"
 
-echo "Applying migrations..."
-alembic upgrade head
+# С FAST_START=true миграции применяет отдельный шаг выкладки, а не каждый старт контейнера
+# (см. .env.example): несколько реплик не гоняют alembic одновременно и стартуют быстрее
+if [ "$FAST_START" = "true" ]; then
+  echo "FAST_START: migrations are skipped"
+else
+  echo "Applying migrations..."
+  alembic upgrade head
+fi
 
 echo "Starting FastAPI..."
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
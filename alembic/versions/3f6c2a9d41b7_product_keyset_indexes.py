@@ -0,0 +1,34 @@
+"""product keyset indexes
+
+Revision ID: 3f6c2a9d41b7
+Revises: 91222c1238ad
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c2a9d41b7'
+down_revision: Union[str, Sequence[str], None] = '91222c1238ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False)
+    op.create_index('ix_products_text_id', 'products', ['text', 'id'], unique=False)
+    op.create_index('ix_products_brand_id_id', 'products', ['brand_id', 'id'], unique=False)
+    op.create_index('ix_products_subcategory_id_id', 'products', ['subcategory_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_subcategory_id_id', table_name='products')
+    op.drop_index('ix_products_brand_id_id', table_name='products')
+    op.drop_index('ix_products_text_id', table_name='products')
+    op.drop_index('ix_products_price_id', table_name='products')
@@ -0,0 +1,34 @@
+"""catalog counters
+
+Revision ID: 5d2e8b7c1a90
+Revises: 3f6c2a9d41b7
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8b7c1a90'
+down_revision: Union[str, Sequence[str], None] = '3f6c2a9d41b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'catalog_counters',
+        sa.Column('scope', sa.String(length=32), nullable=False),
+        sa.Column('scope_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('scope', 'scope_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_counters')
@@ -0,0 +1,38 @@
+"""product and category revision
+
+Revision ID: 8c41f0e6b2d3
+Revises: 5d2e8b7c1a90
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41f0e6b2d3'
+down_revision: Union[str, Sequence[str], None] = '5d2e8b7c1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite не добавляет колонку с непостоянным DEFAULT (CURRENT_TIMESTAMP) в непустую таблицу,
+    # поэтому updated_at добавляется пустой, заполняется и только затем получает NOT NULL и DEFAULT
+    for table in ('products', 'categories'):
+        op.add_column(table, sa.Column('revision', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=False,
+                                  server_default=sa.text('CURRENT_TIMESTAMP'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('categories', 'products'):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'revision')
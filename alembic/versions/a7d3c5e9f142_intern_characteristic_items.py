@@ -0,0 +1,59 @@
+"""intern characteristic items
+
+Revision ID: a7d3c5e9f142
+Revises: f1c9e3a7b528
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3c5e9f142'
+down_revision: Union[str, Sequence[str], None] = 'f1c9e3a7b528'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Связи продуктов переводятся на первую запись каждой пары (name, value)
+    op.execute("""
+        UPDATE product_characteristics SET characteristic_id = (
+            SELECT MIN(keep.id)
+            FROM characteristic_items keep, characteristic_items current_item
+            WHERE current_item.id = product_characteristics.characteristic_id
+              AND keep.template_id IS NULL
+              AND keep.name = current_item.name
+              AND keep.value = current_item.value
+        )
+        WHERE characteristic_id IN (SELECT id FROM characteristic_items WHERE template_id IS NULL)
+    """)
+    # Повторы одной характеристики у продукта после перевода
+    op.execute("""
+        DELETE FROM product_characteristics
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM product_characteristics GROUP BY product_id, characteristic_id
+        )
+    """)
+    op.execute("""
+        DELETE FROM characteristic_items
+        WHERE template_id IS NULL
+          AND id NOT IN (
+              SELECT MIN(id) FROM characteristic_items WHERE template_id IS NULL GROUP BY name, value
+          )
+    """)
+    op.create_index('uq_characteristic_items_name_value', 'characteristic_items', ['name', 'value'], unique=True,
+                    postgresql_where=sa.text('template_id IS NULL'), sqlite_where=sa.text('template_id IS NULL'))
+    # Уникальный индекс покрывает поиск по (name, value) в словаре, обычный индекс больше не нужен
+    op.drop_index('ix_characteristic_items_name_value', table_name='characteristic_items')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Общие записи словаря остаются общими: разделять их обратно по продуктам не нужно
+    op.create_index('ix_characteristic_items_name_value', 'characteristic_items', ['name', 'value'], unique=False)
+    op.drop_index('uq_characteristic_items_name_value', table_name='characteristic_items')
@@ -0,0 +1,59 @@
+"""product cards
+
+Revision ID: a7e3c9d15f42
+Revises: 8c41f0e6b2d3
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3c9d15f42'
+down_revision: Union[str, Sequence[str], None] = '8c41f0e6b2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_cards',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('text', sa.String(), nullable=True),
+        sa.Column('article', sa.Integer(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('discount', sa.Float(), nullable=True),
+        sa.Column('slug', sa.String(), nullable=True),
+        sa.Column('small_description', sa.Text(), nullable=True),
+        sa.Column('subcategory_id', sa.Integer(), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('brand_id', sa.Integer(), nullable=True),
+        sa.Column('image', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_product_cards_category_id_id', 'product_cards', ['category_id', 'id'], unique=False)
+    op.create_index('ix_product_cards_category_id_price_id', 'product_cards', ['category_id', 'price', 'id'], unique=False)
+    op.create_index('ix_product_cards_category_id_text_id', 'product_cards', ['category_id', 'text', 'id'], unique=False)
+
+    op.execute("""
+        INSERT INTO product_cards (id, text, article, price, discount, slug, small_description,
+                                   subcategory_id, category_id, brand_id, image)
+        SELECT p.id, p.text, p.article, p.price, p.discount, p.slug, p.small_description,
+               p.subcategory_id, s.category_id, p.brand_id,
+               (SELECT i.image_url FROM product_images i WHERE i.product_id = p.id ORDER BY i.id LIMIT 1)
+        FROM products p
+        LEFT OUTER JOIN subcategories s ON s.id = p.subcategory_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_cards_category_id_text_id', table_name='product_cards')
+    op.drop_index('ix_product_cards_category_id_price_id', table_name='product_cards')
+    op.drop_index('ix_product_cards_category_id_id', table_name='product_cards')
+    op.drop_table('product_cards')
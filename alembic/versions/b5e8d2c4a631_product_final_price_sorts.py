@@ -0,0 +1,67 @@
+"""product final price and sort indexes
+
+Revision ID: b5e8d2c4a631
+Revises: a7d3c5e9f142
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8d2c4a631'
+down_revision: Union[str, Sequence[str], None] = 'a7d3c5e9f142'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('final_price', sa.Float(), nullable=True))
+    op.add_column('product_cards', sa.Column('final_price', sa.Float(), nullable=True))
+    # Та же формула, что models.final_price: discount - сумма в валюте цены
+    op.execute("UPDATE products SET final_price = price - COALESCE(discount, 0)")
+    op.execute("""
+        UPDATE product_cards SET final_price = (
+            SELECT products.final_price FROM products WHERE products.id = product_cards.id
+        )
+    """)
+
+    op.drop_index('ix_products_price_id', table_name='products')
+    op.create_index('ix_products_final_price_id', 'products', ['final_price', 'id'], unique=False)
+    op.create_index('ix_products_discount_id', 'products', ['discount', 'id'], unique=False)
+    op.create_index('ix_products_subcategory_id_final_price_id', 'products',
+                    ['subcategory_id', 'final_price', 'id'], unique=False)
+    op.create_index('ix_products_subcategory_id_discount_id', 'products',
+                    ['subcategory_id', 'discount', 'id'], unique=False)
+    op.create_index('ix_products_subcategory_id_text_id', 'products', ['subcategory_id', 'text', 'id'], unique=False)
+    op.create_index('ix_products_in_stock_subcategory_id_id', 'products', ['subcategory_id', 'id'], unique=False,
+                    postgresql_where=sa.text('in_stock = true'), sqlite_where=sa.text('in_stock = 1'))
+
+    op.drop_index('ix_product_cards_category_id_price_id', table_name='product_cards')
+    op.create_index('ix_product_cards_category_id_final_price_id', 'product_cards',
+                    ['category_id', 'final_price', 'id'], unique=False)
+    op.create_index('ix_product_cards_category_id_discount_id', 'product_cards',
+                    ['category_id', 'discount', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_cards_category_id_discount_id', table_name='product_cards')
+    op.drop_index('ix_product_cards_category_id_final_price_id', table_name='product_cards')
+    op.create_index('ix_product_cards_category_id_price_id', 'product_cards',
+                    ['category_id', 'price', 'id'], unique=False)
+
+    op.drop_index('ix_products_in_stock_subcategory_id_id', table_name='products')
+    op.drop_index('ix_products_subcategory_id_text_id', table_name='products')
+    op.drop_index('ix_products_subcategory_id_discount_id', table_name='products')
+    op.drop_index('ix_products_subcategory_id_final_price_id', table_name='products')
+    op.drop_index('ix_products_discount_id', table_name='products')
+    op.drop_index('ix_products_final_price_id', table_name='products')
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False)
+
+    op.drop_column('product_cards', 'final_price')
+    op.drop_column('products', 'final_price')
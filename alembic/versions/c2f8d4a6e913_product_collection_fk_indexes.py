@@ -0,0 +1,39 @@
+"""product collection fk indexes
+
+Revision ID: c2f8d4a6e913
+Revises: a7e3c9d15f42
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f8d4a6e913'
+down_revision: Union[str, Sequence[str], None] = 'a7e3c9d15f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (
+    'product_images',
+    'product_characteristics',
+    'product_warehouses',
+    'documents',
+    'additional_products',
+    'product_similar',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.create_index(op.f(f'ix_{table}_product_id'), table, ['product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_index(op.f(f'ix_{table}_product_id'), table_name=table)
@@ -0,0 +1,50 @@
+"""sort columns not null
+
+Revision ID: c9f4e1b7d253
+Revises: b5e8d2c4a631
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f4e1b7d253'
+down_revision: Union[str, Sequence[str], None] = 'b5e8d2c4a631'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Курсор (k, id) > (...) не находит строки с NULL в k, а порядок NULL в DESC
+    # у SQLite и PostgreSQL разный, поэтому колонки сортировок заполняются и становятся NOT NULL
+    for table in ('products', 'product_cards'):
+        op.execute(f"UPDATE {table} SET text = '' WHERE text IS NULL")
+        op.execute(f"UPDATE {table} SET discount = 0 WHERE discount IS NULL")
+    # Та же формула, что models.final_price: товар без цены получает 0
+    op.execute("UPDATE products SET final_price = COALESCE(price - discount, 0)")
+    op.execute("""
+        UPDATE product_cards SET final_price = (
+            SELECT products.final_price FROM products WHERE products.id = product_cards.id
+        )
+    """)
+    op.execute("UPDATE product_cards SET final_price = 0 WHERE final_price IS NULL")
+
+    for table in ('products', 'product_cards'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('text', existing_type=sa.String(), nullable=False, server_default='')
+            batch_op.alter_column('discount', existing_type=sa.Float(), nullable=False, server_default='0')
+            batch_op.alter_column('final_price', existing_type=sa.Float(), nullable=False, server_default='0')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('product_cards', 'products'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('final_price', existing_type=sa.Float(), nullable=True, server_default=None)
+            batch_op.alter_column('discount', existing_type=sa.Float(), nullable=True, server_default=None)
+            batch_op.alter_column('text', existing_type=sa.String(), nullable=True, server_default=None)
@@ -0,0 +1,36 @@
+"""product changes
+
+Revision ID: d3a7f5c8e914
+Revises: c9f4e1b7d253
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a7f5c8e914'
+down_revision: Union[str, Sequence[str], None] = 'c9f4e1b7d253'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Без внешнего ключа: строка удаленного товара остается, чтобы сверка индекса сняла его с карт
+    op.create_table(
+        'product_changes',
+        sa.Column('product_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('product_id')
+    )
+    op.create_index(op.f('ix_product_changes_seq'), 'product_changes', ['seq'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_product_changes_seq'), table_name='product_changes')
+    op.drop_table('product_changes')
@@ -0,0 +1,33 @@
+"""characteristic filter indexes
+
+Revision ID: e4b7a2f9c315
+Revises: c2f8d4a6e913
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a2f9c315'
+down_revision: Union[str, Sequence[str], None] = 'c2f8d4a6e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_characteristic_items_name_value', 'characteristic_items', ['name', 'value'], unique=False)
+    op.create_index('ix_characteristic_items_label_value', 'characteristic_items', ['label', 'value'], unique=False)
+    op.create_index('ix_product_characteristics_characteristic_id_product_id', 'product_characteristics',
+                    ['characteristic_id', 'product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_characteristics_characteristic_id_product_id', table_name='product_characteristics')
+    op.drop_index('ix_characteristic_items_label_value', table_name='characteristic_items')
+    op.drop_index('ix_characteristic_items_name_value', table_name='characteristic_items')
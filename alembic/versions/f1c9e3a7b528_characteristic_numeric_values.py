@@ -0,0 +1,39 @@
+"""characteristic numeric values
+
+Revision ID: f1c9e3a7b528
+Revises: e4b7a2f9c315
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import units
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c9e3a7b528'
+down_revision: Union[str, Sequence[str], None] = 'e4b7a2f9c315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('characteristic_items', sa.Column('numeric_value', sa.Float(), nullable=True))
+    op.add_column('characteristic_items', sa.Column('unit', sa.String(length=16), nullable=True))
+    units.backfill(op.get_bind())
+    op.create_index('ix_characteristic_items_name_numeric_value', 'characteristic_items',
+                    ['name', 'numeric_value'], unique=False)
+    op.create_index('ix_characteristic_items_label_numeric_value', 'characteristic_items',
+                    ['label', 'numeric_value'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_characteristic_items_label_numeric_value', table_name='characteristic_items')
+    op.drop_index('ix_characteristic_items_name_numeric_value', table_name='characteristic_items')
+    op.drop_column('characteristic_items', 'unit')
+    op.drop_column('characteristic_items', 'numeric_value')
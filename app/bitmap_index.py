@@ -0,0 +1,474 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import database, models
+
+# Необязательный индекс фильтров в памяти процесса. Для каждой пары (характеристика, значение),
+# тега, бренда, подкатегории и признака наличия хранится сжатая битовая карта id товаров (Bitmap).
+# Фильтр и счетчики фасетов считаются пересечением карт, SQL нужен только для строк страницы.
+# Индекс строится при старте. Изменения из других воркеров находит сверка по журналу product_changes:
+# каждая запись товаров получает возрастающий номер (crud.record_product_changes), и сверка
+# перечитывает только товары с номером больше последнего увиденного. Сверка идет в фоновом
+# потоке не чаще раза в BITMAP_INDEX_SYNC_SECONDS; запросы тем временем работают с текущим индексом.
+
+BITMAP_INDEX_ENABLED = os.getenv("BITMAP_INDEX_ENABLED", "false").lower() == "true"
+BITMAP_INDEX_SYNC_SECONDS = float(os.getenv("BITMAP_INDEX_SYNC_SECONDS", "2"))
+# При сортировке не по id страница выбирается SQL среди id из карты - не больше стольких совпадений
+BITMAP_INDEX_SORT_LIMIT = int(os.getenv("BITMAP_INDEX_SORT_LIMIT", "1000"))
+
+# Карта делится на блоки по 2^16 id, как в roaring bitmap. Блок до SPARSE_LIMIT элементов - frozenset
+# младших 16 бит (около 50 байт на элемент), плотнее - целое число на 2^16 бит (не больше 8 КБ).
+# Пустые блоки не хранятся, поэтому карта занимает не больше min(50 * n, 8 КБ * число блоков) байт,
+# а не max(id) / 8, как одно целое число на весь диапазон id.
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+SPARSE_LIMIT = 128
+
+
+def _bits(chunk) -> List[int]:
+    """Младшие биты блока по возрастанию"""
+    if not isinstance(chunk, int):
+        return sorted(chunk)
+    bits = []
+    for offset, byte in enumerate(chunk.to_bytes((chunk.bit_length() + 7) // 8, "little")):
+        while byte:
+            low = byte & -byte
+            bits.append(offset * 8 + low.bit_length() - 1)
+            byte ^= low
+    return bits
+
+
+def _dense(chunk) -> int:
+    if isinstance(chunk, int):
+        return chunk
+    buffer = bytearray(max(chunk) // 8 + 1 if chunk else 0)
+    for low in chunk:
+        buffer[low >> 3] |= 1 << (low & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _count(chunk) -> int:
+    return chunk.bit_count() if isinstance(chunk, int) else len(chunk)
+
+
+def _compact(chunk):
+    """Блок в подходящем представлении; пустой - None"""
+    count = _count(chunk)
+    if count == 0:
+        return None
+    if count <= SPARSE_LIMIT:
+        return frozenset(_bits(chunk)) if isinstance(chunk, int) else chunk
+    return _dense(chunk)
+
+
+def _and(left, right):
+    if isinstance(left, int) and isinstance(right, int):
+        return left & right
+    if isinstance(left, int):
+        left, right = right, left
+    if isinstance(right, int):
+        return frozenset(low for low in left if right >> low & 1)
+    return left & right
+
+
+def _or(left, right):
+    if isinstance(left, int) or isinstance(right, int):
+        return _dense(left) | _dense(right)
+    return left | right
+
+
+def _difference(left, right):
+    if isinstance(left, int):
+        return left & ~_dense(right)
+    if isinstance(right, int):
+        return frozenset(low for low in left if not right >> low & 1)
+    return left - right
+
+
+class Bitmap:
+    """Сжатое множество id: блоки неизменяемы, операции возвращают новую карту"""
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks: Optional[dict] = None):
+        self.chunks = chunks if chunks is not None else {}
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]) -> "Bitmap":
+        groups = {}
+        for product_id in ids:
+            groups.setdefault(product_id >> CHUNK_BITS, []).append(product_id & CHUNK_MASK)
+        return cls({key: _compact(frozenset(lows)) for key, lows in groups.items()})
+
+    def _combine(self, other: "Bitmap", operation, keys) -> "Bitmap":
+        chunks = {}
+        for key in keys:
+            chunk = operation(self.chunks.get(key, frozenset()), other.chunks.get(key, frozenset()))
+            chunk = _compact(chunk)
+            if chunk is not None:
+                chunks[key] = chunk
+        return Bitmap(chunks)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        smaller, larger = sorted((self.chunks, other.chunks), key=len)
+        return self._combine(other, _and, [key for key in smaller if key in larger])
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, _or, self.chunks.keys() | other.chunks.keys())
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, _difference, list(self.chunks))
+
+    def __len__(self) -> int:
+        return sum(_count(chunk) for chunk in self.chunks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+
+    def __contains__(self, product_id: int) -> bool:
+        chunk = self.chunks.get(product_id >> CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = product_id & CHUNK_MASK
+        return bool(chunk >> low & 1) if isinstance(chunk, int) else low in chunk
+
+    def add(self, product_id: int):
+        key = product_id >> CHUNK_BITS
+        chunk = _or(self.chunks.get(key, frozenset()), frozenset((product_id & CHUNK_MASK,)))
+        self.chunks[key] = _compact(chunk)
+
+    def discard(self, product_id: int):
+        key = product_id >> CHUNK_BITS
+        if key not in self.chunks:
+            return
+        chunk = _compact(_difference(self.chunks[key], frozenset((product_id & CHUNK_MASK,))))
+        if chunk is None:
+            del self.chunks[key]
+        else:
+            self.chunks[key] = chunk
+
+    def copy(self) -> "Bitmap":
+        return Bitmap(dict(self.chunks))
+
+    def ids(self, skip: int = 0, limit: Optional[int] = None) -> List[int]:
+        """id по возрастанию, со сдвигом и ограничением"""
+        ids = []
+        for key in sorted(self.chunks):
+            chunk = self.chunks[key]
+            count = _count(chunk)
+            if skip >= count:
+                skip -= count
+                continue
+            base = key << CHUNK_BITS
+            for low in _bits(chunk)[skip:]:
+                ids.append(base | low)
+                if limit is not None and len(ids) >= limit:
+                    return ids
+            skip = 0
+        return ids
+
+
+def from_ids(ids: Iterable[int]) -> Bitmap:
+    return Bitmap.from_ids(ids)
+
+
+def to_ids(bitmap: Bitmap, skip: int = 0, limit: Optional[int] = None) -> List[int]:
+    """id из карты по возрастанию, со сдвигом и ограничением"""
+    return bitmap.ids(skip, limit)
+
+
+class CharacteristicValue:
+    def __init__(self, label: str, numeric_value: Optional[float], unit: Optional[str]):
+        self.label = label
+        self.numeric_value = numeric_value
+        self.unit = unit
+        self.bitmap = Bitmap()
+
+
+class ProductEntry:
+    """Что индекс знает о товаре: нужно, чтобы снять его биты при обновлении"""
+
+    def __init__(self, subcategory_id, brand_id, in_stock, tag_ids, characteristics):
+        self.subcategory_id = subcategory_id
+        self.brand_id = brand_id
+        self.in_stock = in_stock
+        self.tag_ids = tag_ids
+        self.characteristics = characteristics
+
+
+class BitmapIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ready = False
+        self.synced_at = 0.0
+        # Последний номер журнала product_changes, уже отраженный в индексе
+        self.watermark = 0
+        self._syncing = False
+        self._reset()
+
+    def _reset(self):
+        self.products: Dict[int, ProductEntry] = {}
+        self.all = Bitmap()
+        self.in_stock = Bitmap()
+        self.subcategories: Dict[int, Bitmap] = {}
+        self.brands: Dict[int, Bitmap] = {}
+        self.tags: Dict[int, Bitmap] = {}
+        # name -> value -> CharacteristicValue
+        self.characteristics: Dict[str, Dict[str, CharacteristicValue]] = {}
+        self.names_by_label: Dict[str, set] = {}
+
+    # --- загрузка ---
+
+    def _load(self, db: Session, product_ids: Optional[list] = None) -> dict:
+        """Состояние товаров из базы: все или только product_ids"""
+        def scoped(statement, column):
+            return statement if product_ids is None else statement.where(column.in_(product_ids))
+
+        entries = {
+            row.id: ProductEntry(row.subcategory_id, row.brand_id, bool(row.in_stock), [], [])
+            for row in db.execute(scoped(
+                select(models.Product.id, models.Product.subcategory_id,
+                       models.Product.brand_id, models.Product.in_stock),
+                models.Product.id
+            ))
+        }
+        for product_id, tag_id in db.execute(scoped(
+                select(models.ProductTag.product_id, models.ProductTag.tag_id), models.ProductTag.product_id)):
+            if product_id in entries:
+                entries[product_id].tag_ids.append(tag_id)
+
+        item = models.CharacteristicItem
+        link = models.ProductCharacteristic
+        for row in db.execute(scoped(
+                select(link.product_id, item.name, item.label, item.value, item.numeric_value, item.unit)
+                .join(item, item.id == link.characteristic_id), link.product_id)):
+            if row.product_id in entries:
+                entries[row.product_id].characteristics.append(
+                    (row.name, row.label, row.value, row.numeric_value, row.unit)
+                )
+        return entries
+
+    def build(self, db: Session):
+        started = time.perf_counter()
+        # Номер читается до товаров: запись, закоммиченная между чтениями, просто перечитается при сверке
+        watermark = self._last_change(db)
+        entries = self._load(db)
+
+        subcategories, brands, tags, characteristics = {}, {}, {}, {}
+        for product_id, entry in entries.items():
+            subcategories.setdefault(entry.subcategory_id, []).append(product_id)
+            brands.setdefault(entry.brand_id, []).append(product_id)
+            for tag_id in entry.tag_ids:
+                tags.setdefault(tag_id, []).append(product_id)
+            for name, label, value, numeric_value, unit in entry.characteristics:
+                characteristics.setdefault((name, value, label, numeric_value, unit), []).append(product_id)
+
+        with self._lock:
+            self._reset()
+            self.watermark = watermark
+            self.products = entries
+            self.all = from_ids(entries)
+            self.in_stock = from_ids(product_id for product_id, entry in entries.items() if entry.in_stock)
+            self.subcategories = {key: from_ids(ids) for key, ids in subcategories.items()}
+            self.brands = {key: from_ids(ids) for key, ids in brands.items()}
+            self.tags = {key: from_ids(ids) for key, ids in tags.items()}
+            for (name, value, label, numeric_value, unit), ids in characteristics.items():
+                entry = self._characteristic(name, value, label, numeric_value, unit)
+                entry.bitmap = entry.bitmap | from_ids(ids)
+            self.synced_at = time.monotonic()
+            self.ready = True
+        print(f"Индекс фильтров построен: {len(entries)} товаров за {time.perf_counter() - started:.2f} с")
+
+    def _characteristic(self, name, value, label, numeric_value, unit) -> CharacteristicValue:
+        values = self.characteristics.setdefault(name, {})
+        entry = values.get(value)
+        if entry is None:
+            entry = values[value] = CharacteristicValue(label, numeric_value, unit)
+            self.names_by_label.setdefault(label, set()).add(name)
+        return entry
+
+    # --- инкрементальное обновление ---
+
+    # Карты индекса меняются на месте только под блокировкой; запросы получают новые карты
+    @staticmethod
+    def _set(bitmaps: dict, key, product_id: int):
+        bitmaps.setdefault(key, Bitmap()).add(product_id)
+
+    @staticmethod
+    def _clear(bitmaps: dict, key, product_id: int):
+        if key in bitmaps:
+            bitmaps[key].discard(product_id)
+
+    def _remove(self, product_id: int):
+        entry = self.products.pop(product_id, None)
+        if entry is None:
+            return
+        self.all.discard(product_id)
+        self.in_stock.discard(product_id)
+        self._clear(self.subcategories, entry.subcategory_id, product_id)
+        self._clear(self.brands, entry.brand_id, product_id)
+        for tag_id in entry.tag_ids:
+            self._clear(self.tags, tag_id, product_id)
+        for name, _, value, _, _ in entry.characteristics:
+            self.characteristics[name][value].bitmap.discard(product_id)
+
+    def _add(self, product_id: int, entry: ProductEntry):
+        self.products[product_id] = entry
+        self.all.add(product_id)
+        if entry.in_stock:
+            self.in_stock.add(product_id)
+        self._set(self.subcategories, entry.subcategory_id, product_id)
+        self._set(self.brands, entry.brand_id, product_id)
+        for tag_id in entry.tag_ids:
+            self._set(self.tags, tag_id, product_id)
+        for name, label, value, numeric_value, unit in entry.characteristics:
+            self._characteristic(name, value, label, numeric_value, unit).bitmap.add(product_id)
+
+    def refresh_products(self, db: Session, product_ids: list):
+        """Перечитать товары из базы; отсутствующие в базе снимаются с индекса"""
+        entries = self._load(db, product_ids)
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+                if product_id in entries:
+                    self._add(product_id, entries[product_id])
+
+    @staticmethod
+    def _last_change(db: Session) -> int:
+        return db.scalar(select(func.coalesce(func.max(models.ProductChange.seq), 0)))
+
+    def sync(self, db: Session):
+        """Перечитать товары, измененные любым воркером после watermark: новые, правленые и удаленные.
+        Номера выдаются в порядке коммитов, поэтому запись, еще не закоммиченная при чтении журнала,
+        получит номер больше прочитанных и попадет в следующую сверку"""
+        change = models.ProductChange
+        with self._lock:
+            watermark = self.watermark
+        rows = db.execute(select(change.product_id, change.seq).where(change.seq > watermark)).all()
+        if not rows:
+            return
+        # Строка product_id = 0 - счетчик номеров, а не товар
+        self.refresh_products(db, [product_id for product_id, _ in rows if product_id])
+        with self._lock:
+            self.watermark = max(self.watermark, max(seq for _, seq in rows))
+
+    def sync_soon(self):
+        """Запустить сверку в фоновом потоке, если подошел срок и она еще не идет"""
+        with self._lock:
+            if self._syncing or time.monotonic() - self.synced_at < BITMAP_INDEX_SYNC_SECONDS:
+                return
+            self._syncing = True
+        threading.Thread(target=self._sync_in_background, name="bitmap-index-sync", daemon=True).start()
+
+    def _sync_in_background(self):
+        db = database.SessionLocal()
+        try:
+            self.sync(db)
+        except Exception as e:
+            print(f"Ошибка сверки индекса фильтров: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._syncing = False
+                self.synced_at = time.monotonic()
+
+    # --- запросы ---
+
+    def characteristic_bitmap(self, characteristic_filter) -> Bitmap:
+        """Товары, подходящие под фильтр по одной характеристике (по имени или подписи)"""
+        names = {characteristic_filter.name} | self.names_by_label.get(characteristic_filter.name, set())
+        values = [
+            (value, entry) for name in names for value, entry in self.characteristics.get(name, {}).items()
+            if entry.bitmap
+        ]
+        numeric = any(entry.numeric_value is not None for _, entry in values)
+        result = Bitmap()
+        for value, entry in values:
+            if characteristic_filter.matches(value, entry.numeric_value, numeric):
+                result = result | entry.bitmap
+        return result
+
+    def base_bitmap(self, subcategory_id: Optional[int] = None, brand_id: Optional[int] = None,
+                    in_stock: Optional[bool] = None, tag_id: Optional[int] = None) -> Bitmap:
+        # Копия: карты индекса меняются на месте, а результат читается уже без блокировки
+        result = self.all.copy()
+        if subcategory_id is not None:
+            result = result & self.subcategories.get(subcategory_id, Bitmap())
+        if brand_id is not None:
+            result = result & self.brands.get(brand_id, Bitmap())
+        if tag_id is not None:
+            result = result & self.tags.get(tag_id, Bitmap())
+        if in_stock is True:
+            result = result & self.in_stock
+        elif in_stock is False:
+            result = result - self.in_stock
+        return result
+
+    def match(self, filters, **base) -> Bitmap:
+        with self._lock:
+            result = self.base_bitmap(**base)
+            for characteristic_filter in filters:
+                result = result & self.characteristic_bitmap(characteristic_filter)
+            return result
+
+    def facets(self, subcategory_id: int, filters, **base) -> list:
+        """Те же фасеты, что facets.facet_statement: счетчик значения без фильтра его характеристики"""
+        with self._lock:
+            products = self.base_bitmap(subcategory_id=subcategory_id, **base)
+            filter_bitmaps = [(item, self.characteristic_bitmap(item)) for item in filters]
+            result = []
+            for name in sorted(self.characteristics):
+                scope = products
+                for item, bitmap in filter_bitmaps:
+                    if item.name != name and name not in self.names_by_label.get(item.name, set()):
+                        scope = scope & bitmap
+                present = [
+                    (value, entry) for value, entry in self.characteristics[name].items()
+                    if entry.bitmap & products
+                ]
+                if not present:
+                    continue
+                present.sort(key=lambda pair: (pair[1].numeric_value is None, pair[1].numeric_value or 0, pair[0]))
+                numbers = [entry.numeric_value for _, entry in present if entry.numeric_value is not None]
+                result.append({
+                    "name": name,
+                    "label": present[0][1].label,
+                    "unit": next((entry.unit for _, entry in present if entry.numeric_value is not None), None),
+                    "min": min(numbers) if numbers else None,
+                    "max": max(numbers) if numbers else None,
+                    "values": [
+                        {"value": value, "count": len(entry.bitmap & scope)} for value, entry in present
+                    ],
+                })
+            return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": BITMAP_INDEX_ENABLED,
+                "ready": self.ready,
+                "watermark": self.watermark,
+                "products": len(self.products),
+                "characteristic_values": sum(len(values) for values in self.characteristics.values()),
+                "tags": len(self.tags),
+                "brands": len(self.brands),
+                "subcategories": len(self.subcategories),
+            }
+
+
+index = BitmapIndex()
+
+
+def active() -> bool:
+    return BITMAP_INDEX_ENABLED and index.ready
+
+
+def refresh(db: Session, product_ids: Iterable[int]):
+    """Вызывается после commit записи товаров: индекс этого процесса обновляется сразу,
+    остальные воркеры догрузят изменения при sync"""
+    if active():
+        index.refresh_products(db, list(product_ids))
@@ -0,0 +1,192 @@
+import zlib
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select, update, delete, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import database, models
+
+# Счетчики итогов для пагинации. Строка (scope, scope_id) хранит COUNT(*) для области;
+# у глобальных областей scope_id = 0. Записи меняют счетчики в своей транзакции через adjust,
+# структурные удаления (категория, бренд, тег) сбрасывают области через invalidate.
+# Отсутствующая строка считается заново на primary при первом чтении.
+#
+# Пересчет не должен разойтись с записью, идущей одновременно: adjust по отсутствующей строке ничего
+# не меняет, поэтому запись, которую COUNT не увидел, потерялась бы. Пересчет сначала вставляет строку
+# (в SQLite это берет блокировку записи до COUNT), а в PostgreSQL еще и держит исключительную
+# advisory-блокировку области; пишущие транзакции берут разделяемую блокировку своих областей до commit.
+# Так любая запись либо попадает в COUNT, либо применяет свою дельту к уже вставленной строке.
+
+PRODUCTS = "products"
+CATEGORY_PRODUCTS = "category_products"
+SUBCATEGORY_PRODUCTS = "subcategory_products"
+BRAND_PRODUCTS = "brand_products"
+TAG_PRODUCTS = "tag_products"
+CATEGORIES = "categories"
+SUBCATEGORIES = "subcategories"
+BRANDS = "brands"
+TAGS = "tags"
+
+PRODUCT_SCOPES = (PRODUCTS, CATEGORY_PRODUCTS, SUBCATEGORY_PRODUCTS, BRAND_PRODUCTS, TAG_PRODUCTS)
+ALL_SCOPES = PRODUCT_SCOPES + (CATEGORIES, SUBCATEGORIES, BRANDS, TAGS)
+
+# Первый ключ advisory-блокировок счетчиков ("cntr"), второй - crc32 области
+LOCK_NAMESPACE = 0x636E7472
+
+
+def _lock_id(scope: str) -> int:
+    crc = zlib.crc32(scope.encode())
+    return crc - 2 ** 32 if crc >= 2 ** 31 else crc
+
+
+def _scope_locks(scopes: Iterable[str], shared: bool):
+    lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+    return select(*(lock(LOCK_NAMESPACE, _lock_id(scope)) for scope in sorted(set(scopes))))
+
+
+def _lock_for_write(db: Session, scopes: Iterable[str]):
+    """Разделяемая блокировка областей до конца транзакции записи (только PostgreSQL)"""
+    scopes = set(scopes)
+    if scopes and database.engine.dialect.name == "postgresql":
+        db.execute(_scope_locks(scopes, shared=True), bind_arguments={"bind": database.engine})
+
+
+def scope_keys(subcategory_id: Optional[int], category_id: Optional[int], brand_id: Optional[int],
+               tag_ids: Iterable[int] = ()) -> set:
+    """Области, в которые входит продукт с такими связями"""
+    keys = {(PRODUCTS, 0)}
+    if subcategory_id is not None:
+        keys.add((SUBCATEGORY_PRODUCTS, subcategory_id))
+    if category_id is not None:
+        keys.add((CATEGORY_PRODUCTS, category_id))
+    if brand_id is not None:
+        keys.add((BRAND_PRODUCTS, brand_id))
+    keys.update((TAG_PRODUCTS, tag_id) for tag_id in tag_ids)
+    return keys
+
+
+def product_scope_keys(db: Session, product_id: int) -> set:
+    row = db.execute(
+        select(models.Product.subcategory_id, models.Subcategory.category_id, models.Product.brand_id)
+        .outerjoin(models.Subcategory, models.Subcategory.id == models.Product.subcategory_id)
+        .where(models.Product.id == product_id)
+    ).first()
+    if row is None:
+        return set()
+    tag_ids = db.scalars(select(models.ProductTag.tag_id).where(models.ProductTag.product_id == product_id)).all()
+    return scope_keys(row.subcategory_id, row.category_id, row.brand_id, tag_ids)
+
+
+def _key_filter(keys):
+    return tuple_(models.CatalogCounter.scope, models.CatalogCounter.scope_id).in_(list(keys))
+
+
+def adjust(db: Session, keys: Iterable[tuple], delta: int):
+    """Изменить счетчики в текущей транзакции; несуществующие строки досчитаются при чтении"""
+    keys = set(keys)
+    if keys and delta:
+        _lock_for_write(db, (scope for scope, _ in keys))
+        db.execute(
+            update(models.CatalogCounter)
+            .where(_key_filter(keys))
+            .values(total=models.CatalogCounter.total + delta)
+        )
+
+
+def move(db: Session, before: set, after: set):
+    """Продукт сменил подкатегорию, бренд или теги"""
+    adjust(db, before - after, -1)
+    adjust(db, after - before, 1)
+
+
+def invalidate(db: Session, *scopes: str, scope_id: Optional[int] = None):
+    """Сбросить области целиком (или один scope_id); пересчет произойдет при следующем чтении"""
+    _lock_for_write(db, scopes)
+    condition = models.CatalogCounter.scope.in_(scopes)
+    if scope_id is not None:
+        condition = condition & (models.CatalogCounter.scope_id == scope_id)
+    db.execute(delete(models.CatalogCounter).where(condition))
+
+
+def invalidate_keys(db: Session, keys: Iterable[tuple]):
+    keys = set(keys)
+    if keys:
+        _lock_for_write(db, (scope for scope, _ in keys))
+        db.execute(delete(models.CatalogCounter).where(_key_filter(keys)))
+
+
+def _counter_statement(scope: str, scope_id: int):
+    return select(models.CatalogCounter.total).where(
+        models.CatalogCounter.scope == scope, models.CatalogCounter.scope_id == scope_id
+    )
+
+
+def total_column(scope: str, scope_id: int):
+    """Счетчик как скалярный подзапрос - итог страницы в том же запросе (crud.paginate); NULL, если строки нет"""
+    return _counter_statement(scope, scope_id).scalar_subquery()
+
+
+def _recount_statements(dialect_name: str, scope: str, scope_id: int):
+    """Шаги пересчета в одной транзакции primary: блокировка области (PostgreSQL),
+    вставка строки-заготовки, установка total из COUNT"""
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    lock = _scope_locks([scope], shared=False) if dialect_name == "postgresql" else None
+    placeholder = dialect.insert(models.CatalogCounter).values(
+        scope=scope, scope_id=scope_id, total=0
+    ).on_conflict_do_nothing()
+    return lock, placeholder
+
+
+def _set_total(scope: str, scope_id: int, count_statement):
+    return (
+        update(models.CatalogCounter)
+        .where(models.CatalogCounter.scope == scope, models.CatalogCounter.scope_id == scope_id)
+        .values(total=count_statement.scalar_subquery())
+        .returning(models.CatalogCounter.total)
+    )
+
+
+def get_total(db: Session, scope: str, scope_id: int, count_statement) -> int:
+    total = db.scalar(_counter_statement(scope, scope_id))
+    if total is not None:
+        return total
+
+    # Пересчет идет на primary в отдельной транзакции, чтобы не зависеть от отставания реплики
+    # и не коммитить чужую сессию
+    with database.engine.connect() as conn:
+        lock, placeholder = _recount_statements(conn.dialect.name, scope, scope_id)
+        if lock is not None:
+            conn.execute(lock)
+        if conn.execute(placeholder).rowcount:
+            total = conn.scalar(_set_total(scope, scope_id, count_statement))
+        else:
+            # Строку успел вставить другой пересчет
+            total = conn.scalar(_counter_statement(scope, scope_id))
+        conn.commit()
+    return total
+
+
+async def get_total_async(db: AsyncSession, scope: str, scope_id: int, count_statement) -> int:
+    total = await db.scalar(_counter_statement(scope, scope_id))
+    if total is not None:
+        return total
+
+    async with database.async_engine.connect() as conn:
+        lock, placeholder = _recount_statements(conn.dialect.name, scope, scope_id)
+        if lock is not None:
+            await conn.execute(lock)
+        if (await conn.execute(placeholder)).rowcount:
+            total = await conn.scalar(_set_total(scope, scope_id, count_statement))
+        else:
+            total = await conn.scalar(_counter_statement(scope, scope_id))
+        await conn.commit()
+    return total
+
+
+def rebuild(db: Session):
+    """Сбросить все счетчики; они пересчитаются при первом чтении"""
+    _lock_for_write(db, ALL_SCOPES)
+    db.execute(delete(models.CatalogCounter))
+    db.commit()
@@ -1,8 +1,9 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy import func, insert, select, update, or_, literal, cast, null, String, union_all, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from text_unidecode import unidecode
-from . import models, schemas, auth
+from . import models, schemas, auth, lookups, pagination, counters, product_cards, bitmap_index, units
 from datetime import datetime, timedelta
 import random
 import string
@@ -161,7 +162,7 @@ def revoke_all_user_tokens(db: Session, user_id: int):
 
 
 def get_categories_count(db: Session) -> int:
-    return db.query(models.Category).count()
+    return counters.get_total(db, counters.CATEGORIES, 0, select(func.count(models.Category.id)))
 
 
 def get_categories(db: Session, skip: int = 0, limit: int = 100):
@@ -173,7 +174,7 @@ def get_category_by_id(db: Session, category_id: int):
 
 
 def get_category_by_slug(db: Session, slug: str):
-    return db.query(models.Category).filter(models.Category.slug == slug).first()
+    return db.execute(lookups.CATEGORY_BY_SLUG, {"slug": slug}).scalars().first()
 
 
 def search_categories(db: Session, search_term: str, skip: int = 0, limit: int = 100):
@@ -198,6 +199,7 @@ def create_category(db: Session, category: schemas.CategoryCreate):
 
     db_category = models.Category(**category.dict())
     db.add(db_category)
+    counters.adjust(db, [(counters.CATEGORIES, 0)], 1)
     db.commit()
     db.refresh(db_category)
     return db_category
@@ -229,12 +231,14 @@ def delete_category(db: Session, category_id: int):
     db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
     if db_category:
         db.delete(db_category)
+        product_cards.refresh(db, product_cards.cards_where(models.ProductCard.category_id == category_id))
+        counters.invalidate(db, *counters.PRODUCT_SCOPES, counters.CATEGORIES, counters.SUBCATEGORIES)
         db.commit()
     return db_category
 
 
 def get_subcategories_count(db: Session) -> int:
-    return db.query(models.Subcategory).count()
+    return counters.get_total(db, counters.SUBCATEGORIES, 0, select(func.count(models.Subcategory.id)))
 
 
 def get_subcategories(db: Session, skip: int = 0, limit: int = 100):
@@ -246,7 +250,7 @@ def get_subcategory_by_id(db: Session, subcategory_id: int):
 
 
 def get_subcategory_by_slug(db: Session, slug: str):
-    return db.query(models.Subcategory).filter(models.Subcategory.slug == slug).first()
+    return db.execute(lookups.SUBCATEGORY_BY_SLUG, {"slug": slug}).scalars().first()
 
 
 def get_products_count_by_subcategory(db: Session, subcategory_id: int) -> int:
@@ -264,6 +268,7 @@ def search_subcategories(db: Session, search_term: str, skip: int = 0, limit: in
 def create_subcategory(db: Session, subcategory: schemas.SubcategoryCreate):
     db_subcategory = models.Subcategory(**subcategory.dict())
     db.add(db_subcategory)
+    counters.adjust(db, [(counters.SUBCATEGORIES, 0)], 1)
     db.commit()
     db.refresh(db_subcategory)
     return db_subcategory
@@ -281,9 +286,19 @@ def update_subcategory(db: Session, subcategory_id: int, subcategory_update: sch
         if new_slug is not None:
             update_data['slug'] = new_slug
 
+        old_category_id = db_subcategory.category_id
+        category_changed = update_data.get('category_id', old_category_id) != old_category_id
         for key, value in update_data.items():
             setattr(db_subcategory, key, value)
 
+        touch_products(db, models.Product.subcategory_id == subcategory_id)
+        if category_changed:
+            product_cards.refresh(db, product_cards.cards_where(models.ProductCard.subcategory_id == subcategory_id))
+            # Продукты подкатегории переходят в другую категорию: оба счетчика пересчитаются при чтении
+            counters.invalidate_keys(db, [
+                (counters.CATEGORY_PRODUCTS, old_category_id),
+                (counters.CATEGORY_PRODUCTS, db_subcategory.category_id),
+            ])
         db.commit()
         db.refresh(db_subcategory)
     return db_subcategory
@@ -297,6 +312,8 @@ def delete_subcategory(db: Session, subcategory_id: int):
     subcategory = db.query(models.Subcategory).filter(models.Subcategory.id == subcategory_id).first()
     if subcategory:
         db.delete(subcategory)
+        # Те же области, что сбрасывает маршрут удаления подкатегории
+        counters.invalidate(db, *counters.PRODUCT_SCOPES, counters.SUBCATEGORIES)
         db.commit()
         return {"message": "Subcategory deleted successfully"}
     return None
@@ -313,6 +330,7 @@ def get_brand_by_id(db: Session, brand_id: int):
 def create_brand(db: Session, brand: schemas.BrandCreate):
     db_brand = models.Brand(**brand.dict())
     db.add(db_brand)
+    counters.adjust(db, [(counters.BRANDS, 0)], 1)
     db.commit()
     db.refresh(db_brand)
     return db_brand
@@ -323,6 +341,7 @@ def update_brand(db: Session, brand_id: int, brand: schemas.BrandCreate):
     if db_brand:
         for key, value in brand.dict().items():
             setattr(db_brand, key, value)
+        touch_products(db, models.Product.brand_id == brand_id)
         db.commit()
         db.refresh(db_brand)
     return db_brand
@@ -331,7 +350,11 @@ def update_brand(db: Session, brand_id: int, brand: schemas.BrandCreate):
 def delete_brand(db: Session, brand_id: int):
     db_brand = db.query(models.Brand).filter(models.Brand.id == brand_id).first()
     if db_brand:
+        touch_products(db, models.Product.brand_id == brand_id)
         db.delete(db_brand)
+        product_cards.refresh(db, product_cards.cards_where(models.ProductCard.brand_id == brand_id))
+        counters.adjust(db, [(counters.BRANDS, 0)], -1)
+        counters.invalidate_keys(db, [(counters.BRAND_PRODUCTS, brand_id)])
         db.commit()
     return db_brand
 
@@ -341,6 +364,14 @@ def get_characteristic_templates(db: Session, skip: int = 0, limit: int = 100) -
     return db.query(models.CharacteristicTemplate).offset(skip).limit(limit).all()
 
 
+def get_characteristic_templates_page(db: Session, skip: int = 0, limit: int = 100, search_term: Optional[str] = None):
+    """Страница шаблонов характеристик и их общее количество одним запросом; search_term - поиск по названию"""
+    statement = select(models.CharacteristicTemplate).order_by(models.CharacteristicTemplate.id)
+    if search_term:
+        statement = statement.where(models.CharacteristicTemplate.name.ilike(f"%{search_term}%"))
+    return paginate(db, statement, skip, limit)
+
+
 def get_characteristic_templates_count(db: Session) -> int:
     """Получить общее количество шаблонов характеристик"""
     return db.query(models.CharacteristicTemplate).count()
@@ -458,46 +489,104 @@ def delete_characteristic_template(db: Session, template_id: int) -> bool:
     return True
 
 
+# Страница и общее число строк одним запросом. К запросу страницы добавляется колонка total_count:
+# по умолчанию COUNT(*) OVER() - окно считается по всей выборке до OFFSET/LIMIT, одинаково
+# в Postgres и SQLite (>= 3.25). Для областей со счетчиком (catalog_counters) вместо окна
+# передается скалярный подзапрос к счетчику. Пустая страница (за последней) итог не несет,
+# тогда он досчитывается отдельно.
+PAGE_TOTAL = "total_count"
+
+
+def page_statement(statement, skip: int, limit: int, total=None):
+    """statement с колонкой total_count, OFFSET и LIMIT; total - свое выражение итога вместо окна"""
+    total = func.count().over() if total is None else total
+    return statement.add_columns(total.label(PAGE_TOTAL)).offset(skip).limit(limit)
+
+
+def split_page_total(statement, rows):
+    """(элементы, итог или None для пустой страницы); запрос одной сущности/колонки дает сами значения"""
+    total = rows[0][-1] if rows else None
+    if len(statement.column_descriptions) == 1:
+        return [row[0] for row in rows], total
+    return rows, total
+
+
+def count_statement(statement):
+    return select(func.count()).select_from(statement.order_by(None).subquery())
+
+
+def paginate(db: Session, statement, skip: int, limit: int, total=None, count=None):
+    """Строки страницы и общее число строк за один запрос к базе.
+    count - функция досчета итога, если страница пуста или счетчик не заведен"""
+    items, page_total = split_page_total(statement, db.execute(page_statement(statement, skip, limit, total)).all())
+    if page_total is None:
+        page_total = count() if count is not None else db.scalar(count_statement(statement))
+    return items, page_total
+
+
+def build_product_list(product_rows, image_rows, tag_rows, characteristic_rows) -> List[dict]:
+    """Собрать словари листинга из строк продуктов и пакетных выборок связей"""
+    products = {}
+    for row in product_rows:
+        products[row.id] = {**row._mapping, "characteristics": [], "images": [], "tags": []}
+        # Строки из paginate несут итог страницы
+        products[row.id].pop(PAGE_TOTAL, None)
+
+    for product_id, image_url in image_rows:
+        products[product_id]["images"].append(image_url)
+    for product_id, tag_id, name, value in tag_rows:
+        products[product_id]["tags"].append({"id": tag_id, "name": name, "value": value})
+    for product_id, name, label, value in characteristic_rows:
+        products[product_id]["characteristics"].append({"name": name, "label": label, "value": value})
+
+    return list(products.values())
+
+
+def product_list_query(sort_key: pagination.SortKey = pagination.PRODUCT_SORTS["id"],
+                       after: Optional[list] = None, conditions=()):
+    """Запрос строк листинга без OFFSET/LIMIT (для paginate)"""
+    return sort_key.apply(select(*lookups.PRODUCT_LIST_COLUMNS).where(*conditions), after)
+
+
+def product_list_statement(skip: int = 0, limit: int = 100,
+                           sort_key: pagination.SortKey = pagination.PRODUCT_SORTS["id"],
+                           after: Optional[list] = None, conditions=()):
+    return product_list_query(sort_key, after, conditions).offset(skip).limit(limit)
+
+
 def get_products(db: Session, skip: int = 0, limit: int = 100):
-    products = db.query(models.Product).options(
-        joinedload(models.Product.images),
-        joinedload(models.Product.tags)
-    ).offset(skip).limit(limit).all()
+    # Фиксированное число запросов на страницу: продукты, изображения, теги, характеристики
+    product_rows = db.execute(product_list_statement(skip, limit)).all()
+    if not product_rows:
+        return []
+
+    params = {"product_ids": [row.id for row in product_rows]}
+    return build_product_list(
+        product_rows,
+        db.execute(lookups.IMAGES_BY_PRODUCT_IDS, params).all(),
+        db.execute(lookups.TAGS_BY_PRODUCT_IDS, params).all(),
+        db.execute(lookups.CHARACTERISTICS_BY_PRODUCT_IDS, params).all()
+    )
 
-    products_data = []
-    for product in products:
-        images = db.query(models.ProductImage.image_url).filter(
-            models.ProductImage.product_id == product.id
-        ).all()
-
-        product_data = {
-            "id": product.id,
-            "text": product.text,
-            "article": product.article,
-            "price": product.price,
-            "discount": product.discount,
-            "slug": product.slug,
-            "in_stock": product.in_stock,
-            "small_description": product.small_description,
-            "full_description": product.full_description,
-            "subcategory_id": product.subcategory_id,
-            "brand_id": product.brand_id,
-            "characteristics": product.characteristics,
-            "images": [img.image_url for img in images],
-            "tags": [{"id": tag.id, "name": tag.name, "value": tag.value} for tag in product.tags]
-        }
-        products_data.append(product_data)
 
-    return products_data
+def iter_product_batches(db: Session, batch_size: int = 500):
+    """Все продукты пачками: строки читаются серверным курсором, связи - пакетными запросами на пачку"""
+    result = db.execute(
+        select(*lookups.PRODUCT_LIST_COLUMNS).order_by(models.Product.id).execution_options(yield_per=batch_size)
+    )
+    for product_rows in result.partitions():
+        params = {"product_ids": [row.id for row in product_rows]}
+        yield build_product_list(
+            product_rows,
+            db.execute(lookups.IMAGES_BY_PRODUCT_IDS, params).all(),
+            db.execute(lookups.TAGS_BY_PRODUCT_IDS, params).all(),
+            db.execute(lookups.CHARACTERISTICS_BY_PRODUCT_IDS, params).all()
+        )
 
 
 def get_product_by_id(db: Session, product_id: int):
     return db.query(models.Product).options(
-        joinedload(models.Product.images),
-        joinedload(models.Product.tags),
-        joinedload(models.Product.warehouses),
-        joinedload(models.Product.documents),
-        joinedload(models.Product.additional_products)
+        *lookups.PRODUCT_DETAIL_OPTIONS
     ).filter(models.Product.id == product_id).first()
 
 
@@ -505,16 +594,7 @@ def get_product_by_slug(db: Session, slug: str):
     """
     Получить продукт по slug со всеми отношениями
     """
-    return db.query(models.Product).options(
-        joinedload(models.Product.images),
-        joinedload(models.Product.tags),
-        joinedload(models.Product.brand),
-        joinedload(models.Product.subcategory),
-        joinedload(models.Product.warehouses),
-        joinedload(models.Product.documents),
-        joinedload(models.Product.additional_products),
-        joinedload(models.Product.characteristics_assoc).joinedload(models.ProductCharacteristic.characteristic)
-    ).filter(models.Product.slug == slug).first()
+    return db.execute(lookups.PRODUCT_BY_SLUG, {"slug": slug}).unique().scalars().first()
 
 
 def get_product_by_article(db: Session, article: int):
@@ -583,38 +663,142 @@ def create_product(db: Session, product: schemas.ProductCreate):
             )
             db.add(product_image)
 
-    # Добавление характеристик
+    # Добавление характеристик: значения берутся из общего словаря
     if hasattr(product, 'characteristics') and product.characteristics:
-        for char_data in product.characteristics:
-            # Создаем CharacteristicItem
-            characteristic = models.CharacteristicItem(
-                name=char_data.name,
-                label=char_data.label,
-                value=char_data.value
-            )
-            db.add(characteristic)
-            db.flush()  # Получаем ID характеристики
-
-            # Создаем связь с продуктом
-            product_char = models.ProductCharacteristic(
-                product_id=db_product.id,
-                characteristic_id=characteristic.id
-            )
-            db.add(product_char)
-
+        characteristic_ids = intern_characteristics(db, [
+            {"name": char_data.name, "label": char_data.label, "value": char_data.value}
+            for char_data in product.characteristics
+        ])
+        db.execute(insert(models.ProductCharacteristic), [
+            {"product_id": db_product.id, "characteristic_id": characteristic_id}
+            for characteristic_id in characteristic_ids
+        ])
+
+    counters.adjust(db, counters.product_scope_keys(db, db_product.id), 1)
+    product_cards.refresh(db, [db_product.id])
+    record_product_changes(db, models.Product.id == db_product.id)
     db.commit()
+    bitmap_index.refresh(db, [db_product.id])
     db.refresh(db_product)
     return db_product
 
 
+def _insert_ignoring_conflicts(db: Session, table):
+    """INSERT ... ON CONFLICT DO NOTHING для диалекта базы (Postgres или SQLite)"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+
+def intern_characteristics(db: Session, characteristics: List[dict]) -> List[int]:
+    """id словарных записей для характеристик {name, label, value}: по одному на пару (name, value)
+    в порядке первого появления, чтобы повтор пары во входных данных не давал продукту две одинаковые связи.
+    Пара хранится один раз на все продукты; недостающие пары вставляются
+    с ON CONFLICT DO NOTHING по уникальному индексу, поэтому параллельные записи не дублируют строки.
+    Подпись принадлежит паре и задается при ее создании (первой записью пары во входных данных):
+    другая подпись у уже существующей пары не сохраняется, иначе правка одного продукта
+    переименовала бы характеристику у всех продуктов с этой парой"""
+    item = models.CharacteristicItem
+    keys = list(dict.fromkeys((char["name"], char["value"]) for char in characteristics))
+    if not keys:
+        return []
+
+    def existing(pairs):
+        return {
+            (name, value): item_id
+            for item_id, name, value in db.execute(
+                select(item.id, item.name, item.value)
+                .where(item.template_id.is_(None), tuple_(item.name, item.value).in_(pairs))
+            )
+        }
+
+    ids = existing(keys)
+    missing = [key for key in keys if key not in ids]
+    if missing:
+        labels = {}
+        for char in characteristics:
+            labels.setdefault((char["name"], char["value"]), char["label"])
+        rows = []
+        # Сортировка - одинаковый порядок блокировок у параллельных транзакций
+        for name, value in sorted(missing):
+            numeric_value, unit = units.parse(value)
+            rows.append({"name": name, "label": labels[(name, value)], "value": value,
+                         "numeric_value": numeric_value, "unit": unit})
+        db.execute(
+            _insert_ignoring_conflicts(db, item.__table__).on_conflict_do_nothing(
+                index_elements=["name", "value"], index_where=item.template_id.is_(None)
+            ),
+            rows
+        )
+        ids.update(existing(missing))
+    return [ids[key] for key in keys]
+
+
+def record_product_changes(db: Session, condition):
+    """Отметить продукты по условию в журнале изменений: индексы фильтров воркеров перечитают их при сверке.
+    Номер изменения берется из строки product_id = 0, ее блокировка держится до commit -
+    поэтому записи получают номера в порядке коммитов и сверка по номеру не пропускает изменений"""
+    change = models.ProductChange.__table__
+    seq = db.execute(
+        _insert_ignoring_conflicts(db, change).values(product_id=0, seq=1)
+        .on_conflict_do_update(index_elements=["product_id"], set_={"seq": change.c.seq + 1})
+        .returning(change.c.seq)
+    ).scalar_one()
+    statement = _insert_ignoring_conflicts(db, change).from_select(
+        ["product_id", "seq"], select(models.Product.id, literal(seq)).where(condition)
+    )
+    db.execute(statement.on_conflict_do_update(index_elements=["product_id"], set_={"seq": statement.excluded.seq}))
+
+
+def touch_products(db: Session, condition):
+    """Сменить версию (ETag) продуктов по условию и продуктов, у которых они в похожих"""
+    record_product_changes(db, condition)
+    product_ids = select(models.Product.id).where(condition)
+    referencing_ids = select(models.product_similar.c.product_id).where(
+        models.product_similar.c.similar_product_id.in_(product_ids)
+    )
+    db.execute(
+        update(models.Product)
+        .where(or_(models.Product.id.in_(product_ids), models.Product.id.in_(referencing_ids)))
+        .values(revision=models.Product.revision + 1, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get_product_references(db: Session, subcategory_id: int, brand_id: Optional[int], tag_ids: List[int]):
+    """Проверить подкатегорию, бренд и теги создаваемого продукта одним запросом"""
+    queries = [
+        select(literal("subcategory").label("kind"), models.Subcategory.id,
+               cast(null(), String).label("name"), cast(null(), String).label("value"))
+        .where(models.Subcategory.id == subcategory_id)
+    ]
+    if brand_id is not None:
+        queries.append(
+            select(literal("brand"), models.Brand.id, models.Brand.name, cast(null(), String))
+            .where(models.Brand.id == brand_id)
+        )
+    if tag_ids:
+        queries.append(
+            select(literal("tag"), models.Tag.id, models.Tag.name, models.Tag.value)
+            .where(models.Tag.id.in_(tag_ids))
+        )
+
+    references = {"subcategory": False, "brand": False, "tags": {}}
+    for kind, ref_id, name, value in db.execute(union_all(*queries)):
+        if kind == "tag":
+            references["tags"][ref_id] = {"id": ref_id, "name": name, "value": value}
+        else:
+            references[kind] = True
+    return references
+
+
 def create_product_with_characteristics(
         db: Session,
-        product: schemas.ProductCreateForm,  # Измените тип здесь
+        product: schemas.ProductCreateForm,
         characteristics: List[dict],
-        image_urls: List[str]
+        image_urls: List[str],
+        tags: List[dict] = ()
 ):
-    """Создать продукт с характеристиками и изображениями"""
-    # Создаем продукт
+    """Создать продукт с изображениями, характеристиками и тегами в одной транзакции"""
     db_product = models.Product(
         text=product.text,
         price=product.price,
@@ -625,36 +809,54 @@ def create_product_with_characteristics(
         discount=product.discount,
     )
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
-
-    # Добавляем изображения
-    for image_url in image_urls:
-        product_image = models.ProductImage(
-            product_id=db_product.id,
-            image_url=image_url
-        )
-        db.add(product_image)
-
-    # Добавляем характеристики
-    for char_data in characteristics:
-        characteristic = models.CharacteristicItem(
-            name=char_data['name'],
-            label=char_data['label'],
-            value=char_data['value']
-        )
-        db.add(characteristic)
-        db.flush()
-
-        product_char = models.ProductCharacteristic(
-            product_id=db_product.id,
-            characteristic_id=characteristic.id
-        )
-        db.add(product_char)
+    db.flush()
+
+    # Связанные строки вставляются многострочными INSERT без загрузки ORM-объектов
+    if image_urls:
+        db.execute(insert(models.ProductImage), [
+            {"product_id": db_product.id, "image_url": image_url} for image_url in image_urls
+        ])
+
+    if characteristics:
+        characteristic_ids = intern_characteristics(db, characteristics)
+        db.execute(insert(models.ProductCharacteristic), [
+            {"product_id": db_product.id, "characteristic_id": characteristic_id}
+            for characteristic_id in characteristic_ids
+        ])
+
+    if tags:
+        db.execute(insert(models.ProductTag), [
+            {"product_id": db_product.id, "tag_id": tag["id"]} for tag in tags
+        ])
+
+    counters.adjust(db, counters.product_scope_keys(db, db_product.id), 1)
+    product_cards.refresh(db, [db_product.id])
+    record_product_changes(db, models.Product.id == db_product.id)
+
+    # Ответ собирается до commit: после него атрибуты продукта истекают и потребовали бы новый SELECT
+    result = {
+        "id": db_product.id,
+        "text": db_product.text,
+        "article": db_product.article,
+        "price": db_product.price,
+        "discount": db_product.discount,
+        "final_price": db_product.final_price,
+        "slug": db_product.slug,
+        "in_stock": db_product.in_stock,
+        "small_description": db_product.small_description,
+        "full_description": db_product.full_description,
+        "subcategory_id": db_product.subcategory_id,
+        "brand_id": db_product.brand_id,
+        "images": list(image_urls),
+        "characteristics": [
+            {"name": char["name"], "label": char["label"], "value": char["value"]} for char in characteristics
+        ],
+        "tags": list(tags)
+    }
 
     db.commit()
-    db.refresh(db_product)
-    return db_product
+    bitmap_index.refresh(db, [result["id"]])
+    return result
 
 def update_product(db: Session, product_id: int, product_update: schemas.ProductUpdate):
     db_product = db.query(models.Product).filter_by(id=product_id).first()
@@ -673,10 +875,28 @@ def update_product(db: Session, product_id: int, product_update: schemas.Product
     if new_slug is not None:
         update_data['slug'] = new_slug
 
+    # Смена подкатегории или бренда переносит продукт между счетчиками
+    moved = any(
+        key in update_data and update_data[key] != getattr(db_product, key) for key in ("subcategory_id", "brand_id")
+    )
+    if moved:
+        scopes_before = counters.product_scope_keys(db, db_product.id)
+
     for key, value in update_data.items():
         setattr(db_product, key, value)
 
+    # Скидка - сумма, поэтому сверяется с итоговой ценой, даже если меняется только одно из полей
+    if db_product.price is not None and (db_product.discount or 0) > db_product.price:
+        raise ValueError("Скидка не может быть больше цены")
+
+    if moved:
+        db.flush()
+        counters.move(db, scopes_before, counters.product_scope_keys(db, db_product.id))
+
+    touch_products(db, models.Product.id == product_id)
+    product_cards.refresh(db, [product_id])
     db.commit()
+    bitmap_index.refresh(db, [product_id])
     db.refresh(db_product)
 
     return {
@@ -685,6 +905,7 @@ def update_product(db: Session, product_id: int, product_update: schemas.Product
         "article": db_product.article,
         "price": db_product.price,
         "discount": db_product.discount,
+        "final_price": db_product.final_price,
         "slug": db_product.slug,
         "in_stock": db_product.in_stock,
         "small_description": db_product.small_description,
@@ -697,8 +918,12 @@ def update_product(db: Session, product_id: int, product_update: schemas.Product
 def delete_product(db: Session, product_id: int):
     db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if db_product:
+        counters.adjust(db, counters.product_scope_keys(db, product_id), -1)
+        touch_products(db, models.Product.id == product_id)
         db.delete(db_product)
+        product_cards.refresh(db, [product_id])
         db.commit()
+        bitmap_index.refresh(db, [product_id])
     return db_product
 
 
@@ -711,15 +936,18 @@ def get_brands(db: Session, skip: int = 0, limit: int = 100) -> List[models.Bran
 
 
 def count_brands(db: Session) -> int:
-    return db.query(models.Brand).count()
+    return counters.get_total(db, counters.BRANDS, 0, select(func.count(models.Brand.id)))
 
 
 def get_brand_by_id(db: Session, brand_id: int) -> models.Brand:
-    return db.query(models.Brand).filter(models.Brand.id == brand_id).first()
+    return db.execute(lookups.BRAND_BY_ID, {"brand_id": brand_id}).scalars().first()
 
 
 def count_products_by_brand(db: Session, brand_id: int):
-    return db.query(func.count(models.Product.id)).filter(models.Product.brand_id == brand_id).scalar()
+    return counters.get_total(
+        db, counters.BRAND_PRODUCTS, brand_id,
+        select(func.count(models.Product.id)).where(models.Product.brand_id == brand_id)
+    )
 
 
 def generate_tag_value(name: str) -> str:
@@ -752,6 +980,7 @@ def create_tag(db: Session, tag: schemas.TagCreate):
 
     db_tag = models.Tag(**tag.dict())
     db.add(db_tag)
+    counters.adjust(db, [(counters.TAGS, 0)], 1)
     db.commit()
     db.refresh(db_tag)
     return db_tag
@@ -762,7 +991,7 @@ def get_tag_by_id(db: Session, tag_id: int):
 
 
 def get_tag_by_value(db: Session, value: str):
-    return db.query(models.Tag).filter(models.Tag.value == value).first()
+    return db.execute(lookups.TAG_BY_VALUE, {"value": value}).scalars().first()
 
 
 def get_all_tags(db: Session, skip: int = 0, limit: int = 100):
@@ -822,6 +1051,7 @@ def update_tag(db: Session, tag_id: int, tag_data: schemas.TagUpdate):
     for field, value in update_data.items():
         setattr(db_tag, field, value)
 
+    touch_products(db, models.Product.id.in_(select(models.ProductTag.product_id).where(models.ProductTag.tag_id == tag_id)))
     db.commit()
     db.refresh(db_tag)
     return db_tag
@@ -830,8 +1060,11 @@ def update_tag(db: Session, tag_id: int, tag_data: schemas.TagUpdate):
 def delete_tag(db: Session, tag_id: int):
     db_tag = db.query(models.Tag).filter(models.Tag.id == tag_id).first()
     if db_tag:
+        touch_products(db, models.Product.id.in_(select(models.ProductTag.product_id).where(models.ProductTag.tag_id == tag_id)))
         db.query(models.ProductTag).filter(models.ProductTag.tag_id == tag_id).delete()
         db.delete(db_tag)
+        counters.adjust(db, [(counters.TAGS, 0)], -1)
+        counters.invalidate_keys(db, [(counters.TAG_PRODUCTS, tag_id)])
         db.commit()
     return db_tag
 
@@ -843,6 +1076,7 @@ def add_tags_to_product(db: Session, product_id: int, tag_ids: List[int]):
 
     tags = db.query(models.Tag).filter(models.Tag.id.in_(tag_ids)).all()
 
+    added = []
     for tag in tags:
 
         existing_link = db.query(models.ProductTag).filter(
@@ -853,17 +1087,28 @@ def add_tags_to_product(db: Session, product_id: int, tag_ids: List[int]):
         if not existing_link:
             product_tag = models.ProductTag(product_id=product_id, tag_id=tag.id)
             db.add(product_tag)
+            added.append((counters.TAG_PRODUCTS, tag.id))
 
+    counters.adjust(db, added, 1)
+    touch_products(db, models.Product.id == product_id)
     db.commit()
     db.refresh(product)
     return product
 
 
+def _unlink_product_tags(db: Session, product_id: int, tag_ids: Optional[List[int]] = None):
+    """Удалить связи продукта с тегами (все, если tag_ids не передан) и уменьшить счетчики тегов"""
+    condition = models.ProductTag.product_id == product_id
+    if tag_ids is not None:
+        condition = condition & models.ProductTag.tag_id.in_(tag_ids)
+    removed = db.scalars(select(models.ProductTag.tag_id).where(condition)).all()
+    counters.adjust(db, [(counters.TAG_PRODUCTS, tag_id) for tag_id in removed], -1)
+    db.query(models.ProductTag).filter(condition).delete()
+
+
 def remove_tags_from_product(db: Session, product_id: int, tag_ids: List[int]):
-    db.query(models.ProductTag).filter(
-        models.ProductTag.product_id == product_id,
-        models.ProductTag.tag_id.in_(tag_ids)
-    ).delete()
+    _unlink_product_tags(db, product_id, tag_ids)
+    touch_products(db, models.Product.id == product_id)
 
     db.commit()
 
@@ -873,16 +1118,14 @@ def remove_tags_from_product(db: Session, product_id: int, tag_ids: List[int]):
 
 
 def set_product_tags(db: Session, product_id: int, tag_ids: List[int]):
-    db.query(models.ProductTag).filter(
-        models.ProductTag.product_id == product_id
-    ).delete()
+    _unlink_product_tags(db, product_id)
 
     product = add_tags_to_product(db, product_id, tag_ids)
     return product
 
 
 def get_tags_count(db: Session) -> int:
-    return db.query(models.Tag).count()
+    return counters.get_total(db, counters.TAGS, 0, select(func.count(models.Tag.id)))
 
 
 def generate_slug(text: str) -> str:
@@ -0,0 +1,350 @@
+from typing import List, Optional
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from . import counters, crud, models, lookups, pagination, serializers
+
+
+# Асинхронные версии read-функций из crud.py для публичных GET-эндпоинтов.
+# Ленивая загрузка в AsyncSession невозможна, поэтому всё, что читают схемы
+# ответа, загружается явно через joinedload/selectinload.
+# Функции *_page возвращают страницу вместе с общим количеством за один запрос (crud.paginate).
+
+def _product_characteristics_option():
+    return selectinload(models.Product.characteristics_assoc).selectinload(models.ProductCharacteristic.characteristic)
+
+
+async def paginate(db: AsyncSession, statement, skip: int, limit: int, total=None, count=None):
+    """Асинхронный crud.paginate: строки страницы и общее число строк за один запрос;
+    count - корутина-функция досчета итога"""
+    rows = (await db.execute(crud.page_statement(statement, skip, limit, total))).all()
+    items, page_total = crud.split_page_total(statement, rows)
+    if page_total is None:
+        page_total = await count() if count is not None else await db.scalar(crud.count_statement(statement))
+    return items, page_total
+
+
+async def _counted_page(db: AsyncSession, statement, skip: int, limit: int, with_total: bool,
+                        scope: str, scope_id: int, count):
+    """Страница запроса одной сущности и итог области: счетчик catalog_counters читается в том же запросе"""
+    if not with_total:
+        result = await db.scalars(statement.offset(skip).limit(limit))
+        return result.all(), None
+    return await paginate(db, statement, skip, limit, total=counters.total_column(scope, scope_id), count=count)
+
+
+async def get_categories_count(db: AsyncSession) -> int:
+    return await counters.get_total_async(db, counters.CATEGORIES, 0, select(func.count(models.Category.id)))
+
+
+async def get_categories(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[list] = None):
+    statement = pagination.CATEGORY_SORT.apply(select(models.Category), after)
+    result = await db.scalars(statement.offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_categories_page(db: AsyncSession, skip: int = 0, limit: int = 100, with_total: bool = True):
+    statement = pagination.CATEGORY_SORT.apply(select(models.Category), None)
+    return await _counted_page(db, statement, skip, limit, with_total, counters.CATEGORIES, 0,
+                               lambda: get_categories_count(db))
+
+
+async def get_category_by_id(db: AsyncSession, category_id: int):
+    result = await db.scalars(select(models.Category).where(models.Category.id == category_id))
+    return result.first()
+
+
+async def get_category_by_slug(db: AsyncSession, slug: str):
+    result = await db.execute(lookups.CATEGORY_BY_SLUG, {"slug": slug})
+    return result.scalars().first()
+
+
+async def search_categories(db: AsyncSession, search_term: str, skip: int = 0, limit: int = 100,
+                            after: Optional[list] = None):
+    statement = pagination.CATEGORY_SORT.apply(
+        select(models.Category).where(models.Category.text.ilike(f"%{search_term}%")), after
+    )
+    result = await db.scalars(statement.offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_subcategories_count(db: AsyncSession) -> int:
+    return await counters.get_total_async(db, counters.SUBCATEGORIES, 0, select(func.count(models.Subcategory.id)))
+
+
+async def get_subcategories(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[list] = None):
+    statement = pagination.SUBCATEGORY_SORT.apply(
+        select(models.Subcategory).options(joinedload(models.Subcategory.category)), after
+    )
+    result = await db.scalars(statement.offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_subcategories_page(db: AsyncSession, skip: int = 0, limit: int = 100, with_total: bool = True):
+    statement = pagination.SUBCATEGORY_SORT.apply(
+        select(models.Subcategory).options(joinedload(models.Subcategory.category)), None
+    )
+    return await _counted_page(db, statement, skip, limit, with_total, counters.SUBCATEGORIES, 0,
+                               lambda: get_subcategories_count(db))
+
+
+async def get_subcategory_by_id(db: AsyncSession, subcategory_id: int):
+    result = await db.scalars(
+        select(models.Subcategory).options(
+            joinedload(models.Subcategory.category)
+        ).where(models.Subcategory.id == subcategory_id)
+    )
+    return result.first()
+
+
+async def get_subcategory_by_slug(db: AsyncSession, slug: str):
+    result = await db.execute(lookups.SUBCATEGORY_WITH_CATEGORY_BY_SLUG, {"slug": slug})
+    return result.scalars().first()
+
+
+async def search_subcategories(db: AsyncSession, search_term: str, skip: int = 0, limit: int = 100,
+                               after: Optional[list] = None):
+    statement = pagination.SUBCATEGORY_SORT.apply(
+        select(models.Subcategory).options(
+            joinedload(models.Subcategory.category)
+        ).where(
+            models.Subcategory.text.ilike(f"%{search_term}%")
+        ),
+        after
+    )
+    result = await db.scalars(statement.offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_subcategories_by_category_id(db: AsyncSession, category_id: int):
+    result = await db.scalars(
+        select(models.Subcategory).options(
+            joinedload(models.Subcategory.category)
+        ).where(models.Subcategory.category_id == category_id)
+    )
+    return result.all()
+
+
+async def get_brands(db: AsyncSession, skip: int = 0, limit: int = 100,
+                     after: Optional[list] = None) -> List[models.Brand]:
+    statement = pagination.BRAND_SORT.apply(select(models.Brand), after)
+    result = await db.scalars(statement.offset(skip).limit(limit))
+    return result.all()
+
+
+async def count_brands(db: AsyncSession) -> int:
+    return await counters.get_total_async(db, counters.BRANDS, 0, select(func.count(models.Brand.id)))
+
+
+async def get_brands_page(db: AsyncSession, skip: int = 0, limit: int = 100, with_total: bool = True):
+    statement = pagination.BRAND_SORT.apply(select(models.Brand), None)
+    return await _counted_page(db, statement, skip, limit, with_total, counters.BRANDS, 0, lambda: count_brands(db))
+
+
+async def get_brand_by_id(db: AsyncSession, brand_id: int) -> Optional[models.Brand]:
+    result = await db.execute(lookups.BRAND_BY_ID, {"brand_id": brand_id})
+    return result.scalars().first()
+
+
+async def get_products_by_brand(db: AsyncSession, brand_id: int, skip: int = 0, limit: int = 100,
+                                sort_key: pagination.SortKey = pagination.PRODUCT_SORTS["id"],
+                                after: Optional[list] = None):
+    statement = sort_key.apply(
+        select(models.Product).options(
+            selectinload(models.Product.images),
+            selectinload(models.Product.tags),
+            _product_characteristics_option()
+        ).where(models.Product.brand_id == brand_id),
+        after
+    )
+    result = await db.scalars(statement.offset(skip).limit(limit))
+    return [serializers.product(product) for product in result.all()]
+
+
+async def get_products_page_by_brand(db: AsyncSession, brand_id: int, skip: int = 0, limit: int = 100,
+                                     sort_key: pagination.SortKey = pagination.PRODUCT_SORTS["id"],
+                                     with_total: bool = True):
+    statement = sort_key.apply(
+        select(models.Product).options(
+            selectinload(models.Product.images),
+            selectinload(models.Product.tags),
+            _product_characteristics_option()
+        ).where(models.Product.brand_id == brand_id),
+        None
+    )
+    products, total = await _counted_page(db, statement, skip, limit, with_total, counters.BRAND_PRODUCTS, brand_id,
+                                          lambda: count_products_by_brand(db, brand_id))
+    return [serializers.product(product) for product in products], total
+
+
+async def count_products_by_brand(db: AsyncSession, brand_id: int) -> int:
+    return await counters.get_total_async(
+        db, counters.BRAND_PRODUCTS, brand_id,
+        select(func.count(models.Product.id)).where(models.Product.brand_id == brand_id)
+    )
+
+
+async def get_tag_by_id(db: AsyncSession, tag_id: int):
+    result = await db.scalars(select(models.Tag).where(models.Tag.id == tag_id))
+    return result.first()
+
+
+async def get_tag_by_value(db: AsyncSession, value: str):
+    result = await db.execute(lookups.TAG_BY_VALUE, {"value": value})
+    return result.scalars().first()
+
+
+async def get_all_tags(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[list] = None):
+    statement = pagination.TAG_SORT.apply(select(models.Tag), after)
+    result = await db.scalars(statement.offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_tags_count(db: AsyncSession) -> int:
+    return await counters.get_total_async(db, counters.TAGS, 0, select(func.count(models.Tag.id)))
+
+
+async def get_tags_page(db: AsyncSession, skip: int = 0, limit: int = 100, with_total: bool = True):
+    statement = pagination.TAG_SORT.apply(select(models.Tag), None)
+    return await _counted_page(db, statement, skip, limit, with_total, counters.TAGS, 0, lambda: get_tags_count(db))
+
+
+async def _get_products_by_tag(db: AsyncSession, tag: models.Tag, limit: int, with_total: bool = True):
+    statement = select(models.Product).options(
+        selectinload(models.Product.images),
+        selectinload(models.Product.tags),
+        _product_characteristics_option()
+    ).join(models.ProductTag).where(
+        models.ProductTag.tag_id == tag.id
+    ).order_by(models.Product.id.desc())
+
+    products, total = await _counted_page(
+        db, statement, 0, limit, with_total, counters.TAG_PRODUCTS, tag.id,
+        lambda: counters.get_total_async(
+            db, counters.TAG_PRODUCTS, tag.id,
+            select(func.count(models.ProductTag.product_id)).where(models.ProductTag.tag_id == tag.id)
+        )
+    )
+    return [serializers.product(product) for product in products], total
+
+
+async def get_products_by_tag_value(db: AsyncSession, tag_value: str, limit: int = 20, with_total: bool = True):
+    tag = await get_tag_by_value(db, tag_value)
+    if not tag:
+        return None, [], 0
+
+    products, total = await _get_products_by_tag(db, tag, limit, with_total)
+    return tag, products, total
+
+
+async def get_products_by_tag_id(db: AsyncSession, tag_id: int, limit: int = 20, with_total: bool = True):
+    tag = await get_tag_by_id(db, tag_id)
+    if not tag:
+        return None, [], 0
+
+    products, total = await _get_products_by_tag(db, tag, limit, with_total)
+    return tag, products, total
+
+
+async def count_products(db: AsyncSession) -> int:
+    return await counters.get_total_async(db, counters.PRODUCTS, 0, select(func.count(models.Product.id)))
+
+
+async def _build_product_list(db: AsyncSession, product_rows) -> list:
+    # Фиксированное число запросов на страницу: продукты, изображения, теги, характеристики
+    if not product_rows:
+        return []
+
+    params = {"product_ids": [row.id for row in product_rows]}
+    return crud.build_product_list(
+        product_rows,
+        (await db.execute(lookups.IMAGES_BY_PRODUCT_IDS, params)).all(),
+        (await db.execute(lookups.TAGS_BY_PRODUCT_IDS, params)).all(),
+        (await db.execute(lookups.CHARACTERISTICS_BY_PRODUCT_IDS, params)).all()
+    )
+
+
+async def get_products(db: AsyncSession, skip: int = 0, limit: int = 100,
+                       sort_key: pagination.SortKey = pagination.PRODUCT_SORTS["id"], after: Optional[list] = None,
+                       conditions=()):
+    product_rows = (await db.execute(crud.product_list_statement(skip, limit, sort_key, after, conditions))).all()
+    return await _build_product_list(db, product_rows)
+
+
+async def get_products_page(db: AsyncSession, skip: int = 0, limit: int = 100,
+                            sort_key: pagination.SortKey = pagination.PRODUCT_SORTS["id"], conditions=()):
+    """Листинг и число всех подходящих продуктов: итог приходит вместе со строками страницы.
+    Без условий итог - счетчик всех продуктов, с условиями - COUNT(*) OVER()"""
+    total, count = None, None
+    if not conditions:
+        total, count = counters.total_column(counters.PRODUCTS, 0), lambda: count_products(db)
+    product_rows, total = await paginate(
+        db, crud.product_list_query(sort_key, conditions=conditions), skip, limit, total=total, count=count
+    )
+    return await _build_product_list(db, product_rows), total
+
+
+async def get_product_version(db: AsyncSession, slug: str):
+    """id, версия продукта и версия его категории; None, если продукта нет"""
+    result = await db.execute(lookups.PRODUCT_VERSION_BY_SLUG, {"slug": slug})
+    return result.first()
+
+
+async def get_product_detail_by_slug(db: AsyncSession, slug: str):
+    """Получить продукт по slug со всеми отношениями для карточки товара"""
+    result = await db.execute(lookups.PRODUCT_BY_SLUG, {"slug": slug})
+    return result.unique().scalars().first()
+
+
+async def get_similar_cards(db: AsyncSession, product_id: int):
+    result = await db.execute(lookups.SIMILAR_CARDS_BY_PRODUCT_ID, {"product_id": product_id})
+    return result.scalars().all()
+
+
+async def lookup_product_cards(db: AsyncSession, key: str, values: list):
+    """Карточки товаров по списку id, slug или артикулов одним запросом"""
+    result = await db.execute(lookups.PRODUCT_CARDS_BY_KEY[key], {"values": values})
+    return result.scalars().all()
+
+
+async def lookup_product_details(db: AsyncSession, key: str, values: list):
+    """Товары со всеми отношениями и их похожие карточки: фиксированное число запросов на любой список"""
+    result = await db.execute(lookups.PRODUCTS_BY_KEY[key], {"values": values})
+    products = result.unique().scalars().all()
+    similar = {product.id: [] for product in products}
+    if products:
+        rows = await db.execute(lookups.SIMILAR_CARDS_BY_PRODUCT_IDS, {"product_ids": list(similar)})
+        for product_id, card in rows.all():
+            similar[product_id].append(card)
+    return products, similar
+
+
+async def get_products_by_category_id(db: AsyncSession, category_id: int, skip: int = 0, limit: int = 100,
+                                      sort_key: pagination.SortKey = pagination.CARD_SORTS["id"],
+                                      after: Optional[list] = None):
+    """Карточки товаров категории: один проход по индексу (category_id, ключ сортировки)"""
+    statement = sort_key.apply(
+        select(models.ProductCard).where(models.ProductCard.category_id == category_id),
+        after
+    )
+    result = await db.scalars(statement.offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_products_page_by_category_id(db: AsyncSession, category_id: int, skip: int = 0, limit: int = 100,
+                                           sort_key: pagination.SortKey = pagination.CARD_SORTS["id"]):
+    """Карточки категории и их общее количество: счетчик категории читается в том же запросе"""
+    statement = sort_key.apply(select(models.ProductCard).where(models.ProductCard.category_id == category_id), None)
+    return await _counted_page(db, statement, skip, limit, True, counters.CATEGORY_PRODUCTS, category_id,
+                               lambda: count_products_by_category_id(db, category_id))
+
+
+async def count_products_by_category_id(db: AsyncSession, category_id: int) -> int:
+    return await counters.get_total_async(
+        db, counters.CATEGORY_PRODUCTS, category_id,
+        select(func.count(models.Product.id)).join(
+            models.Subcategory
+        ).where(
+            models.Subcategory.category_id == category_id
+        )
+    )
@@ -1,28 +1,222 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from fastapi import Request, Response
+import ast
+import itertools
 import os
+import time
 from dotenv import load_dotenv
+from . import pool_metrics, query_stats
 
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
-    pool_size=10,
-    max_overflow=20
-)
+# Логирование каждого запроса заметно нагружает CPU, поэтому включается только явно
+SQL_ECHO = os.getenv('SQL_ECHO', 'false').lower() == 'true'
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+# Реплики только для чтения: список URL через запятую
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+DB_REPLICA_POOL_SIZE = int(os.getenv('DB_REPLICA_POOL_SIZE', str(DB_POOL_SIZE)))
+DB_REPLICA_MAX_OVERFLOW = int(os.getenv('DB_REPLICA_MAX_OVERFLOW', str(DB_MAX_OVERFLOW)))
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '5'))
+DB_REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv('DB_REPLICA_CHECK_INTERVAL_SECONDS', '10'))
+
+# Сколько секунд после записи клиент читает с primary (read-your-writes)
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '10'))
+READ_PRIMARY_COOKIE = "db_primary_until"
+READ_PRIMARY_HEADER = "X-Read-Primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# POST-маршруты, которые только читают (тело запроса вместо длинной query-строки)
+READ_ONLY_ROUTES = {"/products/lookup"}
+
+
+def is_read(request: Request) -> bool:
+    return request.method in SAFE_METHODS or request.url.path in READ_ONLY_ROUTES
+
+# Асинхронные драйверы для тех же баз: asyncpg для Postgres, aiosqlite для локального test.db
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    sa_url = make_url(url)
+    async_driver = ASYNC_DRIVERS.get(sa_url.get_backend_name())
+    if async_driver is None:
+        raise ValueError(f"Нет асинхронного драйвера для {sa_url.get_backend_name()}")
+    return sa_url.set(drivername=async_driver).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or to_async_url(DATABASE_URL)
+
+
+def build_engine(name: str, url: str, pool_size: int, max_overflow: int, **kwargs):
+    db_engine = create_engine(
+        url, echo=SQL_ECHO, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=DB_POOL_TIMEOUT,
+        poolclass=pool_metrics.InstrumentedQueuePool, **kwargs
+    )
+    query_stats.instrument_engine(db_engine)
+    pool_metrics.register(name, db_engine)
+    return db_engine
+
+
+def build_async_engine(name: str, url: str, pool_size: int, max_overflow: int, **kwargs):
+    db_engine = create_async_engine(
+        url, echo=SQL_ECHO, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=DB_POOL_TIMEOUT,
+        poolclass=pool_metrics.InstrumentedAsyncQueuePool, **kwargs
+    )
+    query_stats.instrument_engine(db_engine.sync_engine)
+    pool_metrics.register(name, db_engine.sync_engine)
+    return db_engine
+
+
+class RoutingSession(Session):
+    """Сессия, которая читает с назначенной реплики, а пишет всегда в primary"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica_bind = self.info.get("replica_bind")
+        if replica_bind is not None:
+            if not self._flushing and (clause is None or getattr(clause, "is_select", False)):
+                return replica_bind
+            # После первой записи сессия до конца работает только с primary
+            self.info.pop("replica_bind")
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+engine = build_engine("primary", DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW)
 
 SessionLocal = sessionmaker(
+    class_=RoutingSession,
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+async_engine = build_async_engine("primary_async", ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.engine = build_engine(name, url, DB_REPLICA_POOL_SIZE, DB_REPLICA_MAX_OVERFLOW, pool_pre_ping=True)
+        self.async_engine = build_async_engine(
+            f"{name}_async", to_async_url(url), DB_REPLICA_POOL_SIZE, DB_REPLICA_MAX_OVERFLOW, pool_pre_ping=True
+        )
+        self.lag_seconds = None
+        self.healthy = False
+        self.checked_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.lag_seconds is not None and self.lag_seconds <= DB_REPLICA_MAX_LAG_SECONDS
+
+    def needs_check(self, now: float) -> bool:
+        return now - self.checked_at >= DB_REPLICA_CHECK_INTERVAL_SECONDS
+
+    def lag_statement(self):
+        if self.engine.dialect.name == "postgresql":
+            return text(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )
+        return text("SELECT 0")
+
+    def set_lag(self, lag):
+        self.lag_seconds = float(lag or 0)
+        self.healthy = True
+
+    def set_failed(self, error: Exception):
+        if self.healthy:
+            print(f"❌ Реплика недоступна, чтение идет с primary: {make_url(self.url).host}: {error}")
+        self.healthy = False
+        self.lag_seconds = None
+
+
+class ReplicaSet:
+    """Реплики для чтения с проверкой отставания; при проблемах чтение уходит на primary"""
+
+    def __init__(self, urls):
+        self.replicas = [Replica(f"replica_{index}", url) for index, url in enumerate(urls, start=1)]
+        self._round_robin = itertools.count()
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def _claim_stale(self):
+        now = time.monotonic()
+        stale = [replica for replica in self.replicas if replica.needs_check(now)]
+        for replica in stale:
+            replica.checked_at = now
+        return stale
+
+    def refresh(self):
+        for replica in self._claim_stale():
+            try:
+                with replica.engine.connect() as conn:
+                    replica.set_lag(conn.execute(replica.lag_statement()).scalar())
+            except Exception as e:
+                replica.set_failed(e)
+
+    async def refresh_async(self):
+        for replica in self._claim_stale():
+            try:
+                async with replica.async_engine.connect() as conn:
+                    replica.set_lag((await conn.execute(replica.lag_statement())).scalar())
+            except Exception as e:
+                replica.set_failed(e)
+
+    def pick(self):
+        available = [replica for replica in self.replicas if replica.available]
+        if not available:
+            return None
+        return available[next(self._round_robin) % len(available)]
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+
+def wants_primary(request: Request) -> bool:
+    if not is_read(request):
+        return True
+    # Админка читает то, что только что сохранила, поэтому авторизованные запросы идут в primary
+    if request.headers.get("authorization"):
+        return True
+    if request.headers.get(READ_PRIMARY_HEADER, "").lower() in ("1", "true"):
+        return True
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_primary(response: Response):
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        str(int(time.time()) + READ_YOUR_WRITES_SECONDS),
+        max_age=READ_YOUR_WRITES_SECONDS,
+        httponly=True
+    )
+
+
 def create_initial_superuser(db: Session):
     from . import crud, schemas
 
@@ -47,14 +241,75 @@ def create_initial_superuser(db: Session):
         print("✅ Superuser already exists")
 
 
-def get_db():
+def get_db(request: Request, response: Response):
     db = SessionLocal()
+    if not is_read(request):
+        pin_primary(response)
+    elif replicas and not wants_primary(request):
+        replicas.refresh()
+        replica = replicas.pick()
+        if replica is not None:
+            db.info["replica_bind"] = replica.engine
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_async_db(request: Request, response: Response):
+    async with AsyncSessionLocal() as db:
+        if not is_read(request):
+            pin_primary(response)
+        elif replicas and not wants_primary(request):
+            await replicas.refresh_async()
+            replica = replicas.pick()
+            if replica is not None:
+                db.sync_session.info["replica_bind"] = replica.async_engine.sync_engine
+        yield db
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic", "versions")
+
+
+def _as_revision_set(value) -> set:
+    if value is None:
+        return set()
+    if isinstance(value, str):
+        return {value}
+    return set(value)
+
+
+def get_migration_heads() -> set:
+    # Импорт alembic стоит дороже самой проверки, поэтому ревизии читаются из файлов миграций напрямую
+    revisions, parents = set(), set()
+    for filename in os.listdir(MIGRATIONS_DIR):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                names = {target.id for target in targets if isinstance(target, ast.Name)}
+                if "revision" in names:
+                    revisions |= _as_revision_set(ast.literal_eval(node.value))
+                elif "down_revision" in names:
+                    parents |= _as_revision_set(ast.literal_eval(node.value))
+    return revisions - parents
+
+
+def schema_is_current() -> bool:
+    """Схема актуальна, если ревизия в alembic_version совпадает с head миграций и все таблицы на месте"""
+    try:
+        with engine.connect() as conn:
+            applied = set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+            # Часть таблиц создавалась через create_all, поэтому одной ревизии недостаточно
+            existing_tables = set(inspect(conn).get_table_names())
+    except Exception:
+        return False
+    return bool(applied) and applied == get_migration_heads() and set(Base.metadata.tables) <= existing_tables
+
+
 def check_database():
     try:
         with engine.connect() as conn:
@@ -0,0 +1,30 @@
+from fastapi import Request, Response
+
+# Сильные ETag из версий строк: ответ 304 отдается до загрузки отношений
+
+
+def make_etag(kind: str, *parts) -> str:
+    return '"' + "-".join([kind, *(str(part) for part in parts)]) + '"'
+
+
+def product_etag(product_id: int, revision: int, category_revision) -> str:
+    # Категория в карточку попадает через подкатегорию, ее версия тоже входит в тег
+    return make_etag("product", product_id, revision, category_revision or 0)
+
+
+def category_etag(category) -> str:
+    return make_etag("category", category.id, category.revision)
+
+
+def matches(request: Request, etag: str) -> bool:
+    """If-None-Match совпадает с текущим тегом (для GET допускается слабое сравнение)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from sqlalchemy import and_, case, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import bitmap_index, filtering, models
+
+# Фасеты для боковой панели фильтров: по каждой характеристике подкатегории значения с числом
+# товаров и числовые min/max. Все фасеты считаются одним GROUP BY по (name, label, value).
+# При выбранных фильтрах счетчик значения учитывает все фильтры, кроме фильтра по его же
+# характеристике: так видно, сколько товаров добавит соседнее значение.
+# Фасеты без фильтров кэшируются по подкатегории. Отметка кэша - число товаров подкатегории,
+# сумма их версий (revision растет при любой правке товара) и максимальный id, поэтому
+# устаревшая запись не отдается ни в одном воркере.
+# При включенном bitmap_index фасеты считаются по битовым картам в памяти без SQL.
+
+FACETS_CACHE_MAX_ENTRIES = int(os.getenv("FACETS_CACHE_MAX_ENTRIES", "1000"))
+
+
+class FacetCache:
+    def __init__(self, max_entries: int = FACETS_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, subcategory_id: int, stamp: tuple):
+        with self._lock:
+            entry = self._entries.get(subcategory_id)
+            if entry is None or entry[0] != stamp:
+                return None
+            self._entries.move_to_end(subcategory_id)
+            return entry[1]
+
+    def set(self, subcategory_id: int, stamp: tuple, facets: list):
+        with self._lock:
+            self._entries[subcategory_id] = (stamp, facets)
+            self._entries.move_to_end(subcategory_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+cache = FacetCache()
+
+
+def facet_statement(subcategory_id: int, filters: List[filtering.CharacteristicFilter], conditions=()):
+    """Один запрос на все фасеты; conditions - прочие условия на товар (бренд, наличие)"""
+    item = models.CharacteristicItem
+    link = models.ProductCharacteristic
+
+    if filters:
+        all_filters = [characteristic_filter.condition() for characteristic_filter in filters]
+        # Для значений отфильтрованной характеристики ее собственный фильтр не применяется
+        whens = []
+        for index, characteristic_filter in enumerate(filters):
+            others = all_filters[:index] + all_filters[index + 1:]
+            whens.append((
+                characteristic_filter.matches_name(item),
+                case((and_(*others), link.product_id)) if others else link.product_id
+            ))
+        counted = case(*whens, else_=case((and_(*all_filters), link.product_id)))
+    else:
+        counted = link.product_id
+
+    return (
+        select(
+            item.name,
+            item.label,
+            item.value,
+            func.count(distinct(counted)).label("count"),
+            func.min(item.numeric_value).label("numeric_value"),
+            func.max(item.unit).label("unit"),
+        )
+        .select_from(link)
+        .join(item, item.id == link.characteristic_id)
+        .join(models.Product, models.Product.id == link.product_id)
+        .where(models.Product.subcategory_id == subcategory_id, *conditions)
+        .group_by(item.name, item.label, item.value)
+        .order_by(item.name, func.min(item.numeric_value), item.value)
+    )
+
+
+def build_facets(rows) -> list:
+    facets = {}
+    for row in rows:
+        facet = facets.get(row.name)
+        if facet is None:
+            facet = facets[row.name] = {
+                "name": row.name, "label": row.label, "unit": None, "min": None, "max": None, "values": []
+            }
+        facet["values"].append({"value": row.value, "count": row.count})
+        if row.numeric_value is not None:
+            facet["min"] = row.numeric_value if facet["min"] is None else min(facet["min"], row.numeric_value)
+            facet["max"] = row.numeric_value if facet["max"] is None else max(facet["max"], row.numeric_value)
+            facet["unit"] = facet["unit"] or row.unit
+    return list(facets.values())
+
+
+def _stamp_statement(subcategory_id: int):
+    return select(
+        func.count(models.Product.id), func.sum(models.Product.revision), func.max(models.Product.id)
+    ).where(models.Product.subcategory_id == subcategory_id)
+
+
+async def get_facets(db: AsyncSession, subcategory_id: int, filters: List[filtering.CharacteristicFilter],
+                     brand_id: Optional[int] = None, in_stock: Optional[bool] = None) -> list:
+    if bitmap_index.active():
+        bitmap_index.index.sync_soon()
+        return bitmap_index.index.facets(subcategory_id, filters, brand_id=brand_id, in_stock=in_stock)
+
+    conditions = []
+    if brand_id is not None:
+        conditions.append(models.Product.brand_id == brand_id)
+    if in_stock is not None:
+        conditions.append(models.Product.in_stock == in_stock)
+    if filters or conditions:
+        return build_facets((await db.execute(facet_statement(subcategory_id, filters, conditions))).all())
+
+    stamp = tuple((await db.execute(_stamp_statement(subcategory_id))).one())
+    facets = cache.get(subcategory_id, stamp)
+    if facets is None:
+        facets = build_facets((await db.execute(facet_statement(subcategory_id, []))).all())
+        cache.set(subcategory_id, stamp, facets)
+    return facets
@@ -0,0 +1,146 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, exists, or_, select
+from sqlalchemy.orm import aliased
+
+from . import models
+
+# Фильтр товаров по характеристикам. Query-параметры, не занятые маршрутом, считаются фильтрами:
+#   ?Цвет=RAL 3005              - равенство
+#   ?Цвет=RAL 3005,RAL 8017     - любое из значений (IN); то же повтором параметра ?Цвет=...&Цвет=...
+#                                 запятая между цифрами - десятичная ("0,5 мм") и значения не делит
+#   ?thickness=0.4-0.7          - числовой диапазон, если у характеристики есть числовые значения;
+#                                 иначе это строка ("10-20"). Явные границы: thickness__min=0.4, thickness__max=0.7
+# Имя сравнивается с name и label характеристики. Условия по разным именам объединяются через AND:
+# на каждое имя один коррелированный EXISTS по product_characteristics, который обслуживается
+# индексами (characteristic_id, product_id) и (name, value)/(label, value) в characteristic_items
+# (по имени - частичным уникальным индексом словаря, поэтому в условии есть template_id IS NULL),
+# диапазоны - индексами (name, numeric_value)/(label, numeric_value).
+
+RANGE_SUFFIXES = ("__min", "__max")
+_NUMBER = r"-?\d+(?:[.,]\d+)?"
+_RANGE = re.compile(rf"^\s*({_NUMBER})\s*-\s*({_NUMBER})\s*$")
+_VALUE_SEPARATOR = re.compile(r"(?<!\d),|,(?!\d)")
+
+
+class CharacteristicFilter:
+    """Условие на одну характеристику: набор значений и/или числовые границы"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.values: List[str] = []
+        # Значения вида "a-b": (строка, a, b) - диапазон или строка в зависимости от характеристики
+        self.ranges: List[Tuple[str, float, float]] = []
+        self.min_value: Optional[float] = None
+        self.max_value: Optional[float] = None
+
+    def matches_name(self, item=models.CharacteristicItem):
+        return or_(item.name == self.name, item.label == self.name)
+
+    def has_numeric_values(self):
+        """EXISTS: у товаров есть значения этой характеристики с числом (не зависит от товара, считается один раз)"""
+        link = aliased(models.ProductCharacteristic)
+        item = aliased(models.CharacteristicItem)
+        return exists(
+            select(link.id)
+            .join(item, item.id == link.characteristic_id)
+            .where(item.template_id.is_(None), self.matches_name(item), item.numeric_value.is_not(None))
+        )
+
+    def value_condition(self, item=models.CharacteristicItem):
+        conditions = []
+        choices = []
+        if self.values:
+            choices.append(item.value == self.values[0] if len(self.values) == 1 else item.value.in_(self.values))
+        if self.ranges:
+            numeric = self.has_numeric_values()
+            for raw, low, high in self.ranges:
+                choices.append(or_(
+                    and_(numeric, item.numeric_value >= low, item.numeric_value <= high),
+                    and_(~numeric, item.value == raw),
+                ))
+        if choices:
+            conditions.append(or_(*choices))
+        # numeric_value - число в базовой единице величины (units.parse): границы задаются в мм, кг, л
+        if self.min_value is not None:
+            conditions.append(item.numeric_value >= self.min_value)
+        if self.max_value is not None:
+            conditions.append(item.numeric_value <= self.max_value)
+        return and_(*conditions)
+
+    def matches(self, value: str, numeric_value: Optional[float], numeric: bool) -> bool:
+        """То же, что value_condition, для значения из индекса фильтров; numeric - как has_numeric_values"""
+        if self.values or self.ranges:
+            chosen = value in self.values or any(
+                (numeric_value is not None and low <= numeric_value <= high) if numeric else value == raw
+                for raw, low, high in self.ranges
+            )
+            if not chosen:
+                return False
+        if self.min_value is not None or self.max_value is not None:
+            if numeric_value is None:
+                return False
+            if self.min_value is not None and numeric_value < self.min_value:
+                return False
+            if self.max_value is not None and numeric_value > self.max_value:
+                return False
+        return True
+
+    def condition(self):
+        """EXISTS: у продукта есть характеристика с этим именем и подходящим значением"""
+        # Псевдонимы, чтобы подзапрос не скоррелировался с теми же таблицами во внешнем запросе (фасеты)
+        link = aliased(models.ProductCharacteristic)
+        item = aliased(models.CharacteristicItem)
+        return exists(
+            select(link.id)
+            .join(item, item.id == link.characteristic_id)
+            .where(
+                link.product_id == models.Product.id,
+                item.template_id.is_(None),
+                self.matches_name(item),
+                self.value_condition(item),
+            )
+        )
+
+
+def _number(name: str, raw: str) -> float:
+    try:
+        return float(raw.strip().replace(",", "."))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Фильтр '{name}': ожидается число, получено '{raw}'")
+
+
+def parse_filters(params, reserved) -> List[CharacteristicFilter]:
+    """Фильтры из query-параметров; reserved - параметры самого маршрута"""
+    filters: Dict[str, CharacteristicFilter] = {}
+    for key, raw in params.multi_items():
+        if key in reserved or raw == "":
+            continue
+
+        name, bound = key, None
+        for suffix in RANGE_SUFFIXES:
+            if key.endswith(suffix):
+                name, bound = key[:-len(suffix)], suffix
+        item = filters.setdefault(name, CharacteristicFilter(name))
+
+        if bound == "__min":
+            item.min_value = _number(key, raw)
+        elif bound == "__max":
+            item.max_value = _number(key, raw)
+        else:
+            for value in _VALUE_SEPARATOR.split(raw):
+                value = value.strip()
+                if not value:
+                    continue
+                if (match := _RANGE.match(value)) is not None:
+                    low, high = (float(number.replace(",", ".")) for number in match.groups())
+                    item.ranges.append((value, low, high))
+                else:
+                    item.values.append(value)
+    return list(filters.values())
+
+
+def conditions(filters: List[CharacteristicFilter]) -> list:
+    return [item.condition() for item in filters]
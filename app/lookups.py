@@ -0,0 +1,110 @@
+from sqlalchemy import select, bindparam
+from sqlalchemy.orm import joinedload, selectinload
+from . import models
+
+# Готовые выражения для горячих точечных выборок. Объект select() строится один раз
+# при импорте, ключ кеша компиляции SQLAlchemy запоминается на самом объекте,
+# поэтому на каждый вызов остается только подстановка параметров.
+# Выполнять через db.execute(STATEMENT, {"param": value}).
+
+CATEGORY_BY_SLUG = select(models.Category).where(models.Category.slug == bindparam("slug"))
+
+SUBCATEGORY_BY_SLUG = select(models.Subcategory).where(models.Subcategory.slug == bindparam("slug"))
+
+SUBCATEGORY_WITH_CATEGORY_BY_SLUG = select(models.Subcategory).options(
+    joinedload(models.Subcategory.category)
+).where(models.Subcategory.slug == bindparam("slug"))
+
+TAG_BY_VALUE = select(models.Tag).where(models.Tag.value == bindparam("value"))
+
+BRAND_BY_ID = select(models.Brand).where(models.Brand.id == bindparam("brand_id"))
+
+# Полное дерево отношений товара без декартова произведения: to-one отношения присоединяются
+# к основному запросу, каждая коллекция догружается своим SELECT ... WHERE product_id IN (...).
+# Объединение коллекций одним JOIN дает images x characteristics x tags x ... строк на товар
+PRODUCT_DETAIL_OPTIONS = (
+    joinedload(models.Product.brand),
+    joinedload(models.Product.subcategory).joinedload(models.Subcategory.category),
+    selectinload(models.Product.images),
+    selectinload(models.Product.tags),
+    selectinload(models.Product.warehouses),
+    selectinload(models.Product.documents),
+    selectinload(models.Product.additional_products),
+    selectinload(models.Product.characteristics_assoc).joinedload(models.ProductCharacteristic.characteristic),
+)
+
+PRODUCT_BY_SLUG = select(models.Product).options(*PRODUCT_DETAIL_OPTIONS).where(models.Product.slug == bindparam("slug"))
+
+# Версия карточки товара для ETag: один запрос без загрузки отношений
+PRODUCT_VERSION_BY_SLUG = select(
+    models.Product.id, models.Product.revision, models.Category.revision.label("category_revision")
+).outerjoin(
+    models.Subcategory, models.Subcategory.id == models.Product.subcategory_id
+).outerjoin(
+    models.Category, models.Category.id == models.Subcategory.category_id
+).where(models.Product.slug == bindparam("slug"))
+
+# Похожие товары для страницы товара - готовые карточки
+SIMILAR_CARDS_BY_PRODUCT_ID = select(models.ProductCard).join(
+    models.product_similar, models.product_similar.c.similar_product_id == models.ProductCard.id
+).where(models.product_similar.c.product_id == bindparam("product_id")).order_by(models.ProductCard.id)
+
+SIMILAR_CARDS_BY_PRODUCT_IDS = select(models.product_similar.c.product_id, models.ProductCard).join(
+    models.product_similar, models.product_similar.c.similar_product_id == models.ProductCard.id
+).where(
+    models.product_similar.c.product_id.in_(bindparam("product_ids", expanding=True))
+).order_by(models.ProductCard.id)
+
+# Пакетный поиск товаров по id, slug или артикулу: один IN-запрос на список значений
+PRODUCT_CARDS_BY_KEY = {
+    key: select(models.ProductCard).where(getattr(models.ProductCard, key).in_(bindparam("values", expanding=True)))
+    for key in ("id", "slug", "article")
+}
+
+PRODUCTS_BY_KEY = {
+    key: select(models.Product).options(*PRODUCT_DETAIL_OPTIONS).where(
+        getattr(models.Product, key).in_(bindparam("values", expanding=True))
+    )
+    for key in ("id", "slug", "article")
+}
+
+# Листинг товаров: строки продуктов только нужными колонками и пакетные выборки связей по списку id
+PRODUCT_LIST_COLUMNS = (
+    models.Product.id,
+    models.Product.text,
+    models.Product.article,
+    models.Product.price,
+    models.Product.discount,
+    models.Product.final_price,
+    models.Product.slug,
+    models.Product.in_stock,
+    models.Product.small_description,
+    models.Product.full_description,
+    models.Product.subcategory_id,
+    models.Product.brand_id,
+)
+
+IMAGES_BY_PRODUCT_IDS = select(
+    models.ProductImage.product_id, models.ProductImage.image_url
+).where(
+    models.ProductImage.product_id.in_(bindparam("product_ids", expanding=True))
+).order_by(models.ProductImage.id)
+
+TAGS_BY_PRODUCT_IDS = select(
+    models.ProductTag.product_id, models.Tag.id, models.Tag.name, models.Tag.value
+).join(
+    models.Tag, models.Tag.id == models.ProductTag.tag_id
+).where(
+    models.ProductTag.product_id.in_(bindparam("product_ids", expanding=True))
+).order_by(models.ProductTag.id)
+
+CHARACTERISTICS_BY_PRODUCT_IDS = select(
+    models.ProductCharacteristic.product_id,
+    models.CharacteristicItem.name,
+    models.CharacteristicItem.label,
+    models.CharacteristicItem.value
+).join(
+    models.CharacteristicItem, models.CharacteristicItem.id == models.ProductCharacteristic.characteristic_id
+).where(
+    models.ProductCharacteristic.product_id.in_(bindparam("product_ids", expanding=True))
+).order_by(models.ProductCharacteristic.id)
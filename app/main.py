@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request
-from . import database, models
-from .routers import categories, subcategories, products, brands, filters, upload, auth, tags, characteristics
+from . import bitmap_index, database, models, query_stats, response_cache, serializers
+from .routers import categories, subcategories, products, brands, filters, upload, auth, tags, characteristics, internal
 import os
 from dotenv import load_dotenv
 import logging
@@ -13,7 +13,7 @@ load_dotenv()
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Product Catalog API", version="1.0.0")
+app = FastAPI(title="Product Catalog API", version="1.0.0", default_response_class=serializers.FastJSONResponse)
 
 app.include_router(auth.router)
 app.include_router(products.router)
@@ -24,7 +24,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Разрешить все методы
     allow_headers=["*"],  # Разрешить все заголовки
+    expose_headers=[query_stats.QUERY_COUNT_HEADER, query_stats.QUERY_TIME_HEADER, query_stats.N_PLUS_ONE_HEADER,
+                    response_cache.CACHE_HEADER],
 )
+app.add_middleware(response_cache.ResponseCacheMiddleware)
+app.add_middleware(query_stats.QueryStatsMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -62,17 +66,37 @@ async def general_exception_handler(request: Request, exc: Exception):
         )
 
 
+# Быстрый старт воркера: без create_all при актуальной схеме и без создания суперпользователя.
+# Выключен по умолчанию; с ним контейнер не применяет миграции на старте (.docker/entrypoint.sh)
+FAST_START = os.getenv("FAST_START", "false").lower() == "true"
+BOOTSTRAP_SUPERUSER = os.getenv("BOOTSTRAP_SUPERUSER", "false").lower() == "true"
+
+
 @app.on_event("startup")
 def startup_event():
-    database.check_database()
+    if FAST_START:
+        if database.schema_is_current():
+            print("✅ Схема БД актуальна, create_all пропущен")
+        else:
+            models.Base.metadata.create_all(bind=database.engine)
+    else:
+        database.check_database()
+
+        models.Base.metadata.create_all(bind=database.engine)
 
-    models.Base.metadata.create_all(bind=database.engine)
+    if bitmap_index.BITMAP_INDEX_ENABLED:
+        db = database.SessionLocal()
+        try:
+            bitmap_index.index.build(db)
+        finally:
+            db.close()
 
-    db = database.SessionLocal()
-    try:
-        database.create_initial_superuser(db)
-    finally:
-        db.close()
+    if not FAST_START or BOOTSTRAP_SUPERUSER:
+        db = database.SessionLocal()
+        try:
+            database.create_initial_superuser(db)
+        finally:
+            db.close()
 
 
 app.include_router(categories.router)
@@ -83,6 +107,7 @@ app.include_router(upload.router)
 app.include_router(tags.router)
 app.include_router(characteristics.router)
 app.include_router(filters.router)
+app.include_router(internal.router)
 
 
 @app.get("/")
@@ -0,0 +1,63 @@
+import argparse
+from . import counters, database, product_cards, units
+
+
+def create_superuser(args):
+    db = database.SessionLocal()
+    try:
+        database.create_initial_superuser(db)
+    finally:
+        db.close()
+
+
+def rebuild_counters(args):
+    db = database.SessionLocal()
+    try:
+        counters.rebuild(db)
+        print("Счетчики сброшены, пересчет произойдет при первом чтении")
+    finally:
+        db.close()
+
+
+def rebuild_product_cards(args):
+    db = database.SessionLocal()
+    try:
+        product_cards.rebuild(db)
+        print("Карточки товаров пересобраны")
+    finally:
+        db.close()
+
+
+def backfill_characteristic_values(args):
+    db = database.SessionLocal()
+    try:
+        updated = units.backfill(db)
+        db.commit()
+        print(f"Числовые значения характеристик заполнены: {updated}")
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="Служебные команды каталога")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "create-superuser", help="Создать суперпользователя из переменных superuser_*"
+    ).set_defaults(handler=create_superuser)
+    subparsers.add_parser(
+        "rebuild-counters", help="Сбросить счетчики пагинации (после ручных правок в базе)"
+    ).set_defaults(handler=rebuild_counters)
+    subparsers.add_parser(
+        "rebuild-product-cards", help="Пересобрать карточки товаров для листингов"
+    ).set_defaults(handler=rebuild_product_cards)
+    subparsers.add_parser(
+        "backfill-characteristic-values", help="Разобрать значения характеристик в число и единицу измерения"
+    ).set_defaults(handler=backfill_characteristic_values)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
 from datetime import datetime
 
 from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Table, Text, Enum as SQLEnum, DateTime, \
-    UniqueConstraint, JSON
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+    UniqueConstraint, JSON, Index, text
+from sqlalchemy.orm import relationship, validates
+from sqlalchemy.sql import func, literal_column
 import enum
 from .database import Base
+from . import units
+
+# Версия строки для ETag: увеличивается при каждом UPDATE строки, а при изменении связанных данных -
+# явно через crud.touch_products
+REVISION_BUMP = literal_column("revision + 1")
 
 product_similar = Table(
     'product_similar',
     Base.metadata,
-    Column('product_id', Integer, ForeignKey('products.id')),
+    Column('product_id', Integer, ForeignKey('products.id'), index=True),
     Column('similar_product_id', Integer, ForeignKey('products.id'))
 )
 
@@ -51,6 +56,8 @@ class Category(Base):
     icon = Column(String, nullable=True)
     text = Column(String, index=True)
     slug = Column(String, unique=True, index=True)
+    revision = Column(Integer, nullable=False, default=1, server_default="1", onupdate=REVISION_BUMP)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
     subcategories = relationship("Subcategory", back_populates="category")
 
@@ -118,30 +125,64 @@ class CharacteristicItem(Base):
     name = Column(String, nullable=False)
     label = Column(String, nullable=False)
     value = Column(String, nullable=False)
+    # Число из value в базовой единице и сама единица (units.parse), для диапазонных фильтров
+    numeric_value = Column(Float, nullable=True)
+    unit = Column(String(16), nullable=True)
 
     template_id = Column(Integer, ForeignKey("characteristic_templates.id", ondelete="CASCADE"))
     template = relationship("CharacteristicTemplate", back_populates="characteristics")
 
     products = relationship("ProductCharacteristic", back_populates="characteristic")
 
+    # Характеристики продуктов (без template_id) - общий словарь: пара (name, value) хранится
+    # один раз, продукты ссылаются на нее через product_characteristics (crud.intern_characteristics).
+    # Фильтры по характеристикам ищут по имени или подписи и значению
+    __table_args__ = (
+        Index("uq_characteristic_items_name_value", "name", "value", unique=True,
+              postgresql_where=text("template_id IS NULL"), sqlite_where=text("template_id IS NULL")),
+        Index("ix_characteristic_items_label_value", "label", "value"),
+        Index("ix_characteristic_items_name_numeric_value", "name", "numeric_value"),
+        Index("ix_characteristic_items_label_numeric_value", "label", "numeric_value"),
+    )
+
+    @validates("value")
+    def parse_value(self, key, value):
+        self.numeric_value, self.unit = units.parse(value)
+        return value
+
 class ProductCharacteristic(Base):
     __tablename__ = "product_characteristics"
 
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"))
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), index=True)
     characteristic_id = Column(Integer, ForeignKey("characteristic_items.id", ondelete="CASCADE"))
 
     product = relationship("Product", back_populates="characteristics_assoc")
     characteristic = relationship("CharacteristicItem", back_populates="products")
 
+    # EXISTS фильтра: по найденной характеристике сразу проверяется продукт
+    __table_args__ = (
+        Index("ix_product_characteristics_characteristic_id_product_id", "characteristic_id", "product_id"),
+    )
+
+def final_price(price, discount):
+    """Цена со скидкой; discount - сумма в валюте цены. Товар без цены получает 0: колонка сортировки NOT NULL"""
+    if price is None:
+        return 0
+    return price - (discount or 0)
+
+
 class Product(Base):
     __tablename__ = "products"
 
     id = Column(Integer, primary_key=True, index=True)
-    text = Column(String, index=True)
+    # Колонки сортировок (text, discount, final_price) NOT NULL: сравнение (k, id) > (...) теряет строки с NULL
+    text = Column(String, index=True, nullable=False, server_default="")
     article = Column(Integer, unique=True, index=True)
     price = Column(Float)
-    discount = Column(Float, default=0)
+    discount = Column(Float, nullable=False, default=0, server_default="0")
+    # Поддерживается хуком на price/discount (ORM-записи), Core-вставки считают ее через final_price
+    final_price = Column(Float, nullable=False, default=0, server_default="0")
     slug = Column(String, unique=True, index=True)
     image = Column(String, nullable=True)
     in_stock = Column(Boolean, default=True)
@@ -149,6 +190,8 @@ class Product(Base):
     full_description = Column(Text, nullable=True)
     subcategory_id = Column(Integer, ForeignKey("subcategories.id"))
     brand_id = Column(Integer, ForeignKey("brands.id"), nullable=True)
+    revision = Column(Integer, nullable=False, default=1, server_default="1", onupdate=REVISION_BUMP)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
     subcategory = relationship("Subcategory", back_populates="products")
     brand = relationship("Brand", back_populates="products")
@@ -167,6 +210,32 @@ class Product(Base):
     characteristics_assoc = relationship("ProductCharacteristic", back_populates="product",
                                          cascade="all, delete-orphan")
 
+    # Индексы под курсорную пагинацию: WHERE (k, id) > (...) ORDER BY k, id (убывающие сортировки
+    # читают те же индексы в обратном порядке), в подкатегории - (subcategory_id, k, id)
+    __table_args__ = (
+        Index("ix_products_final_price_id", "final_price", "id"),
+        Index("ix_products_discount_id", "discount", "id"),
+        Index("ix_products_text_id", "text", "id"),
+        Index("ix_products_brand_id_id", "brand_id", "id"),
+        Index("ix_products_subcategory_id_id", "subcategory_id", "id"),
+        Index("ix_products_subcategory_id_final_price_id", "subcategory_id", "final_price", "id"),
+        Index("ix_products_subcategory_id_discount_id", "subcategory_id", "discount", "id"),
+        Index("ix_products_subcategory_id_text_id", "subcategory_id", "text", "id"),
+        # Переключатель "только в наличии": частичный индекс только по товарам в наличии
+        # (literal_column: имя text в теле класса занято колонкой)
+        Index("ix_products_in_stock_subcategory_id_id", "subcategory_id", "id",
+              postgresql_where=literal_column("in_stock = true"), sqlite_where=literal_column("in_stock = 1")),
+    )
+
+    @validates("price", "discount")
+    def update_final_price(self, key, value):
+        if key == "discount" and value is None:
+            value = 0
+        price = value if key == "price" else self.price
+        discount = value if key == "discount" else self.discount
+        self.final_price = final_price(price, discount)
+        return value
+
     @property
     def image_urls(self):
         return [img.image_url for img in self.images] if self.images else []
@@ -188,7 +257,7 @@ class ProductWarehouse(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     address = Column(String)
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
 
     product = relationship("Product", back_populates="warehouses")
 
@@ -199,7 +268,7 @@ class Document(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     file_url = Column(String)
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
 
     product = relationship("Product", back_populates="documents")
 
@@ -208,7 +277,7 @@ class ProductImage(Base):
     __tablename__ = "product_images"
 
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
     image_url = Column(String)
 
     product = relationship("Product", back_populates="images")
@@ -221,11 +290,55 @@ class AdditionalProduct(Base):
     name = Column(String)
     value = Column(String)
     product_slug = Column(String)
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
 
     product = relationship("Product", back_populates="additional_products")
 
 
+class ProductCard(Base):
+    """Денормализованная карточка товара для листингов (см. app/product_cards.py)"""
+    __tablename__ = "product_cards"
+
+    id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    text = Column(String, nullable=False, server_default="")
+    article = Column(Integer)
+    price = Column(Float)
+    discount = Column(Float, nullable=False, default=0, server_default="0")
+    final_price = Column(Float, nullable=False, default=0, server_default="0")
+    slug = Column(String)
+    small_description = Column(Text, nullable=True)
+    subcategory_id = Column(Integer, nullable=True)
+    category_id = Column(Integer, nullable=True)
+    brand_id = Column(Integer, nullable=True)
+    image = Column(String, nullable=True)
+
+    # Страница категории - диапазон по одному из индексов в порядке сортировки
+    __table_args__ = (
+        Index("ix_product_cards_category_id_id", "category_id", "id"),
+        Index("ix_product_cards_category_id_final_price_id", "category_id", "final_price", "id"),
+        Index("ix_product_cards_category_id_discount_id", "category_id", "discount", "id"),
+        Index("ix_product_cards_category_id_text_id", "category_id", "text", "id"),
+    )
+
+
+class CatalogCounter(Base):
+    """Общее количество записей в области пагинации (см. app/counters.py)"""
+    __tablename__ = "catalog_counters"
+
+    scope = Column(String(32), primary_key=True)
+    scope_id = Column(Integer, primary_key=True, default=0)
+    total = Column(Integer, nullable=False, default=0)
+
+
+class ProductChange(Base):
+    """Журнал изменений товаров для сверки индекса фильтров (см. app/bitmap_index.py):
+    строка на товар с номером его последнего изменения; строка product_id = 0 хранит текущий номер"""
+    __tablename__ = "product_changes"
+
+    product_id = Column(Integer, primary_key=True, autoincrement=False)
+    seq = Column(Integer, nullable=False, index=True)
+
+
 class UserRole(str, enum.Enum):
     SUPERUSER = "superuser"
     ADMIN = "admin"
@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+import math
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+from . import models
+
+
+# Курсорная пагинация: вместо OFFSET следующая страница ищется условием (k, id) > (последний k, последний id),
+# которое обслуживается индексом по тем же колонкам. Курсор непрозрачен для клиента: base64 от JSON.
+
+class SortKey:
+    def __init__(self, name: str, *columns, descending: bool = False):
+        self.name = name
+        self.columns = columns
+        self.descending = descending
+
+    def values(self, item) -> list:
+        if isinstance(item, dict):
+            return [item[column.key] for column in self.columns]
+        return [getattr(item, column.key) for column in self.columns]
+
+    def apply(self, statement, after: Optional[list] = None):
+        if after is not None:
+            key = self.columns[0] if len(self.columns) == 1 else tuple_(*self.columns)
+            last = after[0] if len(self.columns) == 1 else tuple_(*after)
+            statement = statement.where(key < last if self.descending else key > last)
+        if self.descending:
+            return statement.order_by(*(column.desc() for column in self.columns))
+        return statement.order_by(*self.columns)
+
+
+# Цена - цена со скидкой (final_price); discount - сначала наибольшие скидки, newest - сначала новые
+PRODUCT_SORTS = {
+    "id": SortKey("id", models.Product.id),
+    "price": SortKey("price", models.Product.final_price, models.Product.id),
+    "-price": SortKey("-price", models.Product.final_price, models.Product.id, descending=True),
+    "discount": SortKey("discount", models.Product.discount, models.Product.id, descending=True),
+    "newest": SortKey("newest", models.Product.id, descending=True),
+    "name": SortKey("name", models.Product.text, models.Product.id),
+}
+PRODUCT_SORT_PATTERN = f"^({'|'.join(PRODUCT_SORTS)})$"
+PRODUCT_SORT_DESCRIPTION = f"Сортировка: {', '.join(PRODUCT_SORTS)}"
+
+# Те же сортировки для листингов по карточкам товаров
+CARD_SORTS = {
+    "id": SortKey("id", models.ProductCard.id),
+    "price": SortKey("price", models.ProductCard.final_price, models.ProductCard.id),
+    "-price": SortKey("-price", models.ProductCard.final_price, models.ProductCard.id, descending=True),
+    "discount": SortKey("discount", models.ProductCard.discount, models.ProductCard.id, descending=True),
+    "newest": SortKey("newest", models.ProductCard.id, descending=True),
+    "name": SortKey("name", models.ProductCard.text, models.ProductCard.id),
+}
+
+CATEGORY_SORT = SortKey("id", models.Category.id)
+SUBCATEGORY_SORT = SortKey("id", models.Subcategory.id)
+TAG_SORT = SortKey("id", models.Tag.id)
+BRAND_SORT = SortKey("id", models.Brand.id)
+
+
+def encode_cursor(sort_key: SortKey, item) -> str:
+    payload = json.dumps({"s": sort_key.name, "k": sort_key.values(item)}, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+# Предел целых в курсоре: BIGINT, больший id база отвергнет ошибкой переполнения
+CURSOR_INT_LIMIT = 2 ** 63
+
+
+def _cursor_value_fits(value, column) -> bool:
+    """Значение из курсора подходит по типу колонке сортировки"""
+    if isinstance(value, bool):
+        return False
+    python_type = column.type.python_type
+    if python_type is int:
+        return isinstance(value, int) and -CURSOR_INT_LIMIT <= value < CURSOR_INT_LIMIT
+    if python_type is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, python_type)
+
+
+def decode_cursor(cursor: str, sort_key: SortKey) -> Optional[list]:
+    """Пустой курсор означает первую страницу"""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = payload["k"]
+        if payload["s"] != sort_key.name or not isinstance(values, list) or len(values) != len(sort_key.columns):
+            raise ValueError
+        if not all(_cursor_value_fits(value, column) for value, column in zip(values, sort_key.columns)):
+            raise ValueError
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный cursor")
+    return values
+
+
+def split_page(items: list, limit: int, sort_key: SortKey):
+    """Из limit + 1 строк вернуть страницу и курсор следующей (None на последней странице)"""
+    if len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    return page, encode_cursor(sort_key, page[-1])
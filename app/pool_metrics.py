@@ -0,0 +1,131 @@
+import bisect
+import threading
+import time
+
+import anyio.to_thread
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Границы корзин гистограммы ожидания соединения, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolStats:
+    """Время получения соединения из пула и таймауты ожидания"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        wait_ms = seconds * 1000
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait_ms
+            self.wait_max = max(self.wait_max, wait_ms)
+            self.buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histogram, cumulative = {}, 0
+            for bound, count in zip([*WAIT_BUCKETS_MS, "+Inf"], self.buckets):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / attempts, 3) if attempts else 0.0,
+                "wait_max_ms": round(self.wait_max, 3),
+                "wait_histogram_ms": histogram,
+            }
+
+
+class _InstrumentedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.observe(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() пересоздает пул; накопленная статистика переходит в новый
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines = {}
+
+
+def register(name: str, engine):
+    """Зарегистрировать движок (для AsyncEngine передается engine.sync_engine) под именем для отчета"""
+    _engines[name] = engine
+
+
+def pool_snapshot(pool) -> dict:
+    result = {
+        "pool_class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Пока пул не заполнен, overflow() отрицательный
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout_seconds": pool.timeout(),
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        result.update(stats.snapshot())
+    return result
+
+
+def snapshot() -> dict:
+    return {name: pool_snapshot(engine.pool) for name, engine in _engines.items()}
+
+
+def reset():
+    for engine in _engines.values():
+        stats = getattr(engine.pool, "stats", None)
+        if stats is not None:
+            stats.reset()
+
+
+def threadpool_snapshot() -> dict:
+    """Занятость лимитера anyio, на котором выполняются sync-эндпоинты и зависимости"""
+    statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+    return {
+        "total_tokens": statistics.total_tokens,
+        "borrowed_tokens": statistics.borrowed_tokens,
+        "tasks_waiting": statistics.tasks_waiting,
+    }
@@ -0,0 +1,70 @@
+from typing import Iterable, Union
+
+from sqlalchemy import select, delete, insert
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Карточки товаров - read-модель для листингов: поля ProductShortResponse, категория и первое изображение
+# в одной строке. Пересобираются явно на путях записи продуктов, изображений и их подкатегорий/брендов.
+
+CARD_COLUMNS = (
+    "id", "text", "article", "price", "discount", "final_price", "slug", "small_description",
+    "subcategory_id", "category_id", "brand_id", "image",
+)
+
+
+def _first_image():
+    return (
+        select(models.ProductImage.image_url)
+        .where(models.ProductImage.product_id == models.Product.id)
+        .order_by(models.ProductImage.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def card_source():
+    """SELECT, собирающий карточки из products в порядке CARD_COLUMNS"""
+    return select(
+        models.Product.id,
+        models.Product.text,
+        models.Product.article,
+        models.Product.price,
+        models.Product.discount,
+        models.Product.final_price,
+        models.Product.slug,
+        models.Product.small_description,
+        models.Product.subcategory_id,
+        models.Subcategory.category_id,
+        models.Product.brand_id,
+        _first_image(),
+    ).outerjoin(models.Subcategory, models.Subcategory.id == models.Product.subcategory_id)
+
+
+def refresh(db: Session, product_ids: Union[Iterable[int], object]):
+    """Пересобрать карточки продуктов; product_ids - список id или SELECT id.
+    Удаленные продукты просто теряют карточку"""
+    if hasattr(product_ids, "subquery"):
+        product_ids = db.scalars(product_ids).all()
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    db.flush()
+    db.execute(delete(models.ProductCard).where(models.ProductCard.id.in_(product_ids)))
+    db.execute(
+        insert(models.ProductCard).from_select(
+            CARD_COLUMNS, card_source().where(models.Product.id.in_(product_ids))
+        )
+    )
+
+
+def cards_where(*conditions):
+    """id карточек по условию на их сохраненные поля (старые значения до изменения)"""
+    return select(models.ProductCard.id).where(*conditions)
+
+
+def rebuild(db: Session):
+    db.execute(delete(models.ProductCard))
+    db.execute(insert(models.ProductCard).from_select(CARD_COLUMNS, card_source()))
+    db.commit()
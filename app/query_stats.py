@@ -0,0 +1,172 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз один и тот же запрос может выполниться за HTTP-запрос, прежде чем это считается N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+QUERY_COUNT_HEADER = "X-DB-Queries"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+N_PLUS_ONE_HEADER = "X-DB-N-Plus-One"
+
+_request_stats: ContextVar[Optional["RequestQueryStats"]] = ContextVar("request_query_stats", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Нормализованный вид SQL: без литералов, с одним плейсхолдером вместо IN-списков"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class RequestQueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total_time += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> dict:
+        return {sql: count for sql, count in self.fingerprints.items() if count > threshold}
+
+
+class RouteQueryRegistry:
+    """Накопленная по маршрутам статистика запросов к БД"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route: str, stats: RequestQueryStats, repeated: dict):
+        with self._lock:
+            entry = self._routes.setdefault(route, {
+                "requests": 0,
+                "queries": 0,
+                "db_time_ms": 0.0,
+                "max_queries": 0,
+                "n_plus_one_requests": 0,
+                "n_plus_one_statements": {},
+            })
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["db_time_ms"] += stats.total_time * 1000
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+            if repeated:
+                entry["n_plus_one_requests"] += 1
+                for sql, count in repeated.items():
+                    entry["n_plus_one_statements"][sql] = max(entry["n_plus_one_statements"].get(sql, 0), count)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {}
+            for route, entry in self._routes.items():
+                result[route] = {
+                    **entry,
+                    "avg_queries": round(entry["queries"] / entry["requests"], 2),
+                    "avg_db_time_ms": round(entry["db_time_ms"] / entry["requests"], 3),
+                    "db_time_ms": round(entry["db_time_ms"], 3),
+                    "n_plus_one_statements": dict(entry["n_plus_one_statements"]),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = RouteQueryRegistry()
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(engine):
+    """Подключить подсчет запросов к движку (для AsyncEngine передается engine.sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def _finish_request(route_path: str, stats: RequestQueryStats):
+    repeated = stats.repeated()
+    for sql, count in repeated.items():
+        logger.warning("Possible N+1 in %s: statement executed %s times: %s", route_path, count, sql)
+    registry.record(route_path, stats, repeated)
+
+
+async def _record_after_body(body_iterator, route_path: str, stats: RequestQueryStats):
+    """Потоковые ответы (например, /products/export) читают БД, пока отдается тело,
+    поэтому в реестр запрос попадает только после последнего чанка"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        _finish_request(route_path, stats)
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        stats = RequestQueryStats()
+        token = _request_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            _request_stats.reset(token)
+
+        route = request.scope.get("route")
+        route_path = f"{request.method} {route.path if route is not None else '<unmatched>'}"
+
+        # Заголовки уходят до тела: у потоковых ответов в них только запросы до первого чанка,
+        # полные цифры - в реестре (/internal/metrics/queries) и логе N+1
+        repeated = stats.repeated()
+        if repeated:
+            response.headers[N_PLUS_ONE_HEADER] = str(max(repeated.values()))
+        response.headers[QUERY_COUNT_HEADER] = str(stats.count)
+        response.headers[QUERY_TIME_HEADER] = f"{stats.total_time * 1000:.2f}"
+
+        response.body_iterator = _record_after_body(response.body_iterator, route_path, stats)
+        return response
@@ -0,0 +1,259 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+from urllib.parse import urlencode
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from . import database, etags
+
+# Кэш ответов публичных GET-эндпоинтов витрины. Ключ - путь и отсортированные query-параметры,
+# у записи есть теги сущностей, из которых собран ответ. Успешная запись в админке (POST/PUT/PATCH/DELETE)
+# сбрасывает теги своей сущности. Кэш живет в памяти процесса: при нескольких воркерах
+# остальные увидят изменения не позже чем через RESPONSE_CACHE_TTL секунд.
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+CACHE_HEADER = "X-Cache"
+
+# Маршрут -> теги сущностей, которые попадают в ответ
+CACHEABLE_ROUTES = [
+    (re.compile(r"^/products/[^/]+$"), ("products", "categories", "subcategories", "brands", "tags")),
+    (re.compile(r"^/products/filter/$"), ("products", "categories", "subcategories", "brands", "tags")),
+    (re.compile(r"^/categories/$"), ("categories",)),
+    (re.compile(r"^/categories/slug/[^/]+$"), ("categories",)),
+    (re.compile(r"^/subcategories/category/[^/]+$"), ("categories", "subcategories")),
+    (re.compile(r"^/tags/$"), ("tags",)),
+    (re.compile(r"^/brands/$"), ("brands",)),
+]
+
+# Префикс пути записи -> сбрасываемый тег
+WRITE_TAGS = {
+    "products": "products",
+    "categories": "categories",
+    "subcategories": "subcategories",
+    "brands": "brands",
+    "tags": "tags",
+}
+
+
+class CacheBackend:
+    """Хранилище ответов; заменяется через set_backend (например, на Redis)"""
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value, tags: Iterable[str]):
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class LRUCacheBackend(CacheBackend):
+    """Ограниченный по числу записей LRU с временем жизни записи"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tag_keys = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, tags: Iterable[str]):
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                for key in self._tag_keys.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_keys.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._generations = {}
+        self._invalidated_at = {}
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def generation(self, tags) -> tuple:
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def get(self, key: str):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def store(self, key: str, value, tags, generation: tuple):
+        # Ответ, начатый до сброса тегов, мог прочитать старые данные.
+        # С репликами после записи выжидаем допустимое отставание, иначе в кэш попадет ответ отставшей реплики
+        settle = database.DB_REPLICA_MAX_LAG_SECONDS if database.replicas else 0
+        now = time.monotonic()
+        with self._lock:
+            if tuple(self._generations.get(tag, 0) for tag in tags) != generation:
+                return
+            if any(now - self._invalidated_at.get(tag, float("-inf")) < settle for tag in tags):
+                return
+            self.stores += 1
+        self.backend.set(key, value, tags)
+
+    def invalidate(self, *tags: str):
+        now = time.monotonic()
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                self._invalidated_at[tag] = now
+            self.invalidations += 1
+        self.backend.invalidate_tags(tags)
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = self.stores = self.invalidations = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            result = {
+                "enabled": RESPONSE_CACHE_ENABLED,
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "invalidations": self.invalidations,
+            }
+        result.update(self.backend.stats())
+        return result
+
+
+cache = ResponseCache(LRUCacheBackend())
+
+
+def set_backend(backend: CacheBackend):
+    cache.backend = backend
+
+
+def cache_key(request: Request) -> str:
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}" if query else request.url.path
+
+
+def route_tags(path: str) -> Optional[tuple]:
+    for pattern, tags in CACHEABLE_ROUTES:
+        if pattern.match(path):
+            return tags
+    return None
+
+
+def write_tag(path: str) -> Optional[str]:
+    return WRITE_TAGS.get(path.strip("/").split("/", 1)[0])
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if not database.is_read(request):
+            response = await call_next(request)
+            tag = write_tag(request.url.path)
+            if tag is not None and response.status_code < 400:
+                cache.invalidate(tag)
+            return response
+
+        tags = route_tags(request.url.path) if request.method == "GET" and RESPONSE_CACHE_ENABLED else None
+        # Админка и клиенты после записи читают из primary мимо кэша
+        if tags is None or database.wants_primary(request):
+            return await call_next(request)
+
+        key = cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            status_code, headers, body = cached
+            etag = headers.get("etag")
+            if etag is not None and etags.matches(request, etag):
+                return etags.not_modified(etag)
+            response = Response(content=body, status_code=status_code, headers=headers)
+            response.headers[CACHE_HEADER] = "HIT"
+            return response
+
+        generation = cache.generation(tags)
+        response = await call_next(request)
+        if response.status_code != 200 or "set-cookie" in response.headers:
+            response.headers[CACHE_HEADER] = "BYPASS"
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = dict(response.headers)
+        cache.store(key, (response.status_code, headers, body), tags, generation)
+        response = Response(content=body, status_code=response.status_code, headers=headers)
+        response.headers[CACHE_HEADER] = "MISS"
+        return response
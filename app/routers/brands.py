@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import crud, schemas, database
+from .. import crud, crud_async, schemas, database, pagination, serializers
 from ..s3_service import s3_service
 from ..dependencies import require_admin
 
@@ -29,52 +30,62 @@ async def create_brand_with_upload(
 
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-def read_brands(
+async def read_brands(
         page: int = Query(1, ge=1, description="Page number"),
         size: int = Query(20, ge=1, le=100, description="Page size"),
-        db: Session = Depends(database.get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (пустая строка - первая страница)"),
+        with_total: bool = Query(True, description="Считать общее количество (false - без total и pages)"),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
     try:
-        skip = (page - 1) * size
-        brands = crud.get_brands(db, skip=skip, limit=size)
-        total = crud.count_brands(db)
+        if cursor is not None:
+            after = pagination.decode_cursor(cursor, pagination.BRAND_SORT)
+            brands = await crud_async.get_brands(db, limit=size + 1, after=after)
+            brands, next_cursor = pagination.split_page(brands, size, pagination.BRAND_SORT)
+            return serializers.TrustedJSONResponse(
+                serializers.page([serializers.brand(brand) for brand in brands], size, next_cursor=next_cursor)
+            )
 
-        brands_schemas = [schemas.Brand.from_orm(brand) for brand in brands]
+        skip = (page - 1) * size
+        brands, total = await crud_async.get_brands_page(db, skip=skip, limit=size, with_total=with_total)
 
-        return {
-            "items": brands_schemas,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size if size > 0 else 1
-        }
+        return serializers.TrustedJSONResponse(
+            serializers.page([serializers.brand(brand) for brand in brands], size, total=total, page=page)
+        )
     except HTTPException as e:
         raise e
 
 
 @router.get("/{brand_id}/products", response_model=schemas.PaginatedResponse)
-def read_brand_products(
+async def read_brand_products(
         brand_id: int,
         page: int = Query(1, ge=1, description="Номер страницы"),
         size: int = Query(20, ge=1, le=100, description="Размер страницы"),
-        db: Session = Depends(database.get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (пустая строка - первая страница)"),
+        with_total: bool = Query(True, description="Считать общее количество (false - без total и pages)"),
+        sort: str = Query("id", pattern=pagination.PRODUCT_SORT_PATTERN, description=pagination.PRODUCT_SORT_DESCRIPTION),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
     try:
-        brand = crud.get_brand_by_id(db, brand_id=brand_id)
+        brand = await crud_async.get_brand_by_id(db, brand_id=brand_id)
         if brand is None:
             raise HTTPException(status_code=404, detail="Brand not found")
 
+        sort_key = pagination.PRODUCT_SORTS[sort]
+        if cursor is not None:
+            after = pagination.decode_cursor(cursor, sort_key)
+            products = await crud_async.get_products_by_brand(
+                db, brand_id=brand_id, limit=size + 1, sort_key=sort_key, after=after
+            )
+            products, next_cursor = pagination.split_page(products, size, sort_key)
+            return serializers.TrustedJSONResponse(serializers.page(products, size, next_cursor=next_cursor))
+
         skip = (page - 1) * size
-        products = crud.get_products_by_brand(db, brand_id=brand_id, skip=skip, limit=size)
-        total = crud.count_products_by_brand(db, brand_id=brand_id)
-
-        return {
-            "items": products,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size if size > 0 else 1
-        }
+        products, total = await crud_async.get_products_page_by_brand(
+            db, brand_id=brand_id, skip=skip, limit=size, sort_key=sort_key, with_total=with_total
+        )
+
+        return serializers.TrustedJSONResponse(serializers.page(products, size, total=total, page=page))
     except HTTPException as e:
         raise e
 
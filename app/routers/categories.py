@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
-from .. import crud, schemas, database, models
+from .. import crud, crud_async, schemas, database, models, pagination, counters, etags, product_cards, serializers, \
+    bitmap_index
 from ..s3_service import s3_service, TimeWebS3Service
 from ..dependencies import require_admin
 
@@ -35,59 +37,82 @@ async def create_category_with_upload(
 
 
 @router.get("/", response_model=schemas.CategoryPaginatedResponse)
-def read_categories(
+async def read_categories(
         search: Optional[str] = Query(None, description="Поисковый запрос"),
         page: int = Query(1, ge=1, description="Номер страницы"),
         limit: int = Query(10, ge=1, le=100, description="Количество записей на странице (1-100)"),
-        db: Session = Depends(database.get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (пустая строка - первая страница)"),
+        with_total: bool = Query(True, description="Считать общее количество (false - без total и pages)"),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
     try:
+        if cursor is not None:
+            after = pagination.decode_cursor(cursor, pagination.CATEGORY_SORT)
+            if search:
+                categories = await crud_async.search_categories(db, search_term=search, limit=limit + 1, after=after)
+            else:
+                categories = await crud_async.get_categories(db, limit=limit + 1, after=after)
+            categories, next_cursor = pagination.split_page(categories, limit, pagination.CATEGORY_SORT)
+            return serializers.TrustedJSONResponse(
+                serializers.data_page([serializers.category(item) for item in categories], next_cursor=next_cursor)
+            )
 
         skip = (page - 1) * limit
 
         if search:
-            categories = crud.search_categories(db, search_term=search, skip=skip, limit=limit)
-            return {
-                "data": categories
-            }
+            categories = await crud_async.search_categories(db, search_term=search, skip=skip, limit=limit)
+            return serializers.TrustedJSONResponse(
+                serializers.data_page([serializers.category(item) for item in categories])
+            )
 
         else:
 
-            categories = crud.get_categories(db, skip=skip, limit=limit)
-            total_count = crud.get_categories_count(db)
-            total_pages = (total_count + limit - 1) // limit
+            categories, total_count = await crud_async.get_categories_page(
+                db, skip=skip, limit=limit, with_total=with_total
+            )
+            total_pages = (total_count + limit - 1) // limit if total_count is not None else None
 
-            return {
-                "data": categories,
-                "pagination": {
+            return serializers.TrustedJSONResponse(serializers.data_page(
+                [serializers.category(item) for item in categories],
+                {
                     "current_page": page,
                     "total_pages": total_pages,
                     "limit": limit,
                     "total_items": total_count
                 }
-            }
+            ))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при получении категорий: {str(e)}")
 
 
 @router.get("/{category_id}", response_model=schemas.Category)
-def read_category(category_id: int, db: Session = Depends(database.get_db)):
+async def read_category(category_id: int, request: Request, response: Response,
+                        db: AsyncSession = Depends(database.get_async_db)):
     try:
-        category = crud.get_category_by_id(db, category_id=category_id)
+        category = await crud_async.get_category_by_id(db, category_id=category_id)
         if category is None:
             raise HTTPException(status_code=404, detail="Category not found")
+        etag = etags.category_etag(category)
+        if etags.matches(request, etag):
+            return etags.not_modified(etag)
+        response.headers["ETag"] = etag
         return category
     except HTTPException as e:
         raise e
 
 
 @router.get("/slug/{slug}", response_model=schemas.Category)
-def read_category_by_slug(slug: str, db: Session = Depends(database.get_db)):
+async def read_category_by_slug(slug: str, request: Request, response: Response,
+                                db: AsyncSession = Depends(database.get_async_db)):
     try:
-        category = crud.get_category_by_slug(db, slug=slug)
+        category = await crud_async.get_category_by_slug(db, slug=slug)
         if category is None:
             raise HTTPException(status_code=404, detail="Category not found")
+        etag = etags.category_etag(category)
+        if etags.matches(request, etag):
+            return etags.not_modified(etag)
+        response.headers["ETag"] = etag
         return category
     except HTTPException as e:
         raise e
@@ -213,8 +238,14 @@ async def delete_category(
             except Exception as e:
                 print(f"Error deleting category icon {category.icon}: {str(e)}")
 
+        product_ids = [product.id for subcategory in subcategories for product in subcategory.products]
+        if product_ids:
+            crud.record_product_changes(db, models.Product.id.in_(product_ids))
         db.delete(category)
+        product_cards.refresh(db, product_cards.cards_where(models.ProductCard.category_id == category_id))
+        counters.invalidate(db, *counters.PRODUCT_SCOPES, counters.CATEGORIES, counters.SUBCATEGORIES)
         db.commit()
+        bitmap_index.refresh(db, product_ids)
 
         return {
             "message": f"Category deleted successfully with {total_subcategories_deleted} subcategories and {total_products_deleted} products",
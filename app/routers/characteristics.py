@@ -28,40 +28,21 @@ def read_characteristic_templates(
     try:
         skip = (page - 1) * limit
 
-        if search:
-            # Поиск с пагинацией
-            templates = crud.search_characteristic_templates(db, search_term=search, skip=skip, limit=limit)
-            total_count = crud.search_characteristic_templates_count(db, search_term=search)
-            total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
+        # Страница и общее количество (с поиском по названию или без) одним запросом
+        templates, total_count = crud.get_characteristic_templates_page(db, skip=skip, limit=limit, search_term=search)
+        total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
 
-            return {
-                "data": templates,
-                "pagination": {
-                    "current_page": page,
-                    "total_pages": total_pages,
-                    "limit": limit,
-                    "total_items": total_count,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1
-                }
-            }
-        else:
-            # Обычный список с пагинацией
-            templates = crud.get_characteristic_templates(db, skip=skip, limit=limit)
-            total_count = crud.get_characteristic_templates_count(db)
-            total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
-
-            return {
-                "data": templates,
-                "pagination": {
-                    "current_page": page,
-                    "total_pages": total_pages,
-                    "limit": limit,
-                    "total_items": total_count,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1
-                }
+        return {
+            "data": templates,
+            "pagination": {
+                "current_page": page,
+                "total_pages": total_pages,
+                "limit": limit,
+                "total_items": total_count,
+                "has_next": page < total_pages,
+                "has_prev": page > 1
             }
+        }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при получении шаблонов характеристик: {str(e)}")
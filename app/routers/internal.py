@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends
+from .. import bitmap_index, pool_metrics, query_stats, response_cache
+from ..dependencies import require_admin
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+@router.get("/metrics/queries")
+def read_query_metrics(_: dict = Depends(require_admin)):
+    return {
+        "n_plus_one_threshold": query_stats.N_PLUS_ONE_THRESHOLD,
+        "routes": query_stats.registry.snapshot()
+    }
+
+
+@router.delete("/metrics/queries")
+def reset_query_metrics(_: dict = Depends(require_admin)):
+    query_stats.registry.reset()
+    return {"message": "Query metrics reset"}
+
+
+@router.get("/metrics/pool")
+async def read_pool_metrics(_: dict = Depends(require_admin)):
+    return {
+        "pools": pool_metrics.snapshot(),
+        "threadpool": pool_metrics.threadpool_snapshot()
+    }
+
+
+@router.delete("/metrics/pool")
+def reset_pool_metrics(_: dict = Depends(require_admin)):
+    pool_metrics.reset()
+    return {"message": "Pool metrics reset"}
+
+
+@router.get("/metrics/cache")
+def read_cache_metrics(_: dict = Depends(require_admin)):
+    return response_cache.cache.snapshot()
+
+
+@router.delete("/metrics/cache")
+def clear_response_cache(_: dict = Depends(require_admin)):
+    response_cache.cache.clear()
+    return {"message": "Response cache cleared"}
+
+
+@router.get("/metrics/bitmap-index")
+def read_bitmap_index_metrics(_: dict = Depends(require_admin)):
+    return bitmap_index.index.snapshot()
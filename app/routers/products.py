@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
-from sqlalchemy import or_, Float
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List, cast
 from pydantic_core import ValidationError
-from .. import crud, schemas, database, models, dependencies
+from .. import crud, crud_async, schemas, database, models, dependencies, pagination, counters, etags, product_cards
+from .. import bitmap_index, facets, filtering, serializers
 from ..s3_service import s3_service
 import json
 
@@ -19,7 +21,7 @@ async def create_product_with_upload(
         brand_id: Optional[str] = Form(None),
         article: Optional[str] = Form(None),
         slug: Optional[str] = Form(None),
-        discount: float = Form(0),
+        discount: float = Form(0, ge=0, description=schemas.DISCOUNT_DESCRIPTION),
         small_description: Optional[str] = Form(None),
         full_description: Optional[str] = Form(None),
         characteristics: Optional[str] = Form(None),
@@ -41,11 +43,6 @@ async def create_product_with_upload(
             except ValueError:
                 raise HTTPException(status_code=400, detail="article должен быть числом")
 
-        # Проверка подкатегории
-        subcategory = db.query(models.Subcategory).filter(models.Subcategory.id == subcategory_id).first()
-        if not subcategory:
-            raise HTTPException(status_code=404, detail=f"Subcategory with id {subcategory_id} not found")
-
         brand_id_int = None
         if brand_id and brand_id.strip():
             try:
@@ -53,10 +50,6 @@ async def create_product_with_upload(
             except ValueError:
                 raise HTTPException(status_code=400, detail="brand_id должен быть числом")
 
-            brand = db.query(models.Brand).filter(models.Brand.id == brand_id_int).first()
-            if not brand:
-                raise HTTPException(status_code=404, detail=f"Brand with id {brand_id_int} not found")
-
         tag_ids_list = []
         if tag_ids and tag_ids.strip():
             try:
@@ -68,12 +61,16 @@ async def create_product_with_upload(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Неверный формат tag_ids")
 
-        if tag_ids_list:
-            existing_tags = db.query(models.Tag).filter(models.Tag.id.in_(tag_ids_list)).all()
-            existing_tag_ids = [tag.id for tag in existing_tags]
-            non_existing_tags = set(tag_ids_list) - set(existing_tag_ids)
-            if non_existing_tags:
-                raise HTTPException(status_code=404, detail=f"Tags with ids {list(non_existing_tags)} not found")
+        # Подкатегория, бренд и теги проверяются одним запросом
+        tag_ids_list = list(dict.fromkeys(tag_ids_list))
+        references = crud.get_product_references(db, subcategory_id, brand_id_int, tag_ids_list)
+        if not references["subcategory"]:
+            raise HTTPException(status_code=404, detail=f"Subcategory with id {subcategory_id} not found")
+        if brand_id_int is not None and not references["brand"]:
+            raise HTTPException(status_code=404, detail=f"Brand with id {brand_id_int} not found")
+        non_existing_tags = set(tag_ids_list) - set(references["tags"])
+        if non_existing_tags:
+            raise HTTPException(status_code=404, detail=f"Tags with ids {list(non_existing_tags)} not found")
 
         # Парсинг характеристик
         characteristics_data = []
@@ -116,41 +113,15 @@ async def create_product_with_upload(
         except ValidationError as e:
             raise HTTPException(status_code=422, detail=f"Ошибка валидации данных: {str(e)}")
 
-        # Создаем продукт в базе данных
-        db_product = crud.create_product_with_characteristics(
+        # Продукт, изображения, характеристики и теги сохраняются одной транзакцией
+        return crud.create_product_with_characteristics(
             db=db,
-            product=product_create,  # Теперь передаем ProductCreateForm
+            product=product_create,
             characteristics=characteristics_data,
-            image_urls=image_urls
+            image_urls=image_urls,
+            tags=[references["tags"][tag_id] for tag_id in tag_ids_list]
         )
 
-        # Добавление тегов
-        if tag_ids_list:
-            for tag_id in tag_ids_list:
-                product_tag = models.ProductTag(product_id=db_product.id, tag_id=tag_id)
-                db.add(product_tag)
-            db.commit()
-
-        # Получение продукта с отношениями
-        db_product_with_relations = db.query(models.Product).options(
-            joinedload(models.Product.tags),
-            joinedload(models.Product.brand),
-            joinedload(models.Product.subcategory),
-            joinedload(models.Product.images),
-            joinedload(models.Product.characteristics_assoc).joinedload(models.ProductCharacteristic.characteristic)
-        ).filter(models.Product.id == db_product.id).first()
-
-        response_data = {
-            **db_product_with_relations.__dict__,
-            "images": [img.image_url for img in db_product_with_relations.images],
-            "tags": db_product_with_relations.tags,
-            "brand": db_product_with_relations.brand,
-            "subcategory": db_product_with_relations.subcategory,
-            "characteristics": db_product_with_relations.characteristics
-        }
-
-        return response_data
-
     except ValueError as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -159,278 +130,193 @@ async def create_product_with_upload(
         raise HTTPException(status_code=500, detail=f"Error creating product: {str(e)}")
 
 
+FILTER_ROUTE_PARAMS = {"page", "page_size", "sort", "subcategory_id", "brand_id", "tag_id", "in_stock", "with_total"}
+
+
 @router.get("/filter/", operation_id="get_filtered_products")
-def get_filtered_products(
+async def get_filtered_products(
+        request: Request,
         page: int = Query(1, ge=1, description="Номер страницы"),
         page_size: int = Query(20, ge=1, le=100, description="Количество элементов на странице"),
-        db: Session = Depends(database.get_db),
-
-        **filters: str
+        sort: str = Query("id", pattern=pagination.PRODUCT_SORT_PATTERN, description=pagination.PRODUCT_SORT_DESCRIPTION),
+        subcategory_id: Optional[int] = Query(None, description="Подкатегория"),
+        brand_id: Optional[int] = Query(None, description="Бренд"),
+        tag_id: Optional[int] = Query(None, description="Тег"),
+        in_stock: Optional[bool] = Query(None, description="Только в наличии / только отсутствующие"),
+        with_total: bool = Query(True, description="Считать общее количество (false - без total_count и total_pages)"),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
-    try:
-
-        filter_params = {k: v for k, v in filters.items()
-                         if k not in ['skip', 'limit', 'page', 'page_size']}
+    """
+    Товары, отфильтрованные по характеристикам: остальные query-параметры - фильтры
+    (name=value, name=v1,v2, name=min-max для числовых характеристик, name__min=..., name__max=...)
+    """
+    filters = filtering.parse_filters(request.query_params, FILTER_ROUTE_PARAMS)
+    conditions = filtering.conditions(filters)
+    if subcategory_id is not None:
+        conditions.append(models.Product.subcategory_id == subcategory_id)
+    if brand_id is not None:
+        conditions.append(models.Product.brand_id == brand_id)
+    if tag_id is not None:
+        conditions.append(models.Product.id.in_(
+            select(models.ProductTag.product_id).where(models.ProductTag.tag_id == tag_id)
+        ))
+    if in_stock is not None:
+        conditions.append(models.Product.in_stock == in_stock)
 
+    try:
         skip = (page - 1) * page_size
-
-        products = crud.get_products_with_filters(
-            db,
-            filters=filter_params,
-            skip=skip,
-            limit=page_size
-        )
-
-        total_count = crud.get_products_count_with_filters(db, filter_params)
-
-        total_pages = (total_count + page_size - 1) // page_size
-
-        result_products = []
-        for product in products:
-            product_data = schemas.ProductResponse.from_orm(product)
-            product_data.images = [img.image_url for img in product.images]
-            result_products.append(product_data)
-
-        return {
-            "products": result_products,
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total_count": total_count,
-                "total_pages": total_pages,
-                "has_next": page < total_pages,
-                "has_prev": page > 1
-            }
-        }
-
+        sort_key = pagination.PRODUCT_SORTS[sort]
+        total_count = None
+        if bitmap_index.active():
+            # Совпадения и total - из битовых карт, SQL только за строками страницы среди тех же id.
+            # При другой сортировке SQL выбирает страницу из всех совпадений, поэтому их число ограничено;
+            # больше - и строки, и total считает SQL
+            bitmap_index.index.sync_soon()
+            matched = bitmap_index.index.match(filters, subcategory_id=subcategory_id, brand_id=brand_id,
+                                               tag_id=tag_id, in_stock=in_stock)
+            if sort == "id":
+                skip, conditions = 0, [models.Product.id.in_(bitmap_index.to_ids(matched, skip, page_size))]
+                total_count = len(matched) if with_total else None
+            elif len(matched) <= bitmap_index.BITMAP_INDEX_SORT_LIMIT:
+                conditions = [models.Product.id.in_(bitmap_index.to_ids(matched))]
+                total_count = len(matched) if with_total else None
+        if with_total and total_count is None:
+            products, total_count = await crud_async.get_products_page(
+                db, skip=skip, limit=page_size, sort_key=sort_key, conditions=conditions
+            )
+        else:
+            products = await crud_async.get_products(
+                db, skip=skip, limit=page_size, sort_key=sort_key, conditions=conditions
+            )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error filtering products: {str(e)}")
 
+    total_pages = (total_count + page_size - 1) // page_size if total_count is not None else None
+    return serializers.TrustedJSONResponse({
+        "products": products,
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total_count": total_count,
+            "total_pages": total_pages,
+            "has_next": page < total_pages if total_pages is not None else len(products) == page_size,
+            "has_prev": page > 1
+        }
+    })
 
-def get_products_count_with_filters(db: Session, filters: dict):
-    query = db.query(models.Product)
-
-    for filter_name, filter_value in filters.items():
-        if '-' in filter_value and any(c.isdigit() for c in filter_value):
-            try:
-                min_val, max_val = map(float, filter_value.split('-'))
-
-                subquery = db.query(models.CharacteristicItem.product_id).join(
-                    models.CharacteristicItem.characteristic
-                ).filter(
-                    or_(
-                        models.Characteristic.name == filter_name,
-                        models.Characteristic.label == filter_name
-                    ),
-                    cast(models.CharacteristicItem.value, Float) >= min_val,
-                    cast(models.CharacteristicItem.value, Float) <= max_val
-                ).subquery()
-
-                query = query.filter(models.Product.id.in_(subquery))
-
-            except ValueError:
-                continue
-
-        elif ',' in filter_value:
-            values = [v.strip() for v in filter_value.split(',')]
-
-            subquery = db.query(models.CharacteristicItem.product_id).join(
-                models.CharacteristicItem.characteristic
-            ).filter(
-                or_(
-                    models.Characteristic.name == filter_name,
-                    models.Characteristic.label == filter_name
-                ),
-                models.CharacteristicItem.value.in_(values)
-            ).subquery()
-
-            query = query.filter(models.Product.id.in_(subquery))
-
-        else:
-            subquery = db.query(models.CharacteristicItem.product_id).join(
-                models.CharacteristicItem.characteristic
-            ).filter(
-                or_(
-                    models.Characteristic.name == filter_name,
-                    models.Characteristic.label == filter_name
-                ),
-                models.CharacteristicItem.value == filter_value
-            ).subquery()
-
-            query = query.filter(models.Product.id.in_(subquery))
-
-    return query.distinct().count()
-
-
-def get_products_with_filters(
-        db: Session,
-        filters: dict,
-        skip: int = 0,
-        limit: int = 100
-):
-    query = db.query(models.Product)
-
-    for filter_name, filter_value in filters.items():
-
-        if '-' in filter_value and any(c.isdigit() for c in filter_value):
-            try:
-                min_val, max_val = map(float, filter_value.split('-'))
-
-                subquery = db.query(models.CharacteristicItem.product_id).join(
-                    models.CharacteristicItem.characteristic
-                ).filter(
-
-                    or_(
-                        models.Characteristic.name == filter_name,
-                        models.Characteristic.label == filter_name
-                    ),
-                    cast(models.CharacteristicItem.value, Float) >= min_val,
-                    cast(models.CharacteristicItem.value, Float) <= max_val
-                ).subquery()
-
-                query = query.filter(models.Product.id.in_(subquery))
-
-            except ValueError:
-                continue
-
-
-        elif ',' in filter_value:
-            values = [v.strip() for v in filter_value.split(',')]
-
-            subquery = db.query(models.CharacteristicItem.product_id).join(
-                models.CharacteristicItem.characteristic
-            ).filter(
-
-                or_(
-                    models.Characteristic.name == filter_name,
-                    models.Characteristic.label == filter_name
-                ),
-                models.CharacteristicItem.value.in_(values)
-            ).subquery()
-
-            query = query.filter(models.Product.id.in_(subquery))
-
-
-        else:
-            subquery = db.query(models.CharacteristicItem.product_id).join(
-                models.CharacteristicItem.characteristic
-            ).filter(
-
-                or_(
-                    models.Characteristic.name == filter_name,
-                    models.Characteristic.label == filter_name
-                ),
-                models.CharacteristicItem.value == filter_value
-            ).subquery()
-
-            query = query.filter(models.Product.id.in_(subquery))
 
-    return query.distinct().offset(skip).limit(limit).all()
+FACET_ROUTE_PARAMS = {"brand_id", "in_stock"}
 
 
 @router.get("/filters/{subcategory_id}", operation_id="get_available_filters_for_subcategory")
-def get_available_filters(subcategory_id: int, db: Session = Depends(database.get_db)):
-    return crud.get_filters_for_subcategory(db, subcategory_id)
+async def get_available_filters(
+        subcategory_id: int,
+        request: Request,
+        brand_id: Optional[int] = Query(None, description="Бренд"),
+        in_stock: Optional[bool] = Query(None, description="Только в наличии / только отсутствующие"),
+        db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Фасеты подкатегории: значения характеристик с числом товаров и числовые min/max.
+    Остальные query-параметры - выбранные фильтры в формате /products/filter/
+    """
+    filters = filtering.parse_filters(request.query_params, FACET_ROUTE_PARAMS)
+    try:
+        result = await facets.get_facets(db, subcategory_id, filters, brand_id=brand_id, in_stock=in_stock)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building filters: {str(e)}")
+    return serializers.TrustedJSONResponse({"subcategory_id": subcategory_id, "facets": result})
 
 
 @router.get("/", response_model=schemas.PaginatedResponse, operation_id="get_products_paginated")
-def read_products(
+async def read_products(
         page: int = Query(1, ge=1, description="Номер страницы"),
         size: int = Query(20, ge=1, le=100, description="Размер страницы"),
-        db: Session = Depends(database.get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (пустая строка - первая страница)"),
+        with_total: bool = Query(True, description="Считать общее количество (false - без total и pages)"),
+        sort: str = Query("id", pattern=pagination.PRODUCT_SORT_PATTERN, description=pagination.PRODUCT_SORT_DESCRIPTION),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
     try:
+        sort_key = pagination.PRODUCT_SORTS[sort]
+        if cursor is not None:
+            after = pagination.decode_cursor(cursor, sort_key)
+            products = await crud_async.get_products(db, limit=size + 1, sort_key=sort_key, after=after)
+            products, next_cursor = pagination.split_page(products, size, sort_key)
+            return serializers.TrustedJSONResponse(serializers.page(products, size, next_cursor=next_cursor))
+
         skip = (page - 1) * size
-        products = crud.get_products(db, skip=skip, limit=size)
-        total = db.query(models.Product).count()
+        if with_total:
+            products, total = await crud_async.get_products_page(db, skip=skip, limit=size, sort_key=sort_key)
+        else:
+            products, total = await crud_async.get_products(db, skip=skip, limit=size, sort_key=sort_key), None
 
-        return {
-            "items": products,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size if size > 0 else 1
-        }
+        return serializers.TrustedJSONResponse(serializers.page(products, size, total=total, page=page))
     except HTTPException as e:
         raise e
 
 
+@router.post("/lookup", response_model=schemas.ProductLookupResponse, operation_id="lookup_products")
+async def lookup_products(lookup: schemas.ProductLookupRequest, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Получить товары по списку id, slug или артикулов (корзина, избранное, сравнение) в порядке запроса
+    """
+    key, values = lookup.key()
+    if lookup.detail:
+        products, similar = await crud_async.lookup_product_details(db, key, values)
+        found = {getattr(product, key): serializers.product_detail(product, similar[product.id]) for product in products}
+    else:
+        cards = await crud_async.lookup_product_cards(db, key, values)
+        found = {getattr(card, key): serializers.product_card(card) for card in cards}
+
+    return serializers.TrustedJSONResponse({
+        "items": [found[value] for value in values if value in found],
+        "missing": [value for value in values if value not in found]
+    })
+
+
+def _product_export_batches():
+    # Тело отдается после выхода из зависимостей, поэтому у выгрузки своя сессия на время ответа
+    db = database.SessionLocal()
+    try:
+        yield from crud.iter_product_batches(db)
+    finally:
+        db.close()
+
+
+@router.get("/export", response_model=List[schemas.ProductResponse], operation_id="export_products")
+def export_products(_current_user: dict = Depends(dependencies.require_admin)):
+    """
+    Выгрузить все продукты одним JSON-массивом; ответ передается потоком по мере чтения из базы
+    """
+    return serializers.StreamingJSONResponse(_product_export_batches())
+
+
 @router.get("/{slug}", response_model=schemas.ProductDetail, operation_id="get_product_by_slug")
-def get_product_by_slug(slug: str, db: Session = Depends(database.get_db)):
+async def get_product_by_slug(slug: str, request: Request, db: AsyncSession = Depends(database.get_async_db)):
     """
     Получить полную информацию о продукте по slug
     """
     try:
+        version = await crud_async.get_product_version(db, slug=slug)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        etag = etags.product_etag(version.id, version.revision, version.category_revision)
+        if etags.matches(request, etag):
+            return etags.not_modified(etag)
+
         # Получаем продукт со всеми отношениями
-        product = db.query(models.Product).options(
-            joinedload(models.Product.images),
-            joinedload(models.Product.tags),
-            joinedload(models.Product.brand),
-            joinedload(models.Product.subcategory).joinedload(models.Subcategory.category),
-            joinedload(models.Product.warehouses),
-            joinedload(models.Product.documents),
-            joinedload(models.Product.additional_products),
-            joinedload(models.Product.characteristics_assoc).joinedload(models.ProductCharacteristic.characteristic),
-            joinedload(models.Product.similar_products).options(
-                joinedload(models.Product.images)
-            )
-        ).filter(models.Product.slug == slug).first()
+        product = await crud_async.get_product_detail_by_slug(db, slug=slug)
 
         if product is None:
             raise HTTPException(status_code=404, detail="Product not found")
 
-        # Формируем ответ
-        product_detail = schemas.ProductDetail(
-            id=product.id,
-            text=product.text,
-            article=product.article,
-            price=product.price,
-            discount=product.discount,
-            slug=product.slug,
-            in_stock=product.in_stock,
-            small_description=product.small_description,
-            full_description=product.full_description,
-            subcategory_id=product.subcategory_id,
-            brand_id=product.brand_id,
-            images=[img.image_url for img in product.images],
-            characteristics=[
-                schemas.CharacteristicItemResponse(
-                    id=char_assoc.characteristic.id,
-                    name=char_assoc.characteristic.name,
-                    label=char_assoc.characteristic.label,
-                    value=char_assoc.characteristic.value
-                ) for char_assoc in product.characteristics_assoc
-                if char_assoc.characteristic
-            ],
-            tags=[schemas.TagResponse.from_orm(tag) for tag in product.tags],
-            brand=schemas.BrandResponse.from_orm(product.brand) if product.brand else None,
-            subcategory=schemas.SubcategoryResponse.from_orm(product.subcategory) if product.subcategory else None,
-            category=schemas.CategoryResponse.from_orm(
-                product.subcategory.category) if product.subcategory and product.subcategory.category else None,
-            warehouses=[wh.address for wh in product.warehouses],
-            documents=[{"name": doc.name, "file_url": doc.file_url} for doc in product.documents],
-            additional_products=[
-                {"name": ap.name, "value": ap.value, "product_slug": ap.product_slug}
-                for ap in product.additional_products
-            ],
-            similar_products=[
-                schemas.ProductShortResponse(
-                    id=similar.id,
-                    text=similar.text,
-                    article=similar.article,
-                    price=similar.price,
-                    discount=similar.discount,
-                    slug=similar.slug,
-                    small_description=similar.small_description,
-                    subcategory_id=similar.subcategory_id,
-                    brand_id=similar.brand_id,
-                    image=similar.images[0].image_url if similar.images else None
-                ) for similar in product.similar_products
-            ]
+        similar_cards = await crud_async.get_similar_cards(db, product_id=product.id)
+        return serializers.TrustedJSONResponse(
+            serializers.product_detail(product, similar_cards), headers={"ETag": etag}
         )
 
-        return product_detail
-
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -446,7 +332,7 @@ async def update_product(
         slug: Optional[str] = Form(None),
         subcategory_id: Optional[int] = Form(None),
         brand_id: Optional[str] = Form(None),
-        discount: Optional[float] = Form(None),
+        discount: Optional[float] = Form(None, ge=0, description=schemas.DISCOUNT_DESCRIPTION),
         characteristics: Optional[str] = Form(None),
         images: Optional[List[UploadFile]] = File(None),
         small_description: Optional[str] = Form(None),
@@ -568,49 +454,25 @@ async def update_product(
                     if not all(key in char for key in ['name', 'label', 'value']):
                         raise ValueError("Каждая характеристика должна содержать name, label и value")
 
-                # Удаляем старые характеристики
+                # Заменяем связи продукта; значения берутся из общего словаря характеристик
                 db.query(models.ProductCharacteristic).filter(
                     models.ProductCharacteristic.product_id == product_id
                 ).delete()
-
-                # Удаляем старые characteristic_items которые больше нигде не используются
-                old_chars = db.query(models.CharacteristicItem).join(
-                    models.ProductCharacteristic
-                ).filter(
-                    models.ProductCharacteristic.product_id == product_id
-                ).all()
-
-                for old_char in old_chars:
-                    # Проверяем используется ли характеристика в других продуктах
-                    other_usage = db.query(models.ProductCharacteristic).filter(
-                        models.ProductCharacteristic.characteristic_id == old_char.id,
-                        models.ProductCharacteristic.product_id != product_id
-                    ).first()
-                    if not other_usage:
-                        db.delete(old_char)
-
-                # Добавляем новые характеристики (как в создании)
-                for char_data in characteristics_data:
-                    characteristic = models.CharacteristicItem(
-                        name=char_data['name'],
-                        label=char_data['label'],
-                        value=char_data['value']
-                    )
-                    db.add(characteristic)
-                    db.flush()
-
-                    # СОЗДАЕМ СВЯЗЬ БЕЗ custom_value (как в создании)
-                    product_char = models.ProductCharacteristic(
-                        product_id=product_id,
-                        characteristic_id=characteristic.id
-                        # Не передаем custom_value если его нет в модели
-                    )
-                    db.add(product_char)
+                characteristic_ids = crud.intern_characteristics(db, characteristics_data)
+                if characteristic_ids:
+                    db.execute(insert(models.ProductCharacteristic), [
+                        {"product_id": product_id, "characteristic_id": characteristic_id}
+                        for characteristic_id in characteristic_ids
+                    ])
 
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Неверный формат characteristics")
 
+        # Изображения и характеристики не меняют строку продукта, версию для ETag поднимаем явно
+        crud.touch_products(db, models.Product.id == product_id)
+        product_cards.refresh(db, [product_id])
         db.commit()
+        bitmap_index.refresh(db, [product_id])
 
         # Получаем обновленный продукт с отношениями
         db_product_with_relations = db.query(models.Product).options(
@@ -621,27 +483,7 @@ async def update_product(
             joinedload(models.Product.characteristics_assoc).joinedload(models.ProductCharacteristic.characteristic)
         ).filter(models.Product.id == product_id).first()
 
-        # Формируем ответ (как в создании)
-        product_characteristics = []
-        for char_assoc in db_product_with_relations.characteristics_assoc:
-            if char_assoc.characteristic:
-                product_characteristics.append({
-                    "id": char_assoc.characteristic.id,
-                    "name": char_assoc.characteristic.name,
-                    "label": char_assoc.characteristic.label,
-                    "value": char_assoc.characteristic.value,
-                })
-
-        response_data = {
-            **db_product_with_relations.__dict__,
-            "images": [img.image_url for img in db_product_with_relations.images],
-            "tags": db_product_with_relations.tags,
-            "brand": db_product_with_relations.brand,
-            "subcategory": db_product_with_relations.subcategory,
-            "characteristics": product_characteristics
-        }
-
-        return response_data
+        return serializers.TrustedJSONResponse(serializers.product(db_product_with_relations))
 
     except HTTPException as e:
         db.rollback()
@@ -671,8 +513,12 @@ def delete_product(
                     print(f"Error deleting image from S3: {e}")
 
         # Удаляем продукт (связанные записи удалятся каскадно)
+        counters.adjust(db, counters.product_scope_keys(db, product_id), -1)
+        crud.touch_products(db, models.Product.id == product_id)
         db.delete(product)
+        product_cards.refresh(db, [product_id])
         db.commit()
+        bitmap_index.refresh(db, [product_id])
 
         return {"message": "Product deleted successfully"}
 
@@ -683,66 +529,49 @@ def delete_product(
 
 @router.get("/category/{category_slug}", response_model=schemas.PaginatedResponse,
             operation_id="get_products_by_category_slug")
-def get_products_by_category_slug(
+async def get_products_by_category_slug(
         category_slug: str,
         page: int = Query(1, ge=1, description="Номер страницы"),
         size: int = Query(20, ge=1, le=100, description="Размер страницы"),
-        db: Session = Depends(database.get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (пустая строка - первая страница)"),
+        with_total: bool = Query(True, description="Считать общее количество (false - без total и pages)"),
+        sort: str = Query("id", pattern=pagination.PRODUCT_SORT_PATTERN, description=pagination.PRODUCT_SORT_DESCRIPTION),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Получить все продукты для категории по её slug (только основные поля)
     """
     try:
         # Проверяем существование категории по slug
-        category = db.query(models.Category).filter(models.Category.slug == category_slug).first()
+        category = await crud_async.get_category_by_slug(db, slug=category_slug)
         if not category:
             raise HTTPException(status_code=404, detail=f"Category with slug '{category_slug}' not found")
 
-        skip = (page - 1) * size
+        sort_key = pagination.CARD_SORTS[sort]
 
-        # Получаем продукты через подкатегории
-        db_products = db.query(models.Product).options(
-            joinedload(models.Product.images)
-        ).join(
-            models.Subcategory
-        ).filter(
-            models.Subcategory.category_id == category.id
-        ).offset(skip).limit(size).all()
-
-        # Преобразуем в упрощенную схему
-        products = []
-        for db_product in db_products:
-            # Берем только первое изображение
-            first_image = db_product.images[0].image_url if db_product.images else None
-
-            product_data = schemas.ProductShortResponse(
-                id=db_product.id,
-                text=db_product.text,
-                article=db_product.article,
-                price=db_product.price,
-                discount=db_product.discount,
-                slug=db_product.slug,
-                small_description=db_product.small_description,
-                subcategory_id=db_product.subcategory_id,
-                brand_id=db_product.brand_id,
-                image=first_image
+        # Карточки уже содержат первое изображение и категорию
+        if cursor is not None:
+            cards = await crud_async.get_products_by_category_id(
+                db, category_id=category.id, limit=size + 1, sort_key=sort_key,
+                after=pagination.decode_cursor(cursor, sort_key)
             )
-            products.append(product_data)
-
-        # Получаем общее количество
-        total = db.query(models.Product).join(
-            models.Subcategory
-        ).filter(
-            models.Subcategory.category_id == category.id
-        ).count()
-
-        return {
-            "items": products,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size if size > 0 else 1
-        }
+            cards, next_cursor = pagination.split_page(cards, size, sort_key)
+            products = [serializers.product_card(card) for card in cards]
+            return serializers.TrustedJSONResponse(serializers.page(products, size, next_cursor=next_cursor))
+
+        skip = (page - 1) * size
+        if with_total:
+            # Страница и общее количество одним запросом
+            cards, total = await crud_async.get_products_page_by_category_id(
+                db, category_id=category.id, skip=skip, limit=size, sort_key=sort_key
+            )
+        else:
+            cards, total = await crud_async.get_products_by_category_id(
+                db, category_id=category.id, skip=skip, limit=size, sort_key=sort_key
+            ), None
+
+        products = [serializers.product_card(card) for card in cards]
+        return serializers.TrustedJSONResponse(serializers.page(products, size, total=total, page=page))
 
     except HTTPException as e:
         raise e
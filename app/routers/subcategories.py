@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from .. import crud, schemas, database, models
+from .. import crud, crud_async, schemas, database, models, pagination, counters, product_cards, serializers
 from ..s3_service import s3_service, TimeWebS3Service
 from ..dependencies import require_admin
 
@@ -46,46 +47,59 @@ async def create_subcategory_with_upload(
 
 
 @router.get("/", response_model=schemas.SubcategoryPaginatedResponse)
-def read_subcategories(
+async def read_subcategories(
         search: Optional[str] = Query(None, description="Поисковый запрос"),
         page: int = Query(1, ge=1, description="Номер страницы"),
         limit: int = Query(10, ge=1, le=100, description="Количество записей на странице (1-100)"),
-        db: Session = Depends(database.get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (пустая строка - первая страница)"),
+        with_total: bool = Query(True, description="Считать общее количество (false - без total и pages)"),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
     try:
+        if cursor is not None:
+            after = pagination.decode_cursor(cursor, pagination.SUBCATEGORY_SORT)
+            if search:
+                subcategories = await crud_async.search_subcategories(db, search_term=search, limit=limit + 1, after=after)
+            else:
+                subcategories = await crud_async.get_subcategories(db, limit=limit + 1, after=after)
+            subcategories, next_cursor = pagination.split_page(subcategories, limit, pagination.SUBCATEGORY_SORT)
+            return serializers.TrustedJSONResponse(
+                serializers.data_page([serializers.subcategory(item) for item in subcategories], next_cursor=next_cursor)
+            )
 
         skip = (page - 1) * limit
 
         if search:
-            subcategories = crud.search_subcategories(db, search_term=search, skip=skip, limit=limit)
-            return {
-                "data": subcategories,
-            }
+            subcategories = await crud_async.search_subcategories(db, search_term=search, skip=skip, limit=limit)
+            return serializers.TrustedJSONResponse(
+                serializers.data_page([serializers.subcategory(item) for item in subcategories])
+            )
 
         else:
 
-            subcategories = crud.get_subcategories(db, skip=skip, limit=limit)
-            total_count = crud.get_subcategories_count(db)
-            total_pages = (total_count + limit - 1) // limit
+            subcategories, total_count = await crud_async.get_subcategories_page(
+                db, skip=skip, limit=limit, with_total=with_total
+            )
+            total_pages = (total_count + limit - 1) // limit if total_count is not None else None
 
-            return {
-                "data": subcategories,
-                "pagination": {
+            return serializers.TrustedJSONResponse(serializers.data_page(
+                [serializers.subcategory(item) for item in subcategories],
+                {
                     "current_page": page,
                     "total_pages": total_pages,
                     "limit": limit,
                     "total_items": total_count
                 }
-            }
+            ))
 
     except HTTPException as e:
         raise e
 
 
 @router.get("/{subcategory_id}", response_model=schemas.Subcategory)
-def read_subcategory(subcategory_id: int, db: Session = Depends(database.get_db)):
+async def read_subcategory(subcategory_id: int, db: AsyncSession = Depends(database.get_async_db)):
     try:
-        subcategory = crud.get_subcategory_by_id(db, subcategory_id=subcategory_id)
+        subcategory = await crud_async.get_subcategory_by_id(db, subcategory_id=subcategory_id)
         if subcategory is None:
             raise HTTPException(status_code=404, detail="Subcategory not found")
         return subcategory
@@ -94,9 +108,9 @@ def read_subcategory(subcategory_id: int, db: Session = Depends(database.get_db)
 
 
 @router.get("/slug/{slug}", response_model=schemas.Subcategory)
-def read_subcategory_by_slug(slug: str, db: Session = Depends(database.get_db)):
+async def read_subcategory_by_slug(slug: str, db: AsyncSession = Depends(database.get_async_db)):
     try:
-        subcategory = crud.get_subcategory_by_slug(db, slug=slug)
+        subcategory = await crud_async.get_subcategory_by_slug(db, slug=slug)
         if subcategory is None:
             raise HTTPException(status_code=404, detail="Subcategory not found")
         return subcategory
@@ -200,7 +214,10 @@ async def delete_subcategory(
             except Exception as img_error:
                 print(f"Warning: Could not delete subcategory image {subcategory.image}: {img_error}")
 
+        crud.touch_products(db, models.Product.subcategory_id == subcategory_id)
         db.delete(subcategory)
+        product_cards.refresh(db, product_cards.cards_where(models.ProductCard.subcategory_id == subcategory_id))
+        counters.invalidate(db, *counters.PRODUCT_SCOPES, counters.SUBCATEGORIES)
         db.commit()
 
         return {
@@ -218,23 +235,21 @@ async def delete_subcategory(
 
 
 @router.get("/category/{category_slug}", response_model=List[schemas.Subcategory])
-def get_subcategories_by_category(
+async def get_subcategories_by_category(
         category_slug: str,
-        db: Session = Depends(database.get_db)
+        db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Получить все подкатегории для определенной категории
     """
     try:
-        category = db.query(models.Category).filter(models.Category.slug == category_slug).first()
+        category = await crud_async.get_category_by_slug(db, slug=category_slug)
         if not category:
             raise HTTPException(status_code=404, detail=f"Category with slug '{category_slug}' not found")
 
-        subcategories = db.query(models.Subcategory).filter(
-            models.Subcategory.category_id == category.id
-        ).all()
+        subcategories = await crud_async.get_subcategories_by_category_id(db, category_id=category.id)
 
-        return subcategories
+        return serializers.TrustedJSONResponse([serializers.subcategory(item) for item in subcategories])
 
     except HTTPException as e:
         raise e
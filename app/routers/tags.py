@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from .. import schemas, crud, database, dependencies
+from typing import List, Optional
+from .. import schemas, crud, crud_async, database, dependencies, pagination, serializers
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
@@ -19,82 +20,95 @@ def create_tag(
 
 
 @router.get("/", response_model=schemas.TagPaginatedResponse)
-def read_tags(
+async def read_tags(
         page: int = Query(1, ge=1, description="Номер страницы"),
         limit: int = Query(10, ge=1, le=100, description="Количество записей на странице (1-100)"),
-        db: Session = Depends(database.get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (пустая строка - первая страница)"),
+        with_total: bool = Query(True, description="Считать общее количество (false - без total и pages)"),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
     try:
-        skip = (page - 1) * limit
+        if cursor is not None:
+            after = pagination.decode_cursor(cursor, pagination.TAG_SORT)
+            tags = await crud_async.get_all_tags(db, limit=limit + 1, after=after)
+            tags, next_cursor = pagination.split_page(tags, limit, pagination.TAG_SORT)
+            return serializers.TrustedJSONResponse(
+                serializers.data_page([serializers.tag(tag) for tag in tags], next_cursor=next_cursor)
+            )
 
-        tags = crud.get_all_tags(db, skip=skip, limit=limit)
+        skip = (page - 1) * limit
 
-        total_count = crud.get_tags_count(db)
+        tags, total_count = await crud_async.get_tags_page(db, skip=skip, limit=limit, with_total=with_total)
 
-        total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
+        if total_count is None:
+            total_pages = None
+        else:
+            total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
 
-        return {
-            "data": tags,
-            "pagination": {
+        return serializers.TrustedJSONResponse(serializers.data_page(
+            [serializers.tag(tag) for tag in tags],
+            {
                 "current_page": page,
                 "total_pages": total_pages,
                 "limit": limit,
                 "total_items": total_count
             }
-        }
+        ))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при получении тегов: {str(e)}")
 
 
 @router.get("/{tag_id}", response_model=schemas.TagResponse)
-def read_tag(tag_id: int, db: Session = Depends(database.get_db)):
-    tag = crud.get_tag_by_id(db, tag_id)
+async def read_tag(tag_id: int, db: AsyncSession = Depends(database.get_async_db)):
+    tag = await crud_async.get_tag_by_id(db, tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     return tag
 
 
 @router.get("/value/{tag_value}", response_model=schemas.TagResponse)
-def read_tag_by_value(tag_value: str, db: Session = Depends(database.get_db)):
-    tag = crud.get_tag_by_value(db, tag_value)
+async def read_tag_by_value(tag_value: str, db: AsyncSession = Depends(database.get_async_db)):
+    tag = await crud_async.get_tag_by_value(db, tag_value)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     return tag
 
 
 @router.get("/{tag_value}/products", response_model=schemas.ProductsByTagResponse)
-def get_products_by_tag_value(
+async def get_products_by_tag_value(
         tag_value: str,
         limit: int = Query(20, le=50),  # Максимум 50 продуктов
-        db: Session = Depends(database.get_db)
+        with_total: bool = Query(True, description="Считать общее количество (false - без total)"),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
-    tag, products, total = crud.get_products_by_tag_value(db, tag_value, limit)
+    tag, products, total = await crud_async.get_products_by_tag_value(db, tag_value, limit, with_total)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
 
-    return {
-        "tag": tag,
+    return serializers.TrustedJSONResponse({
+        "tag": serializers.tag(tag),
         "products": products,
         "total": total
-    }
+    })
 
 
 @router.get("/{tag_id}/products", response_model=schemas.ProductsByTagResponse)
-def get_products_by_tag_id(
+async def get_products_by_tag_id(
         tag_id: int,
         limit: int = Query(20, le=50),
-        db: Session = Depends(database.get_db)
+        with_total: bool = Query(True, description="Считать общее количество (false - без total)"),
+        db: AsyncSession = Depends(database.get_async_db)
 ):
-    tag, products, total = crud.get_products_by_tag_id(db, tag_id, limit)
+    tag, products, total = await crud_async.get_products_by_tag_id(db, tag_id, limit, with_total)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
 
-    return {
-        "tag": tag,
+    return serializers.TrustedJSONResponse({
+        "tag": serializers.tag(tag),
         "products": products,
         "total": total
-    }
+    })
 
 
 @router.put("/{tag_id}", response_model=schemas.TagResponse)
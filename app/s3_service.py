@@ -1,4 +1,3 @@
-import boto3
 from botocore.exceptions import NoCredentialsError, ClientError
 import os
 from fastapi import UploadFile, HTTPException
@@ -10,18 +9,33 @@ load_dotenv()
 
 
 class TimeWebS3Service:
+    # Клиент и проверка бакета общие для всех экземпляров и создаются при первом обращении,
+    # чтобы импорт приложения не зависел от доступности S3
+    _client = None
+
     def __init__(self):
+        self.bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+
+    @property
+    def s3_client(self):
+        if TimeWebS3Service._client is None:
+            TimeWebS3Service._client = self._connect()
+        return TimeWebS3Service._client
+
+    def _connect(self):
+        import boto3
+
         try:
-            self.s3_client = boto3.client(
+            s3_client = boto3.client(
                 's3',
                 aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
                 aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
                 endpoint_url=os.getenv('AWS_S3_ENDPOINT_URL'),
                 region_name=os.getenv('AWS_REGION', 'ru-1')
             )
-            self.bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
 
-            self.s3_client.head_bucket(Bucket=self.bucket_name)
+            s3_client.head_bucket(Bucket=self.bucket_name)
+            return s3_client
 
         except NoCredentialsError:
             raise HTTPException(status_code=500, detail="AWS credentials not configured")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator, model_validator, Field, EmailStr, validator, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 import re
 from slugify import slugify
 import enum
@@ -79,15 +79,16 @@ class TokenData(BaseModel):
 
 class PaginatedResponse(BaseModel):
     items: List
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Только в режиме курсорной пагинации
 
 
 class PaginationInfo(BaseModel):
     current_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
     limit: int
     total_items: Optional[int] = None
 
@@ -95,11 +96,13 @@ class PaginationInfo(BaseModel):
 class CategoryPaginatedResponse(BaseModel):
     data: List['Category']
     pagination: Optional[PaginationInfo] = None
+    next_cursor: Optional[str] = None
 
 
 class SubcategoryPaginatedResponse(BaseModel):
     data: List['Subcategory']
     pagination: Optional[PaginationInfo] = None
+    next_cursor: Optional[str] = None
 
 
 class TagBase(BaseModel):
@@ -115,7 +118,8 @@ class TagResponse(TagBase):
 
 class TagPaginatedResponse(BaseModel):
     data: List[TagResponse]
-    pagination: PaginationInfo
+    pagination: Optional[PaginationInfo] = None
+    next_cursor: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -324,8 +328,8 @@ class SubcategoryUpdate(BaseModel):
     image: Optional[str] = None
     text: Optional[str] = None
     slug: Optional[str] = None
-    category_id: Optional[str] = None
-    brand_id: Optional[str] = None
+    category_id: Optional[int] = None
+    brand_id: Optional[int] = None
 
     @field_validator('slug')
     @classmethod
@@ -417,11 +421,15 @@ class CharacteristicTemplatePaginatedResponse(BaseModel):
     pagination: Optional[Dict[str, Any]] = None
 
 
+# Скидка - сумма в валюте цены: final_price = price - discount
+DISCOUNT_DESCRIPTION = "Скидка в валюте цены, не больше цены"
+
+
 class ProductBase(BaseModel):
     text: str
     article: Optional[int] = Field(default=None, description="Автогенерация, если не указан")
     price: float
-    discount: float = 0
+    discount: float = Field(default=0, ge=0, description=DISCOUNT_DESCRIPTION)
     slug: Optional[str] = Field(default=None, description="Автогенерация, если не указан")
     subcategory_id: int
     brand_id: Optional[int] = None
@@ -449,6 +457,12 @@ class ProductBase(BaseModel):
                 raise ValueError('Артикул должен быть числом')
         return v
 
+    @model_validator(mode='after')
+    def validate_discount_not_above_price(self):
+        if self.price is not None and self.discount is not None and self.discount > self.price:
+            raise ValueError('Скидка не может быть больше цены')
+        return self
+
     @model_validator(mode='after')
     def validate_images_count(self):
 
@@ -483,6 +497,7 @@ class ProductResponse(BaseModel):
     article: int
     price: float
     discount: float = 0
+    final_price: Optional[float] = None  # Цена со скидкой
     slug: str
     in_stock: bool = True
     small_description: Optional[str] = None
@@ -503,6 +518,7 @@ class ProductShortResponse(BaseModel):
     article: Optional[int] = None
     price: float
     discount: float = 0
+    final_price: Optional[float] = None  # Цена со скидкой
     slug: str
     small_description: Optional[str] = None
     subcategory_id: int
@@ -518,7 +534,7 @@ class ProductUpdate(BaseModel):
     text: Optional[str] = None
     article: Optional[int] = None
     price: Optional[float] = None
-    discount: Optional[float] = None
+    discount: Optional[float] = Field(default=None, ge=0, description=DISCOUNT_DESCRIPTION)
     slug: Optional[str] = None
     subcategory_id: Optional[int] = None
     brand_id: Optional[int] = None
@@ -554,7 +570,7 @@ class ProductUpdate(BaseModel):
 class ProductsByTagResponse(BaseModel):
     tag: TagResponse
     products: List[ProductResponse]
-    total: int
+    total: Optional[int] = None
 
 
 class ProductDetail(BaseModel):
@@ -563,6 +579,7 @@ class ProductDetail(BaseModel):
     article: Optional[int] = None
     price: float
     discount: float = 0
+    final_price: Optional[float] = None  # Цена со скидкой
     slug: str
     in_stock: bool = True
     small_description: Optional[str] = None
@@ -585,11 +602,40 @@ class ProductDetail(BaseModel):
         from_attributes = True
 
 
+PRODUCT_LOOKUP_MAX_ITEMS = 300
+
+
+class ProductLookupRequest(BaseModel):
+    ids: Optional[List[int]] = Field(default=None, max_length=PRODUCT_LOOKUP_MAX_ITEMS)
+    slugs: Optional[List[str]] = Field(default=None, max_length=PRODUCT_LOOKUP_MAX_ITEMS)
+    articles: Optional[List[int]] = Field(default=None, max_length=PRODUCT_LOOKUP_MAX_ITEMS)
+    detail: bool = Field(default=False, description="Полная информация вместо коротких карточек")
+
+    @model_validator(mode='after')
+    def check_single_key(self):
+        if sum(values is not None for values in (self.ids, self.slugs, self.articles)) != 1:
+            raise ValueError('Нужен ровно один из списков: ids, slugs или articles')
+        return self
+
+    def key(self):
+        """Поле продукта и значения без повторов в исходном порядке"""
+        if self.ids is not None:
+            return "id", list(dict.fromkeys(self.ids))
+        if self.slugs is not None:
+            return "slug", list(dict.fromkeys(self.slugs))
+        return "article", list(dict.fromkeys(self.articles))
+
+
+class ProductLookupResponse(BaseModel):
+    items: List[Union[ProductDetail, ProductShortResponse]]
+    missing: List[Union[int, str]] = []
+
+
 class ProductBaseNoImages(BaseModel):
     text: str
     article: Optional[int] = Field(default=None, description="Автогенерация, если не указан")
     price: float
-    discount: float = 0
+    discount: float = Field(default=0, ge=0, description=DISCOUNT_DESCRIPTION)
     slug: Optional[str] = Field(default=None, description="Автогенерация, если не указан")
     subcategory_id: int
     brand_id: Optional[int] = None
@@ -619,6 +665,13 @@ class ProductBaseNoImages(BaseModel):
                 raise ValueError('Артикул должен быть числом')
         return v
 
+    @model_validator(mode='after')
+    def validate_discount_not_above_price(self):
+        if self.price is not None and self.discount is not None and self.discount > self.price:
+            raise ValueError('Скидка не может быть больше цены')
+        return self
+
+
 class ProductCreateForm(ProductBaseNoImages):
     characteristics: List[CharacteristicItemBase] = []
 
@@ -0,0 +1,194 @@
+from typing import Iterable, Iterator, List, Optional
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_core import to_json
+
+from . import models
+
+# Быстрый путь сериализации для публичных GET-эндпоинтов. Данные приходят из базы и уже
+# соответствуют схемам, поэтому строки ORM переводятся в словари напрямую, без from_orm
+# и повторной проверки по response_model. Словари повторяют поля и порядок схем из schemas.py,
+# response_model у маршрутов остается для документации OpenAPI.
+# FastJSONResponse - класс ответа приложения по умолчанию, StreamingJSONResponse - для неограниченных выгрузок.
+
+
+class FastJSONResponse(JSONResponse):
+    """Класс ответа по умолчанию: кодирование в pydantic-core, datetime, date, Enum, Decimal и UUID поддерживаются"""
+
+    def render(self, content) -> bytes:
+        return to_json(content)
+
+
+class TrustedJSONResponse(FastJSONResponse):
+    """JSON-ответ из проверенных данных: FastAPI не валидирует возвращенный Response"""
+
+
+def json_array_chunks(batches: Iterable[list]) -> Iterator[bytes]:
+    """JSON-массив по частям: одна часть на пачку элементов"""
+    yield b"["
+    first = True
+    for batch in batches:
+        if not batch:
+            continue
+        chunk = b",".join(to_json(item) for item in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
+
+class StreamingJSONResponse(StreamingResponse):
+    """JSON-массив без сборки всего ответа в памяти: пачки отправляются по мере чтения из базы"""
+
+    media_type = "application/json"
+
+    def __init__(self, batches: Iterable[list], **kwargs):
+        super().__init__(json_array_chunks(batches), **kwargs)
+
+
+def tag(tag: models.Tag) -> dict:
+    return {"name": tag.name, "value": tag.value, "id": tag.id}
+
+
+def brand(brand: models.Brand) -> dict:
+    return {"image": brand.image, "name": brand.name, "id": brand.id}
+
+
+def brand_short(brand: models.Brand) -> dict:
+    return {"id": brand.id, "name": brand.name, "image": brand.image}
+
+
+def category(category: models.Category) -> dict:
+    return {"icon": category.icon, "text": category.text, "slug": category.slug, "id": category.id}
+
+
+def category_short(category: models.Category) -> dict:
+    return {"id": category.id, "text": category.text, "slug": category.slug, "icon": category.icon}
+
+
+def subcategory(subcategory: models.Subcategory) -> dict:
+    """Схема Subcategory; категория должна быть загружена заранее"""
+    return {
+        "image": subcategory.image,
+        "text": subcategory.text,
+        "slug": subcategory.slug,
+        "id": subcategory.id,
+        "category_id": subcategory.category_id,
+        "brand_id": subcategory.brand_id,
+        "category_name": subcategory.category.text if subcategory.category else "",
+    }
+
+
+def subcategory_short(subcategory: models.Subcategory) -> dict:
+    return {
+        "id": subcategory.id,
+        "text": subcategory.text,
+        "slug": subcategory.slug,
+        "image": subcategory.image,
+        "category_id": subcategory.category_id,
+        "category": category_short(subcategory.category) if subcategory.category else None,
+    }
+
+
+def product_card(card: models.ProductCard) -> dict:
+    return {
+        "id": card.id,
+        "text": card.text,
+        "article": card.article,
+        "price": card.price,
+        "discount": card.discount,
+        "final_price": card.final_price,
+        "slug": card.slug,
+        "small_description": card.small_description,
+        "subcategory_id": card.subcategory_id,
+        "brand_id": card.brand_id,
+        "image": card.image,
+    }
+
+
+def product(product: models.Product) -> dict:
+    """Схема ProductResponse; изображения, теги и характеристики должны быть загружены заранее"""
+    return {
+        "id": product.id,
+        "text": product.text,
+        "article": product.article,
+        "price": product.price,
+        "discount": product.discount,
+        "final_price": product.final_price,
+        "slug": product.slug,
+        "in_stock": product.in_stock,
+        "small_description": product.small_description,
+        "full_description": product.full_description,
+        "subcategory_id": product.subcategory_id,
+        "brand_id": product.brand_id,
+        "images": [image.image_url for image in product.images],
+        "characteristics": [
+            {
+                "name": assoc.characteristic.name,
+                "label": assoc.characteristic.label,
+                "value": assoc.characteristic.value,
+                "order_index": 0,
+            }
+            for assoc in product.characteristics_assoc if assoc.characteristic
+        ],
+        "tags": [tag(item) for item in product.tags],
+    }
+
+
+def product_detail(product: models.Product, similar_cards: Iterable[models.ProductCard]) -> dict:
+    """Схема ProductDetail; отношения загружаются через lookups.PRODUCT_DETAIL_OPTIONS"""
+    subcategory = product.subcategory
+    return {
+        "id": product.id,
+        "text": product.text,
+        "article": product.article,
+        "price": product.price,
+        "discount": product.discount,
+        "final_price": product.final_price,
+        "slug": product.slug,
+        "in_stock": product.in_stock,
+        "small_description": product.small_description,
+        "full_description": product.full_description,
+        "short_description": None,
+        "subcategory_id": product.subcategory_id,
+        "brand_id": product.brand_id,
+        "images": [image.image_url for image in product.images],
+        "characteristics": [
+            {
+                "id": assoc.characteristic.id,
+                "name": assoc.characteristic.name,
+                "label": assoc.characteristic.label,
+                "value": assoc.characteristic.value,
+                "order_index": 0,
+            }
+            for assoc in product.characteristics_assoc if assoc.characteristic
+        ],
+        "tags": [tag(item) for item in product.tags],
+        "brand": brand_short(product.brand) if product.brand else None,
+        "subcategory": subcategory_short(subcategory) if subcategory else None,
+        "category": category_short(subcategory.category) if subcategory and subcategory.category else None,
+        "warehouses": [warehouse.address for warehouse in product.warehouses],
+        "documents": [{"name": doc.name, "file_url": doc.file_url} for doc in product.documents],
+        "additional_products": [
+            {"name": ap.name, "value": ap.value, "product_slug": ap.product_slug}
+            for ap in product.additional_products
+        ],
+        "similar_products": [product_card(card) for card in similar_cards],
+    }
+
+
+def page(items: List, size: int, total: Optional[int] = None, page: Optional[int] = None,
+         next_cursor: Optional[str] = None) -> dict:
+    """Схема PaginatedResponse"""
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "size": size,
+        "pages": (total + size - 1) // size if total is not None else None,
+        "next_cursor": next_cursor,
+    }
+
+
+def data_page(data: List, pagination: Optional[dict] = None, next_cursor: Optional[str] = None) -> dict:
+    """Схемы CategoryPaginatedResponse, SubcategoryPaginatedResponse и TagPaginatedResponse"""
+    return {"data": data, "pagination": pagination, "next_cursor": next_cursor}
@@ -0,0 +1,76 @@
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy import bindparam, column, select, table, update
+
+# Разбор значений характеристик в число и единицу измерения для диапазонных фильтров.
+# Число хранится в базовой единице своей величины (длина в мм, масса в кг, объем в л),
+# поэтому "0,5 мм" и "0.05 см" одинаково попадают в фильтр thickness=0.4-0.7.
+# Значения без единого числа ("1200x600", "RAL 3005") остаются только строками.
+
+# Единица в значении -> (базовая единица, множитель)
+UNITS = {
+    "мм": ("мм", 1), "mm": ("мм", 1),
+    "см": ("мм", 10), "cm": ("мм", 10),
+    "м": ("мм", 1000), "m": ("мм", 1000),
+    "мкм": ("мм", 0.001), "мк": ("мм", 0.001),
+    "г": ("кг", 0.001), "g": ("кг", 0.001),
+    "кг": ("кг", 1), "kg": ("кг", 1),
+    "т": ("кг", 1000), "t": ("кг", 1000),
+    "мл": ("л", 0.001), "ml": ("л", 0.001),
+    "л": ("л", 1), "l": ("л", 1),
+    "м2": ("м²", 1), "м²": ("м²", 1), "кв.м": ("м²", 1), "m2": ("м²", 1),
+    "м3": ("м³", 1), "м³": ("м³", 1), "куб.м": ("м³", 1), "m3": ("м³", 1),
+    "кг/м2": ("кг/м²", 1), "кг/м²": ("кг/м²", 1),
+    "%": ("%", 1),
+}
+
+# Легкое описание таблицы: backfill вызывается и из миграции, где модели могут быть новее схемы
+_items = table("characteristic_items", column("id"), column("value"), column("numeric_value"), column("unit"))
+
+_VALUE = re.compile(r"^([-+]?\d+(?:[.,]\d+)?)\s*([^\d\s].*)?$")
+_THOUSANDS = re.compile(r"(?<=\d)[\s ](?=\d{3}(?!\d))")
+
+
+def parse(value: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+    """Число в базовой единице и сама единица; (None, None), если значение не число"""
+    if not value:
+        return None, None
+    text = _THOUSANDS.sub("", value.strip())
+    match = _VALUE.match(text)
+    if match is None:
+        return None, None
+
+    number = float(match.group(1).replace(",", "."))
+    unit = (match.group(2) or "").strip().lower().rstrip(".")
+    if not unit:
+        return number, None
+    if unit in UNITS:
+        base, factor = UNITS[unit]
+        return round(number * factor, 9), base
+    # Незнакомая единица или текст после числа: число без пересчета, если единица - одно слово
+    if re.fullmatch(r"[^\d\s]+", unit):
+        return number, unit
+    return None, None
+
+
+def backfill(db, batch_size: int = 1000) -> int:
+    """Заполнить numeric_value и unit у всех характеристик; db - сессия или соединение"""
+    item = _items
+    statement = update(item).where(item.c.id == bindparam("item_id")).values(
+        numeric_value=bindparam("numeric_value"), unit=bindparam("unit")
+    )
+    updated, last_id = 0, 0
+    while True:
+        rows = db.execute(
+            select(item.c.id, item.c.value).where(item.c.id > last_id).order_by(item.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        params = []
+        for row in rows:
+            numeric_value, unit = parse(row.value)
+            params.append({"item_id": row.id, "numeric_value": numeric_value, "unit": unit})
+        db.execute(statement, params)
+        updated += len(rows)
+        last_id = rows[-1].id
@@ -0,0 +1,103 @@
+"""
+Нагрузочные замеры каталога.
+
+    python -m benchmarks generate --products 100000
+    python -m benchmarks run --requests 500 --concurrency 16 [--scenario product_detail] [--json out.json]
+
+Сценарии с max_queries проверяют число SQL-запросов на HTTP-запрос: при превышении
+run завершается с кодом 1, поэтому его можно запускать в CI как проверку от N+1.
+
+База берется из --database-url, иначе из BENCHMARK_DATABASE_URL, иначе локальный SQLite-файл.
+generate пересоздает все таблицы в этой базе, поэтому рабочую DATABASE_URL сюда передавать нельзя.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark_catalog.db"
+
+
+def _configure(database_url):
+    # Настройки должны попасть в окружение до первого импорта app.database
+    os.environ["DATABASE_URL"] = database_url or os.getenv("BENCHMARK_DATABASE_URL") or DEFAULT_DATABASE_URL
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["DATABASE_REPLICA_URLS"] = ""
+    os.environ["SQL_ECHO"] = "false"
+    # Кэш ответов подменил бы замер запросов к базе повторными попаданиями
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("FAST_START", "true")
+
+
+def cmd_generate(args):
+    from .generator import CatalogSize, generate
+
+    generate(CatalogSize(
+        categories=args.categories,
+        subcategories=args.subcategories,
+        brands=args.brands,
+        tags=args.tags,
+        products=args.products,
+        images=args.images,
+        characteristics=args.characteristics,
+        similar=args.similar,
+        seed=args.seed,
+    ))
+
+
+def cmd_run(args):
+    from . import runner, scenarios
+
+    sample = scenarios.Sample.load(args.page_size)
+    results = asyncio.run(runner.run(
+        scenarios.by_name(args.scenario),
+        sample,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        page_size=args.page_size,
+        seed=args.seed,
+    ))
+    runner.print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({result.name: result.as_dict() for result in results}, f, ensure_ascii=False, indent=2)
+    if any(result.over_query_budget for result in results):
+        raise SystemExit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Пересоздать схему и сгенерировать каталог")
+    generate.add_argument("--categories", type=int, default=10)
+    generate.add_argument("--subcategories", type=int, default=8, help="Подкатегорий на категорию")
+    generate.add_argument("--brands", type=int, default=14)
+    generate.add_argument("--tags", type=int, default=8)
+    generate.add_argument("--products", type=int, default=10000)
+    generate.add_argument("--images", type=int, default=3, help="Изображений на товар")
+    generate.add_argument("--characteristics", type=int, default=6, help="Характеристик на товар")
+    generate.add_argument("--similar", type=int, default=4, help="Похожих товаров на товар")
+    generate.add_argument("--seed", type=int, default=42)
+    generate.set_defaults(handler=cmd_generate)
+
+    run = subparsers.add_parser("run", help="Прогнать сценарии витрины и вывести задержки")
+    run.add_argument("--scenario", action="append", help="Имя сценария, можно несколько; по умолчанию все")
+    run.add_argument("--requests", type=int, default=200, help="Запросов на сценарий")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--warmup", type=int, default=20, help="Прогревочных запросов на сценарий")
+    run.add_argument("--page-size", type=int, default=20)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--json", help="Сохранить результаты в JSON для сравнения прогонов")
+    run.set_defaults(handler=cmd_run)
+
+    args = parser.parse_args(argv)
+    _configure(args.database_url)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Загрузка страницы товара: прежний запрос с девятью joinedload против PRODUCT_BY_SLUG
+(to-one через JOIN, коллекции отдельными SELECT ... IN) и похожих товаров из карточек.
+Для каждого варианта считаются SQL-запросы, строки, которые вернула база, и время загрузки.
+Запуск: python -m benchmarks.bench_detail [--images 15] [--characteristics 30] [--similar 10] [--iterations N]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mktemp(suffix='.db')}"
+
+from sqlalchemy import bindparam, event, select  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+from app import crud, database, lookups, models, product_cards  # noqa: E402
+
+# Прежний запрос страницы товара: все коллекции одним JOIN
+LEGACY = select(models.Product).options(
+    joinedload(models.Product.images),
+    joinedload(models.Product.tags),
+    joinedload(models.Product.brand),
+    joinedload(models.Product.subcategory).joinedload(models.Subcategory.category),
+    joinedload(models.Product.warehouses),
+    joinedload(models.Product.documents),
+    joinedload(models.Product.additional_products),
+    joinedload(models.Product.characteristics_assoc).joinedload(models.ProductCharacteristic.characteristic),
+    joinedload(models.Product.similar_products).options(
+        joinedload(models.Product.images)
+    )
+).where(models.Product.slug == bindparam("slug"))
+
+
+def load_legacy(db, slug):
+    product = db.execute(LEGACY, {"slug": slug}).unique().scalars().first()
+    return product, product.similar_products
+
+
+def load_current(db, slug):
+    product = db.execute(lookups.PRODUCT_BY_SLUG, {"slug": slug}).scalars().first()
+    similar = db.execute(lookups.SIMILAR_CARDS_BY_PRODUCT_ID, {"product_id": product.id}).scalars().all()
+    return product, similar
+
+
+LOADERS = {"joinedload x9": load_legacy, "detail loader": load_current}
+
+
+def seed(db, args):
+    rng = random.Random(args.seed)
+    category = models.Category(text="Кровля", slug="krovlya")
+    brand = models.Brand(name="Grand Line", image="brand.png")
+    tags = [models.Tag(name=f"Тег {i}", value=f"tag-{i}") for i in range(max(args.tags, 1) * 2)]
+    db.add_all([category, brand, *tags])
+    db.flush()
+    subcategory = models.Subcategory(text="Профнастил", slug="profnastil", category_id=category.id,
+                                     brand_id=brand.id, image="sub.png")
+    db.add(subcategory)
+    db.flush()
+
+    products = [
+        models.Product(text=f"Профнастил С{i}", article=100000 + i, price=rng.uniform(150, 25000),
+                       slug=f"product-{i}", subcategory_id=subcategory.id, brand_id=brand.id)
+        for i in range(args.products)
+    ]
+    db.add_all(products)
+    db.flush()
+
+    for product in products:
+        db.add_all(models.ProductImage(product_id=product.id, image_url=f"images/{product.id}_{i}.jpg")
+                   for i in range(args.images))
+        characteristic_ids = crud.intern_characteristics(db, [
+            {"name": f"char_{i}", "label": f"Характеристика {i}", "value": str(rng.randint(1, 99))}
+            for i in range(args.characteristics)
+        ])
+        db.add_all(models.ProductCharacteristic(product_id=product.id, characteristic_id=characteristic_id)
+                   for characteristic_id in characteristic_ids)
+        db.add_all(models.ProductTag(product_id=product.id, tag_id=tag.id) for tag in rng.sample(tags, args.tags))
+        db.add_all(models.ProductWarehouse(product_id=product.id, address=f"Склад {i}") for i in range(args.warehouses))
+        db.add_all(models.Document(product_id=product.id, name=f"Сертификат {i}", file_url=f"docs/{i}.pdf")
+                   for i in range(args.documents))
+        product.similar_products = rng.sample([p for p in products if p is not product], args.similar)
+    db.commit()
+    product_cards.rebuild(db)
+    return [product.slug for product in products]
+
+
+class StatementLog:
+    """Запоминает выполненные запросы, чтобы потом пересчитать, сколько строк вернула база"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def close(self):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def rows(self) -> int:
+        with self.engine.connect() as conn:
+            return sum(len(conn.exec_driver_sql(statement, parameters).fetchall())
+                       for statement, parameters in self.statements)
+
+
+def measure(loader, db, slugs, iterations):
+    log = StatementLog(database.engine)
+    try:
+        loader(db, slugs[0])
+    finally:
+        log.close()
+    db.expunge_all()
+    queries, rows = len(log.statements), log.rows()
+
+    samples = []
+    for slug in random.Random(1).choices(slugs, k=iterations):
+        started = time.perf_counter()
+        loader(db, slug)
+        samples.append((time.perf_counter() - started) * 1000)
+        db.expunge_all()
+    return queries, rows, statistics.median(samples), statistics.fmean(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--images", type=int, default=15)
+    parser.add_argument("--characteristics", type=int, default=30)
+    parser.add_argument("--similar", type=int, default=10)
+    parser.add_argument("--tags", type=int, default=2)
+    parser.add_argument("--warehouses", type=int, default=1)
+    parser.add_argument("--documents", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        slugs = seed(db, args)
+        print(f"товар: {args.images} изображений, {args.characteristics} характеристик, {args.tags} тегов, "
+              f"{args.similar} похожих; {args.products} товаров в базе")
+        print(f"{'loader':<16}{'queries':>9}{'rows':>10}{'p50, ms':>10}{'mean, ms':>10}")
+        for name, loader in LOADERS.items():
+            queries, rows, p50, mean = measure(loader, db, slugs, args.iterations)
+            print(f"{name:<16}{queries:>9}{rows:>10}{p50:>10.2f}{mean:>10.2f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
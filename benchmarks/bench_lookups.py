@@ -0,0 +1,89 @@
+"""
+Микробенчмарк точечных выборок: построение ORM-запроса на каждый вызов против готовых
+выражений из app.lookups. Запуск: python -m benchmarks.bench_lookups [--iterations N]
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mktemp(suffix='.db')}"
+
+from sqlalchemy.orm import joinedload  # noqa: E402
+from app import crud, database, models  # noqa: E402
+
+
+def seed(db):
+    category = models.Category(text="Кровля", slug="krovlya")
+    brand = models.Brand(name="Grand Line", image="brand.png")
+    db.add_all([category, brand])
+    db.flush()
+    subcategory = models.Subcategory(text="Профнастил", slug="profnastil", category_id=category.id,
+                                     brand_id=brand.id, image="sub.png")
+    tag = models.Tag(name="Хит", value="hit")
+    db.add_all([subcategory, tag])
+    db.flush()
+    product = models.Product(text="Профнастил С8", article=100001, price=500, slug="profnastil-s8",
+                             subcategory_id=subcategory.id, brand_id=brand.id)
+    db.add(product)
+    db.flush()
+    db.add(models.ProductImage(product_id=product.id, image_url="p.png"))
+    db.commit()
+    return brand.id
+
+
+# Прежние реализации: запрос собирается заново на каждый вызов
+LEGACY = {
+    "get_product_by_slug": lambda db, _: db.query(models.Product).options(
+        joinedload(models.Product.images),
+        joinedload(models.Product.tags),
+        joinedload(models.Product.brand),
+        joinedload(models.Product.subcategory),
+        joinedload(models.Product.warehouses),
+        joinedload(models.Product.documents),
+        joinedload(models.Product.additional_products),
+        joinedload(models.Product.characteristics_assoc).joinedload(models.ProductCharacteristic.characteristic)
+    ).filter(models.Product.slug == "profnastil-s8").first(),
+    "get_category_by_slug": lambda db, _: db.query(models.Category).filter(models.Category.slug == "krovlya").first(),
+    "get_subcategory_by_slug": lambda db, _: db.query(models.Subcategory).filter(
+        models.Subcategory.slug == "profnastil").first(),
+    "get_tag_by_value": lambda db, _: db.query(models.Tag).filter(models.Tag.value == "hit").first(),
+    "get_brand_by_id": lambda db, brand_id: db.query(models.Brand).filter(models.Brand.id == brand_id).first(),
+}
+
+CURRENT = {
+    "get_product_by_slug": lambda db, _: crud.get_product_by_slug(db, "profnastil-s8"),
+    "get_category_by_slug": lambda db, _: crud.get_category_by_slug(db, "krovlya"),
+    "get_subcategory_by_slug": lambda db, _: crud.get_subcategory_by_slug(db, "profnastil"),
+    "get_tag_by_value": lambda db, _: crud.get_tag_by_value(db, "hit"),
+    "get_brand_by_id": lambda db, brand_id: crud.get_brand_by_id(db, brand_id),
+}
+
+
+def measure(fn, db, arg, iterations):
+    fn(db, arg)
+    best = min(timeit.repeat(lambda: (fn(db, arg), db.expunge_all()), number=iterations, repeat=3))
+    return best / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        brand_id = seed(db)
+        print(f"{'lookup':<26}{'legacy, us':>12}{'cached, us':>12}{'saved, us':>12}")
+        for name in LEGACY:
+            legacy = measure(LEGACY[name], db, brand_id, args.iterations)
+            current = measure(CURRENT[name], db, brand_id, args.iterations)
+            print(f"{name:<26}{legacy:>12.1f}{current:>12.1f}{legacy - current:>12.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
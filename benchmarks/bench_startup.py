@@ -0,0 +1,74 @@
+"""
+Время холодного старта воркера: импорт app.main и startup_event в обычном режиме
+и с FAST_START=true. Каждый замер идет в отдельном процессе, чтобы не мешал кеш импортов.
+Запуск: python -m benchmarks.bench_startup [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Код, который выполняется в дочернем процессе: импорт приложения и прогон startup-обработчиков
+PROBE = """
+import json, time
+started = time.perf_counter()
+from app import main
+imported = time.perf_counter()
+for handler in main.app.router.on_startup:
+    handler()
+finished = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": (finished - imported) * 1000}))
+"""
+
+
+def prepare_database(env):
+    """Схема, актуальная ревизия alembic и суперпользователь, как после первого деплоя"""
+    subprocess.run(
+        [sys.executable, "-c", "from app import main; [h() for h in main.app.router.on_startup]"],
+        env={**env, "FAST_START": "false"}, check=True, capture_output=True
+    )
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "stamp", "head"],
+        env=env, check=True, capture_output=True
+    )
+
+
+def measure(env, runs):
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", PROBE], env=env, check=True, capture_output=True, text=True)
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return (
+        statistics.median(sample["import_ms"] for sample in samples),
+        statistics.median(sample["startup_ms"] for sample in samples),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "SQL_ECHO": "false",
+        "superuser_email": os.getenv("superuser_email", "admin@example.com"),
+        "superuser_username": os.getenv("superuser_username", "admin"),
+        "superuser_password": os.getenv("superuser_password", "admin-password"),
+    }
+    if not os.getenv("DATABASE_URL"):
+        env["DATABASE_URL"] = f"sqlite:///{tempfile.mktemp(suffix='.db')}"
+
+    prepare_database(env)
+
+    print(f"{'mode':<12}{'import, ms':>12}{'startup, ms':>13}{'total, ms':>12}")
+    for mode, fast_start in (("legacy", "false"), ("fast", "true")):
+        import_ms, startup_ms = measure({**env, "FAST_START": fast_start, "BOOTSTRAP_SUPERUSER": "false"}, args.runs)
+        print(f"{mode:<12}{import_ms:>12.1f}{startup_ms:>13.1f}{import_ms + startup_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Генератор синтетического каталога для нагрузочных замеров: пакетные Core-вставки с явными id"""
+import random
+import time
+
+from sqlalchemy import text
+
+from app import database, models, product_cards, units
+
+BATCH_SIZE = 5000
+
+CATEGORY_NAMES = [
+    "Кровля", "Фасад", "Водосточные системы", "Забор", "Утеплитель", "Мансардные окна",
+    "Гидроизоляция", "Комплектующие", "Инструмент", "Сайдинг", "Террасная доска", "Крепеж",
+]
+SUBCATEGORY_NAMES = [
+    "Профнастил", "Металлочерепица", "Мягкая кровля", "Фальцевая кровля", "Доборные элементы",
+    "Снегозадержатели", "Водостоки", "Софиты", "Планки", "Мембраны", "Саморезы", "Герметики",
+]
+BRAND_NAMES = [
+    "Grand Line", "Металл Профиль", "ТехноНИКОЛЬ", "Docke", "Ruukki", "Döcke", "Fineber",
+    "Велюкс", "Роквул", "Кнауф", "Aquasystem", "Stynergy", "Блок-Хаус", "Технониколь Шинглас",
+]
+TAG_NAMES = [
+    ("Хит продаж", "hit"), ("Новинка", "new"), ("Акция", "sale"), ("Рекомендуем", "recommended"),
+    ("Под заказ", "preorder"), ("Эконом", "economy"), ("Премиум", "premium"), ("Скидка", "discount"),
+]
+
+# name, label, генератор значения — в том виде, в каком значения заводят в админке
+CHARACTERISTICS = [
+    ("color", "Цвет", lambda rng: f"RAL {rng.choice([3005, 3009, 5005, 6005, 7004, 7024, 8017, 9003])}"),
+    ("thickness", "Толщина", lambda rng: f"0,{rng.choice([35, 4, 45, 5, 55, 7])} мм"),
+    ("width", "Ширина", lambda rng: f"{rng.choice([1150, 1180, 1190, 1250])} мм"),
+    ("coating", "Покрытие", lambda rng: rng.choice(["Полиэстер", "Пурал", "Printech", "Цинк", "VikingMP"])),
+    ("warranty", "Гарантия", lambda rng: f"{rng.choice([5, 10, 15, 20, 30])} лет"),
+    ("weight", "Вес", lambda rng: f"{rng.uniform(2.5, 9.5):.1f} кг/м²"),
+    ("country", "Страна", lambda rng: rng.choice(["Россия", "Финляндия", "Германия", "Беларусь"])),
+    ("height", "Высота профиля", lambda rng: f"{rng.choice([8, 10, 20, 21, 35, 44])} мм"),
+]
+
+LOREM = (
+    "Кровельный материал из оцинкованной стали с полимерным покрытием. Подходит для жилых и "
+    "хозяйственных построек, устойчив к коррозии и ультрафиолету. "
+)
+
+
+class CatalogSize:
+    def __init__(self, categories=10, subcategories=8, brands=14, tags=8, products=10000,
+                 images=3, characteristics=6, similar=4, seed=42):
+        self.categories = categories
+        self.subcategories = subcategories
+        self.brands = brands
+        self.tags = tags
+        self.products = products
+        self.images = images
+        self.characteristics = min(characteristics, len(CHARACTERISTICS))
+        self.similar = similar
+        self.seed = seed
+
+
+def _name(names, index):
+    base = names[index % len(names)]
+    return base if index < len(names) else f"{base} {index // len(names) + 1}"
+
+
+def _insert(conn, table, rows):
+    if rows:
+        conn.execute(table.insert(), rows)
+
+
+def _reset_sequences(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    for table in models.Base.metadata.sorted_tables:
+        if "id" in table.c:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 1)) FROM {table.name}"
+            ))
+
+
+def generate(size: CatalogSize, echo=print):
+    """Пересоздать схему и заполнить каталог; все таблицы текущей базы удаляются"""
+    rng = random.Random(size.seed)
+    started = time.perf_counter()
+
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+
+    with database.engine.begin() as conn:
+        _insert(conn, models.Category.__table__, [
+            {"id": i + 1, "text": _name(CATEGORY_NAMES, i), "slug": f"category-{i + 1}", "icon": f"icons/{i + 1}.svg"}
+            for i in range(size.categories)
+        ])
+        _insert(conn, models.Brand.__table__, [
+            {"id": i + 1, "name": _name(BRAND_NAMES, i), "image": f"brands/{i + 1}.png"}
+            for i in range(size.brands)
+        ])
+        _insert(conn, models.Tag.__table__, [
+            {"id": i + 1, "name": _name([n for n, _ in TAG_NAMES], i), "value": _name([v for _, v in TAG_NAMES], i).replace(" ", "-")}
+            for i in range(size.tags)
+        ])
+
+        subcategories = []
+        for category_id in range(1, size.categories + 1):
+            for j in range(size.subcategories):
+                subcategory_id = len(subcategories) + 1
+                subcategories.append({
+                    "id": subcategory_id,
+                    "text": _name(SUBCATEGORY_NAMES, j),
+                    "slug": f"subcategory-{subcategory_id}",
+                    "image": f"images/{subcategory_id}.png",
+                    "category_id": category_id,
+                    "brand_id": rng.randint(1, size.brands) if size.brands else None,
+                })
+        _insert(conn, models.Subcategory.__table__, subcategories)
+    echo(f"справочники: {size.categories} категорий, {len(subcategories)} подкатегорий, "
+         f"{size.brands} брендов, {size.tags} тегов")
+
+    products_by_subcategory = {row["id"]: [] for row in subcategories}
+    image_id = link_id = product_tag_id = 0
+    # Словарь характеристик, как в crud.intern_characteristics: одна запись на пару (name, value)
+    item_ids = {}
+
+    for batch_start in range(0, size.products, BATCH_SIZE):
+        products, images, items, links, product_tags, similar = [], [], [], [], [], []
+
+        for product_id in range(batch_start + 1, min(batch_start + BATCH_SIZE, size.products) + 1):
+            subcategory = subcategories[rng.randrange(len(subcategories))]
+            siblings = products_by_subcategory[subcategory["id"]]
+            brand_id = subcategory["brand_id"] if rng.random() < 0.7 else rng.randint(1, size.brands)
+
+            price = round(rng.uniform(150, 25000), 2)
+            # Скидка - сумма: 5-20% от цены у каждого второго товара
+            discount = round(price * rng.choice([0, 0, 0, 0, 5, 10, 15, 20]) / 100, 2)
+            products.append({
+                "id": product_id,
+                "text": f"{subcategory['text']} {rng.choice(['С8', 'С20', 'НС35', 'Монтеррей', 'Кредо', 'Классик'])} #{product_id}",
+                "article": 100000 + product_id,
+                "price": price,
+                "discount": discount,
+                "final_price": models.final_price(price, discount),
+                "slug": f"product-{product_id}",
+                "image": None,
+                "in_stock": rng.random() < 0.85,
+                "small_description": LOREM[:120],
+                "full_description": LOREM * rng.randint(2, 6),
+                "subcategory_id": subcategory["id"],
+                "brand_id": brand_id,
+            })
+
+            for _ in range(size.images):
+                image_id += 1
+                images.append({"id": image_id, "product_id": product_id,
+                               "image_url": f"https://s3.twcstorage.ru/catalog/products/{product_id}_{image_id}.jpg"})
+
+            for name, label, make_value in rng.sample(CHARACTERISTICS, size.characteristics):
+                link_id += 1
+                value = make_value(rng)
+                item_id = item_ids.get((name, value))
+                if item_id is None:
+                    item_id = item_ids[(name, value)] = len(item_ids) + 1
+                    numeric_value, unit = units.parse(value)
+                    items.append({"id": item_id, "name": name, "label": label, "value": value,
+                                  "numeric_value": numeric_value, "unit": unit, "template_id": None})
+                links.append({"id": link_id, "product_id": product_id, "characteristic_id": item_id})
+
+            if size.tags:
+                for tag_id in rng.sample(range(1, size.tags + 1), k=min(size.tags, rng.choice([0, 0, 1, 1, 2]))):
+                    product_tag_id += 1
+                    product_tags.append({"id": product_tag_id, "product_id": product_id, "tag_id": tag_id})
+
+            for similar_id in rng.sample(siblings, k=min(len(siblings), size.similar)):
+                similar.append({"product_id": product_id, "similar_product_id": similar_id})
+            siblings.append(product_id)
+
+        with database.engine.begin() as conn:
+            _insert(conn, models.Product.__table__, products)
+            _insert(conn, models.ProductImage.__table__, images)
+            _insert(conn, models.CharacteristicItem.__table__, items)
+            _insert(conn, models.ProductCharacteristic.__table__, links)
+            _insert(conn, models.ProductTag.__table__, product_tags)
+            _insert(conn, models.product_similar, similar)
+        echo(f"товары: {products[-1]['id']}/{size.products}")
+
+    with database.engine.begin() as conn:
+        _reset_sequences(conn)
+
+    with database.SessionLocal() as db:
+        product_cards.rebuild(db)
+    echo("карточки товаров собраны")
+
+    echo(f"готово за {time.perf_counter() - started:.1f} с")
@@ -0,0 +1,106 @@
+"""Прогон сценариев против приложения в том же процессе через httpx.ASGITransport"""
+import asyncio
+import logging
+import random
+import statistics
+import time
+
+import httpx
+
+from app import database, query_stats
+from app.main import app
+
+# main.py включает DEBUG для всего процесса; в замерах это логирование стоит дороже самих запросов.
+# Предупреждения N+1 тоже глушатся: число запросов и так есть в отчете
+logging.getLogger().setLevel(logging.WARNING)
+logging.getLogger(query_stats.__name__).setLevel(logging.ERROR)
+
+
+class ScenarioResult:
+    def __init__(self, name, max_queries=None):
+        self.name = name
+        self.max_queries = max_queries
+        self.latencies = []
+        self.queries = []
+        self.errors = {}
+        self.elapsed = 0.0
+
+    def record(self, latency, status_code, queries):
+        self.latencies.append(latency)
+        if queries is not None:
+            self.queries.append(queries)
+        if status_code >= 400:
+            self.errors[status_code] = self.errors.get(status_code, 0) + 1
+
+    def percentile(self, q):
+        if len(self.latencies) < 2:
+            return self.latencies[0] * 1000 if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[q - 1] * 1000
+
+    @property
+    def over_query_budget(self) -> bool:
+        return self.max_queries is not None and any(queries > self.max_queries for queries in self.queries)
+
+    def as_dict(self):
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "rps": round(len(self.latencies) / self.elapsed, 1) if self.elapsed else 0.0,
+            "avg_queries": round(statistics.fmean(self.queries), 2) if self.queries else None,
+            "max_queries": max(self.queries) if self.queries else None,
+            "query_budget": self.max_queries,
+        }
+
+
+async def _run_scenario(client, scenario, sample, requests, concurrency, page_size, seed):
+    rng = random.Random(seed)
+    urls = [scenario.url(sample, rng, page_size) for _ in range(requests)]
+    result = ScenarioResult(scenario.name, scenario.max_queries)
+    position = iter(range(len(urls)))
+
+    async def worker():
+        for index in position:
+            started = time.perf_counter()
+            response = await client.get(urls[index])
+            latency = time.perf_counter() - started
+            queries = response.headers.get(query_stats.QUERY_COUNT_HEADER)
+            result.record(latency, response.status_code, int(queries) if queries is not None else None)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def run(scenarios, sample, requests=200, concurrency=8, warmup=20, page_size=20, seed=42):
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            results = []
+            for scenario in scenarios:
+                if warmup:
+                    await _run_scenario(client, scenario, sample, warmup, concurrency, page_size, seed + 1)
+                results.append(await _run_scenario(client, scenario, sample, requests, concurrency, page_size, seed))
+            return results
+    finally:
+        # Соединения aiosqlite держат потоки, без dispose процесс не завершится
+        await database.async_engine.dispose()
+
+
+def print_report(results):
+    print(f"{'scenario':<20}{'reqs':>7}{'err':>6}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}"
+          f"{'rps':>9}{'q/req':>8}{'q max':>7}")
+    for result in results:
+        row = result.as_dict()
+        errors = sum(row["errors"].values())
+        avg_queries = "-" if row["avg_queries"] is None else f"{row['avg_queries']:.1f}"
+        max_queries = "-" if row["max_queries"] is None else str(row["max_queries"])
+        print(f"{result.name:<20}{row['requests']:>7}{errors:>6}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{row['rps']:>9.1f}{avg_queries:>8}{max_queries:>7}")
+        if row["errors"]:
+            print(f"{'':<20}статусы ошибок: {row['errors']}")
+        if result.over_query_budget:
+            print(f"{'':<20}превышен лимит запросов: {row['max_queries']} > {result.max_queries}")
@@ -0,0 +1,102 @@
+"""Сценарии витрины: какие URL дергает фронтенд и с какими параметрами"""
+import random
+from urllib.parse import urlencode
+
+from sqlalchemy import select, func
+
+from app import database, models, pagination
+
+SAMPLE_SIZE = 1000
+
+
+class Sample:
+    """Случайные slug'и и значения из сгенерированного каталога, по которым строятся URL"""
+
+    def __init__(self, product_slugs, category_slugs, tag_values, characteristics, product_pages, total_products):
+        self.product_slugs = product_slugs
+        self.category_slugs = category_slugs
+        self.tag_values = tag_values
+        self.characteristics = characteristics
+        self.product_pages = product_pages
+        self.total_products = total_products
+
+    @classmethod
+    def load(cls, page_size):
+        with database.SessionLocal() as db:
+            product_slugs = db.scalars(
+                select(models.Product.slug).order_by(func.random()).limit(SAMPLE_SIZE)
+            ).all()
+            category_slugs = db.scalars(select(models.Category.slug)).all()
+            tag_values = db.scalars(select(models.Tag.value)).all()
+            characteristics = db.execute(
+                select(models.CharacteristicItem.name, models.CharacteristicItem.value).distinct().limit(SAMPLE_SIZE)
+            ).all()
+            total = db.scalar(select(func.count(models.Product.id)))
+        if not product_slugs:
+            raise SystemExit("Каталог пуст: сначала выполните python -m benchmarks generate")
+        return cls(product_slugs, category_slugs, tag_values, characteristics,
+                   max(1, min(50, total // page_size)), total)
+
+
+class Scenario:
+    def __init__(self, name, build_url, max_queries=None):
+        self.name = name
+        self.build_url = build_url
+        # Верхняя граница SQL-запросов на один HTTP-запрос; превышение валит прогон
+        self.max_queries = max_queries
+
+    def url(self, sample: Sample, rng: random.Random, page_size: int) -> str:
+        return self.build_url(sample, rng, page_size)
+
+
+def _filtered_listing(sample, rng, page_size):
+    name, value = rng.choice(sample.characteristics)
+    return "/products/filter/?" + urlencode({name: value, "page": 1, "page_size": page_size})
+
+
+def _range_listing(sample, rng, page_size):
+    low = rng.choice([0.35, 0.4, 0.45])
+    return "/products/filter/?" + urlencode({"thickness__min": low, "thickness__max": low + 0.15,
+                                             "page": 1, "page_size": page_size})
+
+
+def _deep_position(sample, rng, page_size):
+    # Последние 10% каталога: здесь OFFSET дороже всего
+    return rng.randint(int(sample.total_products * 0.9), max(int(sample.total_products * 0.9), sample.total_products - page_size))
+
+
+def _deep_page(sample, rng, page_size):
+    return f"/products/?page={_deep_position(sample, rng, page_size) // page_size + 1}&size={page_size}"
+
+
+def _deep_cursor(sample, rng, page_size):
+    # Генератор выдает id подряд, поэтому курсор по id равен позиции в каталоге
+    cursor = pagination.encode_cursor(pagination.PRODUCT_SORTS["id"], {"id": _deep_position(sample, rng, page_size)})
+    return f"/products/?cursor={cursor}&size={page_size}"
+
+
+SCENARIOS = [
+    Scenario("products_list", lambda s, rng, size: f"/products/?page={rng.randint(1, s.product_pages)}&size={size}",
+             max_queries=5),
+    Scenario("product_detail", lambda s, rng, size: f"/products/{rng.choice(s.product_slugs)}"),
+    Scenario("category_listing",
+             lambda s, rng, size: f"/products/category/{rng.choice(s.category_slugs)}?page=1&size={size}"),
+    Scenario("tag_page", lambda s, rng, size: f"/tags/{rng.choice(s.tag_values)}/products?limit={min(size, 50)}"),
+    Scenario("sorted_category_listing",
+             lambda s, rng, size: f"/products/category/{rng.choice(s.category_slugs)}?page=1&size={size}"
+                                  f"&sort={rng.choice(['price', '-price', 'discount', 'newest'])}"),
+    Scenario("filtered_listing", _filtered_listing),
+    Scenario("range_listing", _range_listing),
+    Scenario("products_deep_page", _deep_page),
+    Scenario("products_deep_cursor", _deep_cursor),
+]
+
+
+def by_name(names):
+    if not names:
+        return SCENARIOS
+    known = {scenario.name: scenario for scenario in SCENARIOS}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise SystemExit(f"Неизвестные сценарии: {', '.join(unknown)}. Доступны: {', '.join(known)}")
+    return [known[name] for name in names]
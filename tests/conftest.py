@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+import pytest
+
+# Настройки читаются при импорте app.database, поэтому окружение задается до импорта приложения:
+# временная SQLite-база на сессию тестов, без реплик, S3 не трогается (клиент создается лениво)
+_db_dir = tempfile.mkdtemp(prefix="goodhouse-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["SQL_ECHO"] = "false"
+os.environ["AUTH_SECRET_KEY"] = "test-auth-secret"
+os.environ["REFRESH_SECRET_KEY"] = "test-refresh-secret"
+
+from fastapi.testclient import TestClient
+
+from app import auth, crud, database, facets, models, product_cards, query_stats, response_cache
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    """Пустая схема и сброшенные кэши процесса на каждый тест"""
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    response_cache.cache.clear()
+    facets.cache = facets.FacetCache()
+    query_stats.registry.reset()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    """Анонимный клиент витрины: его GET-запросы идут через кэш ответов"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin():
+    token = auth.create_access_token({"sub": "1", "role": "superuser"})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+@pytest.fixture
+def catalog(db):
+    """Категория с одной подкатегорией, брендом, тегом и n товарами; возвращает функцию наполнения"""
+    def seed(n=12):
+        category = models.Category(text="Кровля", slug="roof")
+        brand = models.Brand(name="Brand", image="brand.png")
+        tag = models.Tag(name="Хит", value="hit")
+        db.add_all([category, brand, tag])
+        db.flush()
+        subcategory = models.Subcategory(text="Профнастил", slug="prof", category_id=category.id,
+                                         brand_id=brand.id, image="prof.png")
+        db.add(subcategory)
+        db.flush()
+        for i in range(n):
+            product = models.Product(text=f"Товар {i}", article=1000 + i, price=100 + i * 10, discount=i % 5,
+                                     slug=f"product-{i}", subcategory_id=subcategory.id, brand_id=brand.id)
+            db.add(product)
+            db.flush()
+            characteristics = [
+                {"name": "color", "label": "Цвет", "value": f"RAL 300{i % 3}"},
+                {"name": "thickness", "label": "Толщина", "value": f"0,{4 + i % 3} мм"},
+            ]
+            for characteristic_id in crud.intern_characteristics(db, characteristics):
+                db.add(models.ProductCharacteristic(product_id=product.id, characteristic_id=characteristic_id))
+            if i % 2 == 0:
+                db.add(models.ProductTag(product_id=product.id, tag_id=tag.id))
+        product_cards.refresh(db, list(range(1, n + 1)))
+        db.commit()
+        return {"category": category.id, "subcategory": subcategory.id, "brand": brand.id, "tag": tag.id}
+    return seed
@@ -0,0 +1,166 @@
+import json
+import random
+
+import pytest
+
+from app import bitmap_index, crud, models, schemas
+
+
+@pytest.fixture
+def index(monkeypatch, db):
+    """Включенный индекс фильтров; фоновая сверка не запускается, тесты зовут sync сами"""
+    monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_ENABLED", True)
+    monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_SYNC_SECONDS", float("inf"))
+    monkeypatch.setattr(bitmap_index, "index", bitmap_index.BitmapIndex())
+
+    def build():
+        bitmap_index.index.build(db)
+        return bitmap_index.index
+    return build
+
+
+@pytest.fixture
+def other_worker(monkeypatch):
+    """Запись, сделанная в другом воркере: индекс этого процесса о ней не узнает до сверки"""
+    def write(request):
+        monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_ENABLED", False)
+        try:
+            return request()
+        finally:
+            monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_ENABLED", True)
+    return write
+
+
+@pytest.mark.parametrize("ids", [
+    [],
+    [0, 1, 65535, 65536, 70000],
+    list(range(0, 200_000, 7)),
+    list(range(65_000, 66_100)),
+])
+def test_bitmap_operations_match_sets(ids):
+    rng = random.Random(len(ids))
+    other = rng.sample(range(0, 200_000), 500) + list(range(65_400, 65_700))
+    left, right = bitmap_index.from_ids(ids), bitmap_index.from_ids(other)
+
+    assert bitmap_index.to_ids(left) == sorted(set(ids))
+    assert len(left) == len(set(ids))
+    assert bitmap_index.to_ids(left & right) == sorted(set(ids) & set(other))
+    assert bitmap_index.to_ids(left | right) == sorted(set(ids) | set(other))
+    assert bitmap_index.to_ids(left - right) == sorted(set(ids) - set(other))
+    assert bitmap_index.to_ids(left | right, skip=100, limit=50) == sorted(set(ids) | set(other))[100:150]
+
+
+def test_bitmap_switches_chunk_representation():
+    bitmap = bitmap_index.from_ids(range(bitmap_index.SPARSE_LIMIT))
+    assert isinstance(bitmap.chunks[0], frozenset)
+
+    bitmap.add(bitmap_index.SPARSE_LIMIT)
+    assert isinstance(bitmap.chunks[0], int)
+
+    bitmap.discard(0)
+    assert isinstance(bitmap.chunks[0], frozenset)
+    for product_id in range(1, bitmap_index.SPARSE_LIMIT + 1):
+        bitmap.discard(product_id)
+    assert not bitmap and bitmap.chunks == {}
+
+
+def test_build_indexes_catalog(catalog, index):
+    ids = catalog(12)
+    built = index()
+
+    assert sorted(built.products) == list(range(1, 13))
+    assert bitmap_index.to_ids(built.subcategories[ids["subcategory"]]) == list(range(1, 13))
+    assert bitmap_index.to_ids(built.tags[ids["tag"]]) == list(range(1, 13, 2))
+    assert bitmap_index.to_ids(built.characteristics["color"]["RAL 3000"].bitmap) == [1, 4, 7, 10]
+
+
+def test_sync_reads_only_changed_products(catalog, index, other_worker, admin, db, monkeypatch):
+    catalog(6)
+    built = index()
+    characteristics = json.dumps([{"name": "color", "label": "Цвет", "value": "RAL 9999"}])
+    response = other_worker(lambda: admin.patch("/products/2", data={"characteristics": characteristics}))
+    assert response.status_code == 200, response.text
+    assert 2 in built.characteristics["color"]["RAL 3001"].bitmap
+
+    refreshed = []
+    refresh_products = built.refresh_products
+    monkeypatch.setattr(built, "refresh_products", lambda db, ids: refreshed.append(ids) or refresh_products(db, ids))
+    built.sync(db)
+
+    assert refreshed == [[2]]
+    assert 2 not in built.characteristics["color"]["RAL 3001"].bitmap
+    assert bitmap_index.to_ids(built.characteristics["color"]["RAL 9999"].bitmap) == [2]
+
+    # Без новых записей сверка ничего не перечитывает
+    built.sync(db)
+    assert refreshed == [[2]]
+
+
+def test_sync_removes_deleted_and_adds_created_products(catalog, index, other_worker, admin, db):
+    catalog(6)
+    built = index()
+    assert other_worker(lambda: admin.delete("/products/3")).status_code == 200
+    other_worker(lambda: crud.create_product_with_characteristics(
+        db, schemas.ProductCreateForm(text="Новый", price=10, subcategory_id=1),
+        [{"name": "color", "label": "Цвет", "value": "RAL 3000"}], ["new.png"]
+    ))
+    assert 3 in built.products and 7 not in built.products
+
+    built.sync(db)
+
+    assert 3 not in built.products and 3 not in built.all
+    assert 3 not in built.characteristics["color"]["RAL 3002"].bitmap
+    assert bitmap_index.to_ids(built.characteristics["color"]["RAL 3000"].bitmap) == [1, 4, 7]
+
+
+FILTER_QUERIES = [
+    "",
+    "color=RAL 3000",
+    "color=RAL 3000,RAL 3002&sort=-price",
+    "Цвет=RAL 3001&tag_id=1",
+    "thickness__min=0.45&sort=name&page=2&page_size=3",
+    "thickness=0.4-0.5&sort=price",
+    "thickness=0,4 мм&in_stock=true&sort=discount",
+    "color=RAL 3001&brand_id=1&with_total=false",
+    "subcategory_id=1&sort=newest&page=2&page_size=5",
+]
+
+
+def _responses(admin, queries, url):
+    responses = []
+    for query in queries:
+        response = admin.get(f"{url}?{query}")
+        assert response.status_code == 200, response.text
+        responses.append(response.json())
+    return responses
+
+
+@pytest.mark.parametrize("sort_limit", [1000, 2])
+def test_filter_matches_sql(catalog, index, admin, db, monkeypatch, sort_limit):
+    catalog(12)
+    db.query(models.Product).filter(models.Product.id.in_([2, 5])).update({"in_stock": False})
+    db.commit()
+    expected = _responses(admin, FILTER_QUERIES, "/products/filter/")
+
+    index()
+    monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_SORT_LIMIT", sort_limit)
+    assert _responses(admin, FILTER_QUERIES, "/products/filter/") == expected
+
+
+FACET_QUERIES = [
+    "",
+    "color=RAL 3000",
+    "color=RAL 3000&thickness__max=0.5",
+    "Толщина=0,6 мм&in_stock=true",
+    "brand_id=1&color=RAL 3001,RAL 3002",
+]
+
+
+def test_facets_match_sql(catalog, index, admin, db):
+    catalog(12)
+    db.query(models.Product).filter(models.Product.id.in_([2, 5])).update({"in_stock": False})
+    db.commit()
+    expected = _responses(admin, FACET_QUERIES, "/products/filters/1")
+
+    index()
+    assert _responses(admin, FACET_QUERIES, "/products/filters/1") == expected
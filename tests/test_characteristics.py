@@ -0,0 +1,49 @@
+import json
+
+from app import crud, models
+
+
+def char(name, value, label=None):
+    return {"name": name, "label": label or name.title(), "value": value}
+
+
+def test_intern_shares_pairs_between_calls(db):
+    first = crud.intern_characteristics(db, [char("color", "RAL 3005"), char("size", "1200x600")])
+    second = crud.intern_characteristics(db, [char("size", "1200x600"), char("color", "RAL 8017")])
+    db.commit()
+
+    assert second[0] == first[1]
+    assert len(set(first + second)) == 3
+    assert db.query(models.CharacteristicItem).count() == 3
+
+
+def test_intern_dedupes_pairs_in_first_occurrence_order(db):
+    ids = crud.intern_characteristics(db, [
+        char("color", "RAL 3005"), char("size", "1200x600"), char("color", "RAL 3005", label="Цвет"),
+    ])
+    db.commit()
+
+    items = [db.get(models.CharacteristicItem, item_id) for item_id in ids]
+    assert [(item.name, item.value) for item in items] == [("color", "RAL 3005"), ("size", "1200x600")]
+    # Подпись задает первая запись пары
+    assert items[0].label == "Color"
+
+
+def test_existing_pair_keeps_its_label(db):
+    [item_id] = crud.intern_characteristics(db, [char("color", "RAL 3005", label="Цвет")])
+    db.commit()
+
+    assert crud.intern_characteristics(db, [char("color", "RAL 3005", label="Цвет покрытия")]) == [item_id]
+    db.commit()
+    assert db.get(models.CharacteristicItem, item_id).label == "Цвет"
+
+
+def test_duplicate_pairs_do_not_duplicate_product_links(catalog, admin, db):
+    catalog(1)
+    characteristics = json.dumps([char("color", "RAL 9999"), char("color", "RAL 9999"), char("size", "10-20")])
+    response = admin.patch("/products/1", data={"characteristics": characteristics})
+    assert response.status_code == 200, response.text
+
+    links = db.query(models.ProductCharacteristic).filter_by(product_id=1).all()
+    assert len(links) == 2
+    assert len({link.characteristic_id for link in links}) == 2
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+from sqlalchemy import event, func, select
+
+from app import counters, crud, database, models
+
+
+def total(client, url: str) -> int:
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    return response.json()["total"]
+
+
+def test_invalidated_counter_is_recounted(catalog, client, db):
+    catalog(7)
+    assert total(client, "/products/") == 7
+
+    db.add(models.Product(text="Без счетчика", article=9000, price=1, slug="no-counter", subcategory_id=1))
+    counters.invalidate(db, counters.PRODUCTS)
+    db.commit()
+    assert total(client, "/products/") == 8
+
+
+def test_delete_product_decrements_scopes(catalog, client, admin):
+    ids = catalog(6)
+    before = {
+        "products": total(client, "/products/"),
+        "category": total(client, "/products/category/roof"),
+        "brand": total(client, f"/brands/{ids['brand']}/products"),
+    }
+
+    response = admin.delete("/products/1")
+    assert response.status_code == 200, response.text
+
+    assert total(client, "/products/") == before["products"] - 1
+    assert total(client, "/products/category/roof") == before["category"] - 1
+    assert total(client, f"/brands/{ids['brand']}/products") == before["brand"] - 1
+
+
+def test_subcategory_move_recounts_both_categories(catalog, client, admin, db):
+    ids = catalog(10)
+    db.add(models.Category(text="Фасад", slug="facade"))
+    db.commit()
+    assert total(client, "/products/category/roof") == 10
+    assert total(client, "/products/category/facade") == 0
+
+    response = admin.patch(f"/subcategories/{ids['subcategory']}", data={"category_id": "2"})
+    assert response.status_code == 200, response.text
+
+    assert total(client, "/products/category/roof") == 0
+    assert total(client, "/products/category/facade") == 10
+
+
+def test_crud_delete_subcategory_invalidates_counters(catalog, client, db):
+    catalog(4)
+    db.add(models.Subcategory(text="Пустая", slug="empty", category_id=1, image="empty.png"))
+    db.commit()
+    assert client.get("/subcategories/").json()["pagination"]["total_items"] == 2
+
+    crud.delete_subcategory(db, 2)
+    assert client.get("/subcategories/").json()["pagination"]["total_items"] == 1
+
+
+def _write_during_recount(engine):
+    """Слушатель: как только пересчет выполнил COUNT, другой поток добавляет товар и двигает счетчик"""
+    writer = {}
+
+    def add_product():
+        session = database.SessionLocal()
+        try:
+            session.add(models.Product(text="Конкурент", article=9100, price=1, slug="concurrent", subcategory_id=1))
+            counters.adjust(session, {(counters.PRODUCTS, 0)}, 1)
+            session.commit()
+        finally:
+            session.close()
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        if "count(" in statement.lower() and "thread" not in writer:
+            writer["thread"] = threading.Thread(target=add_product)
+            writer["thread"].start()
+            # Даем записи время попытаться закоммитить, пока пересчет не завершен
+            time.sleep(0.3)
+
+    event.listen(engine, "after_cursor_execute", after_execute)
+    return writer, lambda: event.remove(engine, "after_cursor_execute", after_execute)
+
+
+def _stored_total(db):
+    db.expire_all()
+    return db.scalar(select(models.CatalogCounter.total).where(models.CatalogCounter.scope == counters.PRODUCTS))
+
+
+def test_write_during_sync_recount_is_not_lost(catalog, db):
+    catalog(5)
+    writer, stop = _write_during_recount(database.engine)
+    try:
+        counters.get_total(db, counters.PRODUCTS, 0, select(func.count(models.Product.id)))
+    finally:
+        stop()
+    writer["thread"].join()
+
+    assert _stored_total(db) == 6
+    assert counters.get_total(db, counters.PRODUCTS, 0, select(func.count(models.Product.id))) == 6
+
+
+def test_write_during_async_recount_is_not_lost(catalog, db):
+    catalog(5)
+
+    async def recount():
+        async with database.AsyncSessionLocal() as session:
+            return await counters.get_total_async(
+                session, counters.PRODUCTS, 0, select(func.count(models.Product.id))
+            )
+
+    writer, stop = _write_during_recount(database.async_engine.sync_engine)
+    try:
+        asyncio.run(recount())
+    finally:
+        stop()
+    writer["thread"].join()
+
+    assert _stored_total(db) == 6
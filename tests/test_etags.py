@@ -0,0 +1,76 @@
+import pytest
+
+from app import models, query_stats
+
+
+def etag(client, slug: str) -> str:
+    response = client.get(f"/products/{slug}")
+    assert response.status_code == 200, response.text
+    return response.headers["ETag"]
+
+
+def test_cached_revalidation_is_304_without_queries(catalog, client):
+    catalog(2)
+    tag = etag(client, "product-0")
+
+    response = client.get("/products/product-0", headers={"If-None-Match": tag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == tag
+    assert response.content == b""
+    assert int(response.headers[query_stats.QUERY_COUNT_HEADER]) == 0
+
+
+def test_uncached_revalidation_reads_only_version(catalog, admin):
+    catalog(2)
+    tag = etag(admin, "product-0")
+
+    response = admin.get("/products/product-0", headers={"If-None-Match": f'W/{tag}, "other"'})
+    assert response.status_code == 304
+    assert int(response.headers[query_stats.QUERY_COUNT_HEADER]) == 1
+
+
+def test_stale_tag_gets_full_response(catalog, client):
+    catalog(2)
+    response = client.get("/products/product-0", headers={"If-None-Match": '"product-1-0-0"'})
+    assert response.status_code == 200
+    assert response.json()["slug"] == "product-0"
+
+
+@pytest.fixture
+def similar(catalog, db):
+    """Товар 2 в похожих у товара 1"""
+    catalog(4)
+    db.execute(models.product_similar.insert().values(product_id=1, similar_product_id=2))
+    db.commit()
+
+
+@pytest.mark.parametrize("change, changed, unchanged", [
+    # Категория входит в карточку через подкатегорию
+    (lambda admin: admin.patch("/categories/1", data={"text": "Кровля и фасад"}),
+     ["product-0", "product-1"], []),
+    # Тег только у товаров с четным i
+    (lambda admin: admin.put("/tags/1", json={"name": "Новинка"}),
+     ["product-0", "product-2"], ["product-1", "product-3"]),
+    # Карточка похожего товара входит в страницу товара 1
+    (lambda admin: admin.patch("/products/2", data={"price": "500"}),
+     ["product-0", "product-1"], ["product-2", "product-3"]),
+    (lambda admin: admin.patch("/products/4", data={"price": "500"}),
+     ["product-3"], ["product-0", "product-1", "product-2"]),
+])
+def test_etag_changes_with_related_rows(similar, admin, change, changed, unchanged):
+    before = {slug: etag(admin, slug) for slug in changed + unchanged}
+
+    response = change(admin)
+    assert response.status_code == 200, response.text
+
+    after = {slug: etag(admin, slug) for slug in changed + unchanged}
+    assert [slug for slug in before if before[slug] != after[slug]] == changed
+
+
+def test_cached_304_is_dropped_after_change(similar, client, admin):
+    tag = etag(client, "product-0")
+    assert admin.patch("/products/2", data={"price": "500"}).status_code == 200
+
+    response = client.get("/products/product-0", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from app import bitmap_index, models
+
+
+@pytest.fixture(params=[False, True], ids=["sql", "bitmap"])
+def facet_counts(request, admin, db, monkeypatch):
+    """Счетчики фасетов {name: {value: count}} через SQL или через индекс фильтров"""
+    if request.param:
+        monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_ENABLED", True)
+        monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_SYNC_SECONDS", float("inf"))
+        monkeypatch.setattr(bitmap_index, "index", bitmap_index.BitmapIndex())
+
+    def counts(query: str = "") -> dict:
+        if request.param and not bitmap_index.index.ready:
+            bitmap_index.index.build(db)
+        response = admin.get(f"/products/filters/1?{query}")
+        assert response.status_code == 200, response.text
+        return {
+            facet["name"]: {value["value"]: value["count"] for value in facet["values"]}
+            for facet in response.json()["facets"]
+        }
+    return counts
+
+
+# Товар с id i + 1: color "RAL 300{i % 3}", thickness "0,{4 + i % 3} мм"
+def test_counts_without_filters(catalog, facet_counts):
+    catalog(12)
+    assert facet_counts() == {
+        "color": {"RAL 3000": 4, "RAL 3001": 4, "RAL 3002": 4},
+        "thickness": {"0,4 мм": 4, "0,5 мм": 4, "0,6 мм": 4},
+    }
+
+
+def test_facet_ignores_own_filter(catalog, facet_counts):
+    catalog(12)
+    # color не сужает свой фасет, но сужает остальные
+    assert facet_counts("color=RAL 3000") == {
+        "color": {"RAL 3000": 4, "RAL 3001": 4, "RAL 3002": 4},
+        "thickness": {"0,4 мм": 4, "0,5 мм": 0, "0,6 мм": 0},
+    }
+
+
+def test_each_facet_applies_other_filters(catalog, facet_counts):
+    catalog(12)
+    assert facet_counts("color=RAL 3000,RAL 3001&thickness__min=0.5") == {
+        # color считается только с фильтром thickness: 0,5 мм и 0,6 мм
+        "color": {"RAL 3000": 0, "RAL 3001": 4, "RAL 3002": 4},
+        # thickness - только с фильтром color
+        "thickness": {"0,4 мм": 4, "0,5 мм": 4, "0,6 мм": 0},
+    }
+
+
+def test_filter_by_label_counts_as_own_facet(catalog, facet_counts):
+    catalog(12)
+    assert facet_counts("Цвет=RAL 3002")["color"] == {"RAL 3000": 4, "RAL 3001": 4, "RAL 3002": 4}
+
+
+def test_base_conditions_apply_to_every_facet(catalog, facet_counts, db):
+    catalog(12)
+    db.query(models.Product).filter(models.Product.id.in_([1, 2, 3])).update({"in_stock": False})
+    db.commit()
+    assert facet_counts("in_stock=true&color=RAL 3000") == {
+        "color": {"RAL 3000": 3, "RAL 3001": 3, "RAL 3002": 3},
+        "thickness": {"0,4 мм": 3, "0,5 мм": 0, "0,6 мм": 0},
+    }
+
+
+def test_numeric_range_and_unit(catalog, admin):
+    catalog(12)
+    response = admin.get("/products/filters/1")
+    thickness = next(facet for facet in response.json()["facets"] if facet["name"] == "thickness")
+    assert (thickness["label"], thickness["unit"], thickness["min"], thickness["max"]) == ("Толщина", "мм", 0.4, 0.6)
+
+
+def test_counts_follow_product_changes(catalog, facet_counts, admin):
+    catalog(6)
+    assert facet_counts()["color"] == {"RAL 3000": 2, "RAL 3001": 2, "RAL 3002": 2}
+
+    characteristics = json.dumps([{"name": "color", "label": "Цвет", "value": "RAL 3000"}])
+    response = admin.patch("/products/2", data={"characteristics": characteristics})
+    assert response.status_code == 200, response.text
+
+    assert facet_counts()["color"] == {"RAL 3000": 3, "RAL 3001": 1, "RAL 3002": 2}
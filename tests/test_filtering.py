@@ -0,0 +1,77 @@
+import pytest
+
+from app import bitmap_index, crud, models
+
+
+def filtered_ids(client, query: str) -> list:
+    response = client.get(f"/products/filter/?page_size=100&{query}")
+    assert response.status_code == 200, response.text
+    return [product["id"] for product in response.json()["products"]]
+
+
+@pytest.fixture
+def sizes(catalog, db):
+    """Каталог из 12 товаров и строковая характеристика с дефисом в значении: size у товаров 1 и 2"""
+    catalog(12)
+    for product_id, value in ((1, "10-20"), (2, "20-30")):
+        for characteristic_id in crud.intern_characteristics(db, [{"name": "size", "label": "Размер", "value": value}]):
+            db.add(models.ProductCharacteristic(product_id=product_id, characteristic_id=characteristic_id))
+    db.commit()
+
+
+# Товар с id i + 1: color "RAL 300{i % 3}", thickness "0,{4 + i % 3} мм", тег у четных i
+@pytest.mark.parametrize("query, expected", [
+    ("color=RAL 3000", [1, 4, 7, 10]),
+    ("Цвет=RAL 3000", [1, 4, 7, 10]),
+    ("color=RAL 3000,RAL 3001", [1, 2, 4, 5, 7, 8, 10, 11]),
+    ("color=RAL 3000&color=RAL 3001", [1, 2, 4, 5, 7, 8, 10, 11]),
+    ("thickness=0,5 мм", [2, 5, 8, 11]),
+    ("thickness=0.4-0.5", [1, 2, 4, 5, 7, 8, 10, 11]),
+    ("thickness=0,5-0,6", [2, 3, 5, 6, 8, 9, 11, 12]),
+    ("thickness__min=0.5", [2, 3, 5, 6, 8, 9, 11, 12]),
+    ("thickness__max=0.45", [1, 4, 7, 10]),
+    ("thickness__min=0.5&thickness__max=0.5", [2, 5, 8, 11]),
+    ("color=RAL 3000&thickness=0.4-0.4", [1, 4, 7, 10]),
+    ("color=RAL 3001&thickness__min=0.6", []),
+    ("color=RAL 3002&tag_id=1", [3, 9]),
+    ("color=RAL 9999", []),
+])
+def test_filter_conditions(catalog, client, query, expected):
+    catalog(12)
+    assert filtered_ids(client, query) == expected
+
+
+@pytest.mark.parametrize("query", ["thickness__min=abc", "thickness__max=0.5мм"])
+def test_malformed_bound_is_400(catalog, client, query):
+    catalog(2)
+    response = client.get(f"/products/filter/?{query}")
+    assert response.status_code == 400
+    assert "ожидается число" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    # У size нет числовых значений: "10-20" - строка, а не диапазон
+    ("size=10-20", [1]),
+    ("Размер=10-20&Размер=20-30", [1, 2]),
+    ("size=15-25", []),
+    # У thickness числа есть: то же написание - диапазон
+    ("thickness=0.5-0.5", [2, 5, 8, 11]),
+])
+@pytest.mark.parametrize("use_bitmap_index", [False, True])
+def test_hyphenated_value_is_range_only_for_numeric_characteristic(sizes, admin, db, monkeypatch,
+                                                                    use_bitmap_index, query, expected):
+    if use_bitmap_index:
+        monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_ENABLED", True)
+        monkeypatch.setattr(bitmap_index, "BITMAP_INDEX_SYNC_SECONDS", float("inf"))
+        monkeypatch.setattr(bitmap_index, "index", bitmap_index.BitmapIndex())
+        bitmap_index.index.build(db)
+    assert filtered_ids(admin, query) == expected
+
+
+def test_facets_treat_hyphenated_value_as_string(sizes, client):
+    response = client.get("/products/filters/1?size=10-20")
+    assert response.status_code == 200, response.text
+    facets = {facet["name"]: facet for facet in response.json()["facets"]}
+    assert {value["value"]: value["count"] for value in facets["color"]["values"]} == {
+        "RAL 3000": 1, "RAL 3001": 0, "RAL 3002": 0
+    }
@@ -0,0 +1,64 @@
+import pytest
+
+from app import schemas
+
+
+def lookup(client, payload):
+    response = client.post("/products/lookup", json=payload)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("key, values, expected_ids", [
+    ("ids", [5, 1, 3], [5, 1, 3]),
+    ("slugs", ["product-4", "product-0"], [5, 1]),
+    ("articles", [1002, 1011, 1000], [3, 12, 1]),
+    # Повторы отдаются один раз, на месте первого упоминания
+    ("ids", [2, 7, 2], [2, 7]),
+])
+def test_items_follow_request_order(catalog, client, key, values, expected_ids):
+    catalog(12)
+    result = lookup(client, {key: values})
+    assert [item["id"] for item in result["items"]] == expected_ids
+    assert result["missing"] == []
+
+
+@pytest.mark.parametrize("key, values, expected_ids, missing", [
+    ("ids", [3, 404, 1, 405], [3, 1], [404, 405]),
+    ("slugs", ["nope", "product-1"], [2], ["nope"]),
+    ("articles", [9999], [], [9999]),
+])
+def test_reports_missing_values_in_request_order(catalog, client, key, values, expected_ids, missing):
+    catalog(4)
+    result = lookup(client, {key: values})
+    assert [item["id"] for item in result["items"]] == expected_ids
+    assert result["missing"] == missing
+
+
+def test_detail_returns_full_products(catalog, client):
+    catalog(3)
+    result = lookup(client, {"ids": [2, 1], "detail": True})
+    assert [item["slug"] for item in result["items"]] == ["product-1", "product-0"]
+    assert {characteristic["name"] for characteristic in result["items"][0]["characteristics"]} == {
+        "color", "thickness"
+    }
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"detail": True},
+    {"ids": [1], "slugs": ["product-0"]},
+    {"ids": [1], "articles": [1000]},
+])
+def test_requires_exactly_one_key(catalog, client, payload):
+    catalog(1)
+    assert client.post("/products/lookup", json=payload).status_code == 422
+
+
+def test_rejects_more_than_max_items(catalog, client):
+    catalog(1)
+    limit = schemas.PRODUCT_LOOKUP_MAX_ITEMS
+    assert limit == 300
+    assert client.post("/products/lookup", json={"ids": list(range(1, limit + 1))}).status_code == 200
+    assert client.post("/products/lookup", json={"ids": list(range(1, limit + 2))}).status_code == 422
+    assert client.post("/products/lookup", json={"slugs": ["product-0"] * (limit + 1)}).status_code == 422
@@ -0,0 +1,79 @@
+import base64
+import json
+
+import pytest
+
+from app import models, pagination, product_cards
+
+# Ожидаемый порядок каждой сортировки, посчитанный в Python по тем же полям
+EXPECTED_ORDER = {
+    "id": lambda item: item["id"],
+    "price": lambda item: (item["final_price"], item["id"]),
+    "-price": lambda item: (-item["final_price"], -item["id"]),
+    "discount": lambda item: (-item["discount"], -item["id"]),
+    "newest": lambda item: -item["id"],
+    "name": lambda item: (item["text"], item["id"]),
+}
+
+
+def walk(client, url: str, sort: str, size: int = 4) -> list:
+    """Пройти листинг курсорами до последней страницы"""
+    items, cursor = [], ""
+    while cursor is not None:
+        response = client.get(url, params={"sort": sort, "size": size, "cursor": cursor})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+    return items
+
+
+def encode(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.fixture
+def products_with_ties(catalog, db):
+    """Совпадающие цены и скидки, товар без цены и без скидки - строки, которые теряет неверный курсор"""
+    catalog(11)
+    db.get(models.Product, 2).price = db.get(models.Product, 5).price
+    db.get(models.Product, 7).discount = None
+    db.get(models.Product, 9).price = None
+    product_cards.refresh(db, [2, 7, 9])
+    db.commit()
+
+
+@pytest.mark.parametrize("sort", list(pagination.PRODUCT_SORTS))
+@pytest.mark.parametrize("url", ["/products/", "/products/category/roof"])
+def test_cursor_walk_returns_every_product_once_in_order(products_with_ties, client, url, sort):
+    assert set(EXPECTED_ORDER) == set(pagination.PRODUCT_SORTS) == set(pagination.CARD_SORTS)
+
+    items = walk(client, url, sort)
+    ids = [item["id"] for item in items]
+    assert sorted(ids) == list(range(1, 12))
+    assert items == sorted(items, key=EXPECTED_ORDER[sort])
+
+
+def test_product_without_price_sorts_as_zero(products_with_ties, client):
+    items = walk(client, "/products/", "price")
+    assert items[0]["id"] == 9
+    assert items[0]["final_price"] == 0
+
+
+@pytest.mark.parametrize("sort, cursor", [
+    ("price", "not base64!"),
+    ("price", encode([1, 2])),
+    ("price", encode({"s": "id", "k": [1]})),
+    ("price", encode({"s": "price", "k": [1]})),
+    ("price", encode({"s": "price", "k": ["cheap", 1]})),
+    ("price", encode({"s": "price", "k": [100, "1"]})),
+    ("price", encode({"s": "price", "k": [True, 1]})),
+    ("price", encode({"s": "price", "k": [100, 2 ** 70]})),
+    ("price", base64.urlsafe_b64encode(b'{"s":"price","k":[NaN,1]}').decode()),
+    ("name", encode({"s": "name", "k": [5, 1]})),
+    ("id", encode({"s": "id", "k": [1.5]})),
+])
+def test_malformed_cursor_is_rejected(catalog, client, sort, cursor):
+    catalog(3)
+    response = client.get("/products/", params={"sort": sort, "cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,57 @@
+import pytest
+
+from app import models
+
+
+def test_final_price_subtracts_absolute_discount():
+    assert models.final_price(1500, 250) == 1250
+    assert models.final_price(1500, None) == 1500
+    assert models.final_price(None, 10) == 0
+
+
+@pytest.mark.parametrize("data, final_price", [
+    # Скидка больше 100 допустима, если не превышает цену
+    ({"price": "1500", "discount": "250"}, 1250),
+    ({"discount": "100"}, 0),
+    ({"price": "80", "discount": "0"}, 80),
+])
+def test_patch_stores_price_minus_discount(catalog, admin, db, data, final_price):
+    catalog(1)
+    response = admin.patch("/products/1", data=data)
+    assert response.status_code == 200, response.text
+    assert response.json()["final_price"] == final_price
+
+    card = db.get(models.ProductCard, 1)
+    assert card.final_price == final_price
+
+
+@pytest.mark.parametrize("data, status_code", [
+    ({"discount": "-1"}, 422),
+    # Цена товара - 100: скидка больше нее отклоняется, даже если меняется только одно поле
+    ({"discount": "101"}, 400),
+    ({"price": "50", "discount": "60"}, 400),
+    ({"price": "5"}, 400),
+])
+def test_patch_rejects_invalid_discount(catalog, admin, db, data, status_code):
+    catalog(1)
+    db.get(models.Product, 1).discount = 10
+    db.commit()
+
+    response = admin.patch("/products/1", data=data)
+    assert response.status_code == status_code, response.text
+
+    db.expire_all()
+    assert db.get(models.Product, 1).final_price == 90
+
+
+def test_create_schema_rejects_discount_above_price():
+    from pydantic import ValidationError
+
+    from app import schemas
+
+    fields = {"text": "Товар", "subcategory_id": 1}
+    assert schemas.ProductCreateForm(price=1500, discount=250, **fields).discount == 250
+    with pytest.raises(ValidationError):
+        schemas.ProductCreateForm(price=100, discount=150, **fields)
+    with pytest.raises(ValidationError):
+        schemas.ProductCreateForm(price=100, discount=-1, **fields)
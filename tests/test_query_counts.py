@@ -0,0 +1,55 @@
+import pytest
+
+from app import query_stats
+
+# /products/: страница с total из счетчика одним запросом, затем изображения, теги
+# и характеристики страницы - по одному запросу на связь, независимо от размера страницы
+PRODUCT_LIST_QUERIES = 4
+# /products/category/{slug}: категория и страница карточек с total
+CATEGORY_PRODUCTS_QUERIES = 2
+
+
+def query_count(response) -> int:
+    assert response.status_code == 200, response.text
+    return int(response.headers[query_stats.QUERY_COUNT_HEADER])
+
+
+@pytest.fixture
+def warm_catalog(catalog, client):
+    """Каталог с уже посчитанными счетчиками: первое чтение области пересчитывает ее"""
+    catalog(30)
+    client.get("/products/")
+    client.get("/products/category/roof")
+
+
+@pytest.mark.parametrize("params", [
+    {"size": 1},
+    {"size": 10},
+    {"size": 30},
+    {"size": 5, "page": 3},
+    {"size": 5, "sort": "price"},
+    {"size": 5, "cursor": ""},
+    {"size": 5, "with_total": "false"},
+])
+def test_products_list_query_count_is_fixed(warm_catalog, client, params):
+    response = client.get("/products/", params=params)
+    assert query_count(response) == PRODUCT_LIST_QUERIES
+    assert query_stats.N_PLUS_ONE_HEADER not in response.headers
+
+
+@pytest.mark.parametrize("size", [1, 10, 30])
+def test_category_products_query_count_is_fixed(warm_catalog, client, size):
+    response = client.get("/products/category/roof", params={"size": size})
+    assert query_count(response) == CATEGORY_PRODUCTS_QUERIES
+
+
+def test_streamed_export_is_recorded_after_body(catalog, admin):
+    catalog(30)
+    response = admin.get("/products/export")
+    assert response.status_code == 200
+    assert len(response.json()) == 30
+
+    entry = query_stats.registry.snapshot()["GET /products/export"]
+    assert entry["requests"] == 1
+    # Пачки экспорта читаются, пока отдается тело: в заголовок они не попадают, в реестр - да
+    assert entry["queries"] > int(response.headers[query_stats.QUERY_COUNT_HEADER])
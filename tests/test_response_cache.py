@@ -0,0 +1,58 @@
+import pytest
+
+from app import response_cache
+
+FILTER_URL = "/products/filter/?subcategory_id=1"
+
+
+def cache_status(client, url: str) -> str:
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    return response.headers[response_cache.CACHE_HEADER]
+
+
+def test_repeated_read_is_served_from_cache(catalog, client):
+    catalog(4)
+    assert cache_status(client, FILTER_URL) == "MISS"
+    assert cache_status(client, FILTER_URL) == "HIT"
+    # Порядок query-параметров не влияет на ключ
+    assert cache_status(client, "/products/filter/?page=1&subcategory_id=1") == "MISS"
+    assert cache_status(client, "/products/filter/?subcategory_id=1&page=1") == "HIT"
+
+
+def test_authorized_reads_bypass_cache(catalog, client, admin):
+    catalog(4)
+    cache_status(client, FILTER_URL)
+    assert response_cache.CACHE_HEADER not in admin.get(FILTER_URL).headers
+
+
+# Записи любой сущности, данные которой попадают в карточки фильтра
+@pytest.mark.parametrize("method, url, payload", [
+    ("patch", "/products/1", {"data": {"text": "Новое имя"}}),
+    ("patch", "/categories/1", {"data": {"text": "Новая категория"}}),
+    ("patch", "/subcategories/1", {"data": {"text": "Новая подкатегория"}}),
+    ("put", "/tags/1", {"json": {"name": "Новинка"}}),
+])
+def test_write_invalidates_filter_pages(catalog, client, admin, method, url, payload):
+    catalog(4)
+    cache_status(client, FILTER_URL)
+    assert cache_status(client, FILTER_URL) == "HIT"
+
+    response = getattr(admin, method)(url, **payload)
+    assert response.status_code == 200, response.text
+
+    assert cache_status(client, FILTER_URL) == "MISS"
+
+
+def test_product_update_is_visible_after_invalidation(catalog, client, admin):
+    catalog(4)
+    assert client.get("/products/product-0").json()["price"] == 100
+    assert cache_status(client, "/products/product-0") == "HIT"
+
+    response = admin.patch("/products/1", data={"price": "250", "discount": "20"})
+    assert response.status_code == 200, response.text
+
+    response = client.get("/products/product-0")
+    assert response.headers[response_cache.CACHE_HEADER] == "MISS"
+    assert response.json()["price"] == 250
+    assert response.json()["final_price"] == 230
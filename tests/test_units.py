@@ -0,0 +1,63 @@
+import pytest
+
+from app import crud, models, units
+
+
+@pytest.mark.parametrize("value, expected", [
+    # Десятичная запятая и точка
+    ("0,5 мм", (0.5, "мм")),
+    ("0.5 мм", (0.5, "мм")),
+    ("100", (100.0, None)),
+    ("-5 мм", (-5.0, "мм")),
+    # Пересчет в базовую единицу величины
+    ("0.05 см", (0.5, "мм")),
+    ("1,2 м", (1200.0, "мм")),
+    ("500 г", (0.5, "кг")),
+    ("2 т", (2000.0, "кг")),
+    ("750 мл", (0.75, "л")),
+    ("10 м2", (10.0, "м²")),
+    ("3 кг/м2", (3.0, "кг/м²")),
+    ("5 Мм.", (5.0, "мм")),
+    # Разделитель тысяч
+    ("1 200 мм", (1200.0, "мм")),
+    # Незнакомая единица из одного слова остается без пересчета
+    ("12 шт", (12.0, "шт")),
+    ("25%", (25.0, "%")),
+])
+def test_parse_numbers(value, expected):
+    assert units.parse(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    None, "", "   ", "1200x600", "1200х600 мм", "RAL 3005", "10-20", "0,5 мм x 2", "Мм 5",
+])
+def test_parse_leaves_non_numbers(value):
+    assert units.parse(value) == (None, None)
+
+
+def test_interned_values_store_parsed_number(db):
+    values = ["0,5 мм", "1200x600", "RAL 3005"]
+    ids = crud.intern_characteristics(db, [{"name": "size", "label": "Размер", "value": value} for value in values])
+    db.commit()
+
+    items = [db.get(models.CharacteristicItem, item_id) for item_id in ids]
+    assert {item.value: (item.numeric_value, item.unit) for item in items} == {
+        "0,5 мм": (0.5, "мм"), "1200x600": (None, None), "RAL 3005": (None, None)
+    }
+
+
+def test_backfill_fills_and_clears_numbers(db):
+    db.add_all([
+        models.CharacteristicItem(name="weight", label="Вес", value="500 г"),
+        models.CharacteristicItem(name="size", label="Размер", value="1200x600", numeric_value=1200, unit="мм"),
+    ])
+    db.commit()
+
+    assert units.backfill(db, batch_size=1) == 2
+    db.commit()
+    db.expire_all()
+
+    items = db.query(models.CharacteristicItem).order_by(models.CharacteristicItem.id)
+    assert [(item.value, item.numeric_value, item.unit) for item in items] == [
+        ("500 г", 0.5, "кг"), ("1200x600", None, None)
+    ]